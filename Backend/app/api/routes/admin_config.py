@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from typing import Any
+from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -36,8 +37,18 @@ from app.models.admin_config import (
     WebhookCreate,
     WebhookResponse,
 )
+from app.security.rbac import invalidate_role_permissions
 from app.services.admin_config_store import ensure_admin_config_schema, generate_api_key
-from pydantic import BaseModel
+from app.services.notification_outbox import (
+    CHANNEL_SERVICE_TYPES,
+    enqueue as enqueue_notifications,
+    notification_outbox,
+    tenant_counts as outbox_tenant_counts,
+)
+from app.services.notifications import NotificationError, SMTPCredentials, notification_dispatcher
+from app.services.template_render import invalidate_template, load_template
+from app.services.webhooks import WebhookTargetError, check_webhook_target, webhook_dispatcher
+from pydantic import BaseModel, Field
 
 
 router = APIRouter(dependencies=[Depends(require_permission("admin.config.manage"))])
@@ -66,7 +77,10 @@ async def create_role(payload: RoleCreate, session: AsyncSession = Depends(get_s
         text(f"INSERT INTO {ADMIN}.roles (name, description) VALUES (:n, :d) RETURNING role_id, name, description"),
         {"n": payload.name, "d": payload.description},
     )
-    return dict(res.mappings().first())
+    created = dict(res.mappings().first())
+    await session.commit()
+    invalidate_role_permissions()
+    return created
 
 
 # ------------------------- Custom Data Store (CRUD) -------------------------
@@ -197,48 +211,17 @@ async def test_send_email(payload: TestEmailRequest, session: AsyncSession = Dep
     row = res.mappings().first()
     if not row:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Servico SMTP nao configurado/ativo")
-    creds = row["credentials"] or {}
-
-    import smtplib
-    from email.mime.text import MIMEText
-    from email.mime.multipart import MIMEMultipart
-
-    host = creds.get("host")
-    port = int(creds.get("port", 587))
-    username = creds.get("username")
-    password = creds.get("password")
-    use_ssl = bool(creds.get("use_ssl", False))
-    use_tls = bool(creds.get("use_tls", True))
-    sender = creds.get("from", username)
-    if not host or not sender:
+    try:
+        creds = SMTPCredentials.from_mapping(row["credentials"] or {})
+    except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Credenciais SMTP incompletas")
 
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = payload.subject
-    msg["From"] = sender
-    msg["To"] = payload.to
-    if payload.text:
-        msg.attach(MIMEText(payload.text, "plain", "utf-8"))
-    if payload.html:
-        msg.attach(MIMEText(payload.html, "html", "utf-8"))
-
+    # Envio em thread de trabalho com conexao SMTP reaproveitada (nao bloqueia o event loop)
     try:
-        if use_ssl:
-            with smtplib.SMTP_SSL(host=host, port=port) as server:
-                if username and password:
-                    server.login(username, password)
-                server.sendmail(sender, [payload.to], msg.as_string())
-        else:
-            with smtplib.SMTP(host=host, port=port) as server:
-                server.ehlo()
-                if use_tls:
-                    server.starttls()
-                if username and password:
-                    server.login(username, password)
-                server.sendmail(sender, [payload.to], msg.as_string())
-        return {"sent": True}
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Falha ao enviar email: {e}")
+        await notification_dispatcher.send_email(creds, payload.to, payload.subject, html=payload.html, text=payload.text)
+    except NotificationError as e:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
+    return {"sent": True}
 
 
 # --------------------- Teste SMS / Push e Envio por Template ----------------
@@ -282,57 +265,82 @@ async def test_send_push(payload: TestPushRequest, session: AsyncSession = Depen
     return {"sent": True, "provider": "PUSH", "to": payload.to, "title": payload.title}
 
 
-def _render_template(content: str, variables: dict[str, Any]) -> str:
-    # Substituicao simples de {{a.b}} por variavel no dict (MVP seguro)
-    import re
-
-    def resolve(path: str):
-        cur: Any = variables
-        for part in path.split('.'):
-            if isinstance(cur, dict) and part in cur:
-                cur = cur[part]
-            else:
-                return ''
-        return str(cur)
+class SendTemplateRequest(BaseModel):
+    template_id: str
+    channel: str  # EMAIL | SMS | PUSH
+    to: str
+    variables: dict[str, Any] = {}
 
-    def repl(match: re.Match[str]) -> str:
-        key = match.group(1).strip()
-        return resolve(key)
 
-    return re.sub(r"\{\{\s*([^}]+)\s*\}\}", repl, content)
+class TemplateRecipient(BaseModel):
+    to: str
+    variables: dict[str, Any] = {}
 
 
-class SendTemplateRequest(BaseModel):
+class SendTemplateBatchRequest(BaseModel):
     template_id: str
     channel: str  # EMAIL | SMS | PUSH
-    to: str
-    variables: dict[str, Any] = {}
+    recipients: list[TemplateRecipient] = Field(min_length=1, max_length=10_000)
+
+
+async def _enqueue_template(
+    session: AsyncSession,
+    tenant_id: str,
+    template_id: str,
+    channel: str,
+    messages: list[tuple[str, dict[str, Any]]],
+) -> dict[str, Any]:
+    channel = channel.upper()
+    if channel not in CHANNEL_SERVICE_TYPES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Canal invalido")
+    try:
+        template_id = str(UUID(template_id))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template nao encontrado")
+    if await load_template(session, template_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template nao encontrado")
+    # Renderizacao e envio ficam com os workers do outbox; aqui so o INSERT.
+    queued = await enqueue_notifications(session, tenant_id, template_id, channel, messages)
+    await session.commit()
+    notification_outbox.notify()
+    return {"queued": queued, "channel": channel}
 
 
-@router.post("/notification/send-template")
-async def send_template(payload: SendTemplateRequest, session: AsyncSession = Depends(get_session)):
+@router.post("/notification/send-template", status_code=status.HTTP_202_ACCEPTED)
+async def send_template(
+    payload: SendTemplateRequest,
+    context: TenantContext = Depends(get_tenant_context),
+    session: AsyncSession = Depends(get_session),
+):
     await init(session)
-    # Carregar template
-    t_res = await session.execute(
-        text(f"SELECT name, type, subject, content FROM {ADMIN}.templates WHERE template_id = :id"),
-        {"id": payload.template_id},
+    return await _enqueue_template(
+        session, context.tenant_id, payload.template_id, payload.channel, [(payload.to, payload.variables or {})]
     )
-    t_row = t_res.mappings().first()
-    if not t_row:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template nao encontrado")
 
-    subject = t_row["subject"] or t_row["name"]
-    content = _render_template(t_row["content"], payload.variables or {})
 
-    channel = payload.channel.upper()
-    if channel == "EMAIL":
-        # Reutiliza teste SMTP
-        return await test_send_email(TestEmailRequest(to=payload.to, subject=subject, html=content), session)  # type: ignore[arg-type]
-    if channel == "SMS":
-        return await test_send_sms(TestSMSRequest(to=payload.to, message=content[:140]), session)  # type: ignore[arg-type]
-    if channel == "PUSH":
-        return await test_send_push(TestPushRequest(to=payload.to, title=subject, body=content[:180]), session)  # type: ignore[arg-type]
-    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Canal invalido")
+@router.post("/notification/send-template/batch", status_code=status.HTTP_202_ACCEPTED)
+async def send_template_batch(
+    payload: SendTemplateBatchRequest,
+    context: TenantContext = Depends(get_tenant_context),
+    session: AsyncSession = Depends(get_session),
+):
+    await init(session)
+    return await _enqueue_template(
+        session,
+        context.tenant_id,
+        payload.template_id,
+        payload.channel,
+        [(r.to, r.variables) for r in payload.recipients],
+    )
+
+
+@router.get("/notification/outbox")
+async def notification_outbox_status(
+    context: TenantContext = Depends(get_tenant_context),
+    session: AsyncSession = Depends(get_session),
+):
+    # Contagem por status das notificacoes enfileiradas pelo tenant
+    return await outbox_tenant_counts(session, context.tenant_id)
 
 
 
@@ -354,7 +362,11 @@ async def create_permission(payload: PermissionCreate, session: AsyncSession = D
         ),
         {"k": payload.action_key, "d": payload.description},
     )
-    return dict(res.mappings().first())
+    created = dict(res.mappings().first())
+    # Nova permissao muda o catalogo (e a versao) dos digests do JWT.
+    await session.commit()
+    invalidate_role_permissions()
+    return created
 
 
 # -------------------------- User ↔ Roles (DB) ------------------------------
@@ -372,6 +384,8 @@ async def assign_user_role(payload: UserRoleAssign, session: AsyncSession = Depe
         text(f"INSERT INTO {ADMIN}.user_roles (user_id, role_id) VALUES (:u, :r) ON CONFLICT DO NOTHING"),
         {"u": payload.user_id, "r": payload.role_id},
     )
+    await session.commit()
+    invalidate_role_permissions()
     return {"ok": True}
 
 
@@ -382,6 +396,8 @@ async def unassign_user_role(payload: UserRoleAssign, session: AsyncSession = De
         text(f"DELETE FROM {ADMIN}.user_roles WHERE user_id = :u AND role_id = :r"),
         {"u": payload.user_id, "r": payload.role_id},
     )
+    await session.commit()
+    invalidate_role_permissions()
     return {"ok": True}
 
 
@@ -548,6 +564,8 @@ async def assign_role_permission(payload: RolePermissionAssign, session: AsyncSe
         text(f"INSERT INTO {ADMIN}.role_permissions (role_id, permission_id) VALUES (:r, :p) ON CONFLICT DO NOTHING"),
         {"r": payload.role_id, "p": payload.permission_id},
     )
+    await session.commit()
+    invalidate_role_permissions()
     return {"ok": True}
 
 
@@ -565,23 +583,43 @@ async def create_api_key(payload: ApiKeyCreate, context: TenantContext = Depends
     return row
 
 
+async def _ensure_safe_webhook_target(target_url: str) -> None:
+    # Protecao contra SSRF: so URLs http(s) de hosts publicos.
+    try:
+        await check_webhook_target(target_url, settings.webhook_allow_private_targets)
+    except WebhookTargetError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from None
+    except OSError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Nao foi possivel resolver o host do webhook"
+        ) from None
+
+
 @router.get("/webhooks", response_model=list[WebhookResponse])
-async def list_webhooks(session: AsyncSession = Depends(get_session)):
+async def list_webhooks(context: TenantContext = Depends(get_tenant_context), session: AsyncSession = Depends(get_session)):
     await init(session)
-    res = await session.execute(text(f"SELECT webhook_id, event_name, target_url, secret_key, status FROM {ADMIN}.webhooks ORDER BY event_name"))
+    res = await session.execute(
+        text(f"SELECT webhook_id, event_name, target_url, secret_key, status FROM {ADMIN}.webhooks WHERE tenant_id = :t ORDER BY event_name"),
+        {"t": context.tenant_id},
+    )
     return rows_to_list(res)
 
 
 @router.post("/webhooks", response_model=WebhookResponse, status_code=status.HTTP_201_CREATED)
-async def create_webhook(payload: WebhookCreate, session: AsyncSession = Depends(get_session)):
+async def create_webhook(payload: WebhookCreate, context: TenantContext = Depends(get_tenant_context), session: AsyncSession = Depends(get_session)):
     await init(session)
+    await _ensure_safe_webhook_target(payload.target_url)
+    # O webhook so recebe eventos do tenant que o registrou.
     res = await session.execute(
         text(
-            f"INSERT INTO {ADMIN}.webhooks (event_name, target_url, secret_key) VALUES (:e, :u, :s) RETURNING webhook_id, event_name, target_url, secret_key, status"
+            f"INSERT INTO {ADMIN}.webhooks (tenant_id, event_name, target_url, secret_key) VALUES (:t, :e, :u, :s) RETURNING webhook_id, event_name, target_url, secret_key, status"
         ),
-        {"e": payload.event_name, "u": payload.target_url, "s": payload.secret_key},
+        {"t": context.tenant_id, "e": payload.event_name, "u": payload.target_url, "s": payload.secret_key},
     )
-    return dict(res.mappings().first())
+    created = dict(res.mappings().first())
+    await session.commit()
+    webhook_dispatcher.invalidate_subscriptions()
+    return created
 
 
 @router.get("/templates", response_model=list[TemplateResponse])
@@ -745,7 +783,10 @@ async def update_template(template_id: str, payload: TemplateCreate, session: As
     row = res.mappings().first()
     if not row:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template nao encontrado")
-    return dict(row)
+    updated = dict(row)
+    await session.commit()
+    invalidate_template(str(updated["template_id"]))
+    return updated
 
 
 @router.put("/notification/services/{service_type}")
@@ -842,8 +883,26 @@ class WebhookUpdate(BaseModel):
 
 
 @router.patch("/webhooks/{webhook_id}")
-async def update_webhook(webhook_id: str, payload: WebhookUpdate, session: AsyncSession = Depends(get_session)):
+async def update_webhook(webhook_id: str, payload: WebhookUpdate, context: TenantContext = Depends(get_tenant_context), session: AsyncSession = Depends(get_session)):
     await init(session)
+    if payload.active:
+        # Reativar volta a entregar eventos: a URL e validada de novo.
+        target_url = (
+            await session.execute(
+                text(f"SELECT target_url FROM {ADMIN}.webhooks WHERE webhook_id = :id AND tenant_id = :t"),
+                {"id": webhook_id, "t": context.tenant_id},
+            )
+        ).scalar_one_or_none()
+        if target_url is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Webhook nao encontrado")
+        await _ensure_safe_webhook_target(target_url)
     status_val = 'ACTIVE' if payload.active else 'INACTIVE'
-    await session.execute(text(f"UPDATE {ADMIN}.webhooks SET status = :s WHERE webhook_id = :id"), {"s": status_val, "id": webhook_id})
+    res = await session.execute(
+        text(f"UPDATE {ADMIN}.webhooks SET status = :s WHERE webhook_id = :id AND tenant_id = :t"),
+        {"s": status_val, "id": webhook_id, "t": context.tenant_id},
+    )
+    if not res.rowcount:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Webhook nao encontrado")
+    await session.commit()
+    webhook_dispatcher.invalidate_subscriptions()
     return {"ok": True}
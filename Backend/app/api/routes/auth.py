@@ -8,7 +8,9 @@ from app.models import (
     TokenRequest,
     TokenResponse,
 )
+from app.core.config import settings
 from app.db.session import get_session
+from app.security.rbac import role_index
 from app.security.jwt_tenancy import (
     create_access_token,
     get_user_by_email,
@@ -58,15 +60,22 @@ async def login_for_access_token(
     roles = await get_roles_for_user(session, str(db_user["user_id"]))
     if not roles and db_user.get("perfil"):
         roles = [str(db_user.get("perfil")).lower()]
-    token = create_access_token(
-        {
-            "sub": str(db_user["user_id"]),
-            "user_id": str(db_user["user_id"]),
-            "tenant_id": str(db_user["tenant_id"]),
-            "perfil": db_user.get("perfil"),
-            "roles": roles,
-        }
-    )
+    claims = {
+        "sub": str(db_user["user_id"]),
+        "user_id": str(db_user["user_id"]),
+        "tenant_id": str(db_user["tenant_id"]),
+        "perfil": db_user.get("perfil"),
+        "roles": roles,
+    }
+    if settings.jwt_embed_permissions:
+        try:
+            index = await role_index(session)
+        except Exception:
+            index = None  # RBAC indisponivel: token sem digest, require_permission usa os roles
+        if index is not None:
+            claims["perms"] = index.digest_for(roles)
+            claims["pv"] = index.version
+    token = create_access_token(claims)
     return TokenResponse(
         access_token=token,
         userId=str(db_user["user_id"]),
@@ -21,8 +21,8 @@ router = APIRouter()
     response_model=list[WorkflowResponse],
 )
 async def list_workflows(context: TenantContext = Depends(get_tenant_context)):
-    store = data_store.get_store(context.tenant_id)
-    return store.list_workflows()
+    store = await data_store.get_store(context.tenant_id)
+    return await store.list_workflows()
 
 
 @router.post(
@@ -35,8 +35,8 @@ async def save_workflow(
     payload: WorkflowCreate,
     context: TenantContext = Depends(get_tenant_context),
 ) -> WorkflowResponse:
-    store = data_store.get_store(context.tenant_id)
-    return store.save_workflow(payload)
+    store = await data_store.get_store(context.tenant_id)
+    return await store.save_workflow(payload)
 
 
 @router.post(
@@ -48,9 +48,9 @@ async def run_workflow(
     wf_id: str,
     context: TenantContext = Depends(get_tenant_context),
 ) -> WorkflowRunResponse:
-    store = data_store.get_store(context.tenant_id)
+    store = await data_store.get_store(context.tenant_id)
     try:
-        return store.trigger_workflow(wf_id)
+        return await store.trigger_workflow(wf_id)
     except KeyError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workflow nao encontrado.") from None
 
@@ -61,8 +61,8 @@ async def run_workflow(
     response_model=list[AutomationTriggerResponse],
 )
 async def list_triggers(context: TenantContext = Depends(get_tenant_context)):
-    store = data_store.get_store(context.tenant_id)
-    return store.list_triggers()
+    store = await data_store.get_store(context.tenant_id)
+    return await store.list_triggers()
 
 
 @router.post(
@@ -75,8 +75,8 @@ async def create_trigger(
     payload: AutomationTriggerCreate,
     context: TenantContext = Depends(get_tenant_context),
 ) -> AutomationTriggerResponse:
-    store = data_store.get_store(context.tenant_id)
-    return store.create_trigger(payload)
+    store = await data_store.get_store(context.tenant_id)
+    return await store.create_trigger(payload)
 
 
 @router.get(
@@ -85,8 +85,8 @@ async def create_trigger(
     response_model=list[EmailTemplateResponse],
 )
 async def list_templates(context: TenantContext = Depends(get_tenant_context)):
-    store = data_store.get_store(context.tenant_id)
-    return store.list_email_templates()
+    store = await data_store.get_store(context.tenant_id)
+    return await store.list_email_templates()
 
 
 @router.post(
@@ -99,5 +99,5 @@ async def create_template(
     payload: EmailTemplateCreate,
     context: TenantContext = Depends(get_tenant_context),
 ) -> EmailTemplateResponse:
-    store = data_store.get_store(context.tenant_id)
-    return store.create_email_template(payload)
+    store = await data_store.get_store(context.tenant_id)
+    return await store.create_email_template(payload)
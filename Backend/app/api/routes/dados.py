@@ -2,12 +2,21 @@ from __future__ import annotations
 
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.security import TenantContext, get_tenant_context
-from app.dependencies.tenancy import get_tenant_session, get_tenant_session_sqlsafe
+from app.dependencies.tenancy import (
+    TenantScope,
+    get_tenant_scope,
+    get_tenant_session,
+    get_tenant_session_sqlsafe,
+    tenant_query_slot,
+)
 from app.models import (
+    DashboardDataResponse,
     DashboardFavoriteUpdate,
     DashboardListResponse,
     DashboardSaveRequest,
@@ -16,14 +25,22 @@ from app.models import (
     MetaObjectPermissionUpdate,
     MetaObjectResponse,
     SchemasResponse,
+    SQLPlanSummary,
+    SQLResultOpenRequest,
+    SQLResultPage,
     SQLTestRequest,
     SQLTestResponse,
+    WidgetDataResult,
     WidgetPayload,
     WidgetQueryRequest,
     WidgetQueryResponse,
 )
 from app.services import data_store, validar_e_executar_sql_seguro
+from app.services.data_export import EXPORT_FORMATS, EXPORTABLE_ENTITIES, stream_entity
 from app.services.data_store import BASE_TABLES, DEFAULT_PROFILES
+from app.services.no_code_query import invalidate_no_code_cache, run_no_code_batch, run_no_code_query
+from app.services.sql_cost_gate import PlanSummary
+from app.services.sql_result_handles import ResultPage, sql_result_handles
 
 router = APIRouter()
 
@@ -32,23 +49,110 @@ router = APIRouter()
     "/query/test",
     summary="Execute a test SQL query securely",
     response_model=SQLTestResponse,
+    dependencies=[Depends(tenant_query_slot)],
 )
 async def test_sql_query(
     query: SQLTestRequest,
     session: AsyncSession = Depends(get_tenant_session_sqlsafe),
     context: TenantContext = Depends(get_tenant_context),
 ) -> SQLTestResponse:
-    validation = await validar_e_executar_sql_seguro(query.query, session=session)
+    validation = await validar_e_executar_sql_seguro(query.query, session=session, tenant_id=context.tenant_id)
     return SQLTestResponse(
         isValid=True,
         rowsAffected=validation.rows_affected,
         normalizedQuery=validation.normalized_query,
         message=f"Consulta validada para o tenant {context.tenant_id}.",
         time=f"{validation.execution_time_ms}ms",
+        cacheHit=validation.cache_hit,
+        originalTime=(
+            f"{validation.original_execution_time_ms}ms"
+            if validation.original_execution_time_ms is not None
+            else None
+        ),
+        plan=_to_plan_summary(validation.plan),
         results=validation.sample_rows,
     )
 
 
+def _to_plan_summary(plan: PlanSummary | None) -> SQLPlanSummary | None:
+    if plan is None:
+        return None
+    return SQLPlanSummary(**plan.as_dict())
+
+
+def _to_result_page(page: ResultPage) -> SQLResultPage:
+    return SQLResultPage(
+        handleId=page.handle_id,
+        page=page.page,
+        columns=page.columns,
+        rows=page.rows,
+        hasMore=page.has_more,
+        time=f"{page.execution_time_ms}ms",
+        plan=_to_plan_summary(page.plan),
+    )
+
+
+@router.post(
+    "/query/results",
+    summary="Open a paged SQL result and return its first page",
+    response_model=SQLResultPage,
+    dependencies=[Depends(tenant_query_slot)],
+)
+async def open_sql_result(
+    payload: SQLResultOpenRequest,
+    scope: TenantScope = Depends(get_tenant_scope),
+) -> SQLResultPage:
+    page = await sql_result_handles.open(
+        scope.context.tenant_id, scope.schema_name, payload.query, payload.pageSize
+    )
+    return _to_result_page(page)
+
+
+@router.get(
+    "/query/results/{handle_id}",
+    summary="Fetch the next page of an open SQL result",
+    response_model=SQLResultPage,
+)
+async def fetch_sql_result(
+    handle_id: str,
+    context: TenantContext = Depends(get_tenant_context),
+) -> SQLResultPage:
+    return _to_result_page(await sql_result_handles.fetch(context.tenant_id, handle_id))
+
+
+@router.delete(
+    "/query/results/{handle_id}",
+    summary="Close an open SQL result before reading every page",
+    status_code=status.HTTP_204_NO_CONTENT,
+    response_class=Response,
+)
+async def close_sql_result(
+    handle_id: str,
+    context: TenantContext = Depends(get_tenant_context),
+) -> Response:
+    await sql_result_handles.close(context.tenant_id, handle_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.get(
+    "/export/{entity}",
+    summary="Stream a full CRM entity as NDJSON or CSV",
+    response_class=StreamingResponse,
+)
+async def export_entity(
+    entity: str,
+    fmt: str = Query(default="ndjson", alias="format", pattern=r"^(ndjson|csv)$"),
+    scope: TenantScope = Depends(get_tenant_scope),
+) -> StreamingResponse:
+    if entity not in EXPORTABLE_ENTITIES:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Entidade nao exportavel.")
+    return StreamingResponse(
+        stream_entity(scope.schema_name, entity, fmt),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{entity}.{fmt}"'},
+    )
+
+
 @router.get(
     "/meta/schemas",
     summary="List schemas and objects for SchemaBrowser",
@@ -57,8 +161,8 @@ async def test_sql_query(
 async def get_meta_schemas(
     context: TenantContext = Depends(get_tenant_context),
 ) -> SchemasResponse:
-    store = data_store.get_store(context.tenant_id)
-    objetos_custom = [obj.nomeAmigavel for obj in store.list_meta_objects() if obj.tipo == "CUSTOMIZADO"]
+    store = await data_store.get_store(context.tenant_id)
+    objetos_custom = [obj.nomeAmigavel for obj in await store.list_meta_objects() if obj.tipo == "CUSTOMIZADO"]
     return SchemasResponse(tabelasBase=BASE_TABLES, objetosCustom=objetos_custom)
 
 
@@ -70,8 +174,8 @@ async def get_meta_schemas(
 async def list_meta_objects(
     context: TenantContext = Depends(get_tenant_context),
 ) -> list[MetaObjectResponse]:
-    store = data_store.get_store(context.tenant_id)
-    return store.list_meta_objects()
+    store = await data_store.get_store(context.tenant_id)
+    return await store.list_meta_objects()
 
 
 @router.get(
@@ -82,10 +186,10 @@ async def list_meta_objects(
 async def list_available_meta_objects(
     context: TenantContext = Depends(get_tenant_context),
 ) -> list[MetaObjectResponse]:
-    store = data_store.get_store(context.tenant_id)
+    store = await data_store.get_store(context.tenant_id)
     if context.has_role("data_admin"):
-        return store.list_meta_objects()
-    return store.list_meta_objects_for_roles(context.roles)
+        return await store.list_meta_objects()
+    return await store.list_meta_objects_for_roles(context.roles)
 
 
 @router.post(
@@ -98,8 +202,10 @@ async def create_meta_object(
     payload: MetaObjectCreate,
     context: TenantContext = Depends(get_tenant_context),
 ) -> MetaObjectResponse:
-    store = data_store.get_store(context.tenant_id)
-    return store.create_meta_object(payload)
+    store = await data_store.get_store(context.tenant_id)
+    meta = await store.create_meta_object(payload)
+    invalidate_no_code_cache(context.tenant_id)
+    return meta
 
 
 @router.get(
@@ -111,8 +217,8 @@ async def get_meta_object_permissions(
     meta_id: str,
     context: TenantContext = Depends(get_tenant_context),
 ) -> MetaObjectPermissionResponse:
-    store = data_store.get_store(context.tenant_id)
-    record = next((obj for obj in store.list_meta_objects() if obj.metaId == meta_id), None)
+    store = await data_store.get_store(context.tenant_id)
+    record = next((obj for obj in await store.list_meta_objects() if obj.metaId == meta_id), None)
     if not record:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meta objeto nao encontrado.")
     return MetaObjectPermissionResponse(
@@ -131,9 +237,9 @@ async def update_meta_object_permissions(
     payload: MetaObjectPermissionUpdate,
     context: TenantContext = Depends(get_tenant_context),
 ) -> MetaObjectResponse:
-    store = data_store.get_store(context.tenant_id)
+    store = await data_store.get_store(context.tenant_id)
     try:
-        return store.update_permissions(meta_id, payload.profiles)
+        return await store.update_permissions(meta_id, payload.profiles)
     except KeyError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meta objeto nao encontrado.") from None
 
@@ -148,10 +254,11 @@ async def delete_meta_object(
     meta_id: str,
     context: TenantContext = Depends(get_tenant_context),
 ) -> Response:
-    store = data_store.get_store(context.tenant_id)
+    store = await data_store.get_store(context.tenant_id)
     try:
         # Remover meta-objeto; caso ainda esteja vinculado a widgets, store pode recusar no futuro
-        store.delete_meta_object(meta_id)
+        await store.delete_meta_object(meta_id)
+        invalidate_no_code_cache(context.tenant_id)
         return Response(status_code=status.HTTP_204_NO_CONTENT)
     except KeyError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meta objeto nao encontrado.") from None
@@ -165,10 +272,10 @@ async def delete_meta_object(
 async def list_dashboards(
     context: TenantContext = Depends(get_tenant_context),
 ) -> DashboardListResponse:
-    store = data_store.get_store(context.tenant_id)
-    dashboards = store.list_dashboards()
+    store = await data_store.get_store(context.tenant_id)
+    dashboards = await store.list_dashboards()
     for dashboard in dashboards:
-        dashboard.favorite = store.is_favorite(context.user_id, dashboard.id or "")
+        dashboard.favorite = await store.is_favorite(context.user_id, dashboard.id or "")
     return DashboardListResponse(dashboards=dashboards)
 
 
@@ -182,10 +289,10 @@ async def save_dashboard(
     payload: DashboardSaveRequest,
     context: TenantContext = Depends(get_tenant_context),
 ) -> DashboardSaveRequest:
-    store = data_store.get_store(context.tenant_id)
+    store = await data_store.get_store(context.tenant_id)
     payload.ownerId = payload.ownerId or context.user_id
     payload.ownerName = payload.ownerName or context.user_id
-    return store.save_dashboard(payload)
+    return await store.save_dashboard(payload)
 
 
 @router.get(
@@ -197,13 +304,59 @@ async def get_dashboard(
     dashboard_id: str,
     context: TenantContext = Depends(get_tenant_context),
 ) -> DashboardSaveRequest:
-    store = data_store.get_store(context.tenant_id)
-    dashboard = store.get_dashboard(dashboard_id)
+    store = await data_store.get_store(context.tenant_id)
+    dashboard = await store.get_dashboard(dashboard_id)
     if not dashboard:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dashboard nao encontrado.")
     return dashboard
 
 
+@router.get(
+    "/dashboards/{dashboard_id}/data",
+    summary="Evaluate every widget of a dashboard in one call",
+    response_model=DashboardDataResponse,
+)
+async def get_dashboard_data(
+    dashboard_id: str,
+    scope: TenantScope = Depends(get_tenant_scope),
+) -> DashboardDataResponse:
+    store = await data_store.get_store(scope.context.tenant_id)
+    dashboard = await store.get_dashboard(dashboard_id)
+    if not dashboard:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dashboard nao encontrado.")
+
+    specs: list[WidgetQueryRequest] = []
+    queryable: list[WidgetPayload] = []
+    results: dict[str, WidgetDataResult] = {}
+    for widget in dashboard.widgets:
+        try:
+            specs.append(
+                WidgetQueryRequest(
+                    objectId=widget.objectId,
+                    groupBy=widget.groupBy,
+                    aggregate=widget.aggregate.upper(),
+                    aggregateField=widget.aggregateField,
+                )
+            )
+            queryable.append(widget)
+        except ValidationError:
+            results[widget.id] = WidgetDataResult(widgetId=widget.id, rows=widget.data, error="Agregacao invalida.")
+
+    outcomes = await run_no_code_batch(scope.schema_name, store, scope.context.tenant_id, specs)
+    for widget, outcome in zip(queryable, outcomes):
+        if isinstance(outcome, Exception):
+            # Mantem os dados estaticos do widget para o painel continuar renderizando.
+            detail = outcome.detail if isinstance(outcome, HTTPException) else "Falha ao consultar dados."
+            results[widget.id] = WidgetDataResult(widgetId=widget.id, rows=widget.data, error=str(detail))
+        else:
+            results[widget.id] = WidgetDataResult(widgetId=widget.id, rows=outcome)
+
+    return DashboardDataResponse(
+        dashboardId=dashboard_id,
+        widgets=[results[widget.id] for widget in dashboard.widgets],
+    )
+
+
 @router.put(
     "/dashboards/{dashboard_id}",
     summary="Update an existing dashboard",
@@ -214,11 +367,11 @@ async def update_dashboard(
     payload: DashboardSaveRequest,
     context: TenantContext = Depends(get_tenant_context),
 ) -> DashboardSaveRequest:
-    store = data_store.get_store(context.tenant_id)
+    store = await data_store.get_store(context.tenant_id)
     payload.id = dashboard_id
     payload.ownerId = payload.ownerId or context.user_id
     payload.ownerName = payload.ownerName or context.user_id
-    return store.save_dashboard(payload)
+    return await store.save_dashboard(payload)
 
 
 @router.post(
@@ -234,8 +387,8 @@ async def update_dashboard_favorite(
 ) -> Response:
     if not context.user_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Usuario nao identificado")
-    store = data_store.get_store(context.tenant_id)
-    store.set_favorite(context.user_id, dashboard_id, payload.favorite)
+    store = await data_store.get_store(context.tenant_id)
+    await store.set_favorite(context.user_id, dashboard_id, payload.favorite)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -243,17 +396,16 @@ async def update_dashboard_favorite(
     "/query/no-code",
     summary="Execute a no-code query",
     response_model=WidgetQueryResponse,
+    dependencies=[Depends(tenant_query_slot)],
 )
 async def execute_no_code_query(
     query_spec: WidgetQueryRequest,
+    session: AsyncSession = Depends(get_tenant_session_sqlsafe),
     context: TenantContext = Depends(get_tenant_context),
 ) -> WidgetQueryResponse:
-    sample_rows: list[dict[str, Any]] = [
-        {query_spec.groupBy: "Grupo A", query_spec.aggregateField: 42000},
-        {query_spec.groupBy: "Grupo B", query_spec.aggregateField: 31000},
-        {query_spec.groupBy: "Grupo C", query_spec.aggregateField: 18000},
-    ]
-    return WidgetQueryResponse(rows=sample_rows)
+    store = await data_store.get_store(context.tenant_id)
+    rows = await run_no_code_query(session, store, context.tenant_id, query_spec)
+    return WidgetQueryResponse(rows=rows)
 
 
 @router.get(
@@ -264,6 +416,6 @@ async def get_widgets_by_target(
     target_name: str,
     context: TenantContext = Depends(get_tenant_context),
 ) -> dict[str, list[dict[str, Any]]]:
-    store = data_store.get_store(context.tenant_id)
-    widgets: list[WidgetPayload] = store.list_widgets_for_target(target_name)
+    store = await data_store.get_store(context.tenant_id)
+    widgets: list[WidgetPayload] = await store.list_widgets_for_target(target_name)
     return {"widgets": [widget.model_dump(by_alias=True) for widget in widgets]}
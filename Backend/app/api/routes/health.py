@@ -1,9 +1,74 @@
 """Basic service-level endpoints."""
+from typing import Any
+
 from fastapi import APIRouter
 
+from app.db.pool import pool_status
+from app.db.session import AsyncSessionLocal, engine, read_engine, replica_monitor
+from app.services import data_store
+from app.services.event_bus import event_bus
+from app.services.event_notify import event_transport
+from app.services.notification_outbox import notification_outbox
+from app.services.notifications import notification_dispatcher
+from app.services.sql_result_cache import sql_result_cache
+from app.services.sql_result_handles import sql_result_handles
+from app.services.tenant_limiter import tenant_query_limiter
+from app.services.webhooks import webhook_dispatcher
+
 router = APIRouter(prefix="/health", tags=["health"])
 
 
 @router.get("/ping", summary="Health-check endpoint")
 async def ping() -> dict[str, str]:
     return {"status": "ok"}
+
+
+@router.get("/pool", summary="Connection pool usage and checkout wait times")
+async def pool() -> dict[str, Any]:
+    return {
+        "primary": pool_status(engine),
+        "read": pool_status(read_engine) if read_engine is not None else None,
+        "replica": replica_monitor.status(),
+    }
+
+
+@router.get("/data-store", summary="Tenant store LRU usage and eviction counters")
+async def data_store_stats() -> dict[str, Any]:
+    return data_store.stats()
+
+
+@router.get("/sql-cache", summary="Estudio SQL result cache usage")
+async def sql_cache_stats() -> dict[str, Any]:
+    return sql_result_cache.stats()
+
+
+@router.get("/sql-results", summary="Open Estudio SQL result handles (pinned connections)")
+async def sql_results_stats() -> dict[str, Any]:
+    return sql_result_handles.stats()
+
+
+@router.get("/query-limiter", summary="Per-tenant analytic query slots and queue wait times")
+async def query_limiter_stats() -> dict[str, Any]:
+    return tenant_query_limiter.stats()
+
+
+@router.get("/notifications", summary="E-mail send rate, latency and pooled SMTP connections")
+async def notifications_stats() -> dict[str, Any]:
+    return notification_dispatcher.stats()
+
+
+@router.get("/notification-outbox", summary="Template notification outbox throughput and queue depth")
+async def notification_outbox_stats() -> dict[str, Any]:
+    async with AsyncSessionLocal() as session:
+        depth = await notification_outbox.queue_depth(session)
+    return {**notification_outbox.stats(), "queue": depth}
+
+
+@router.get("/webhooks", summary="Webhook delivery counters, queue and per-endpoint backlog")
+async def webhooks_stats() -> dict[str, Any]:
+    return webhook_dispatcher.stats()
+
+
+@router.get("/events", summary="Domain event bus subscribers, drops and LISTEN/NOTIFY transport")
+async def events_stats() -> dict[str, Any]:
+    return {**event_bus.stats(), "transport": event_transport.stats() if event_transport is not None else None}
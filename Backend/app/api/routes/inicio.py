@@ -1,5 +1,3 @@
-from collections import defaultdict
-
 from fastapi import APIRouter, Depends
 
 from app.core.security import TenantContext, get_tenant_context
@@ -8,6 +6,9 @@ from app.services import data_store
 
 router = APIRouter()
 
+# Cartoes de atividade do dashboard: so as mais recentes (a lista completa fica em /atividades).
+DASHBOARD_ACTIVITY_LIMIT = 10
+
 
 def _format_currency(value: float) -> str:
     return f"R$ {value:,.0f}".replace(",", "X").replace(".", ",").replace("X", ".")
@@ -19,37 +20,28 @@ def _format_currency(value: float) -> str:
     response_model=DashboardSummary,
 )
 async def get_dashboard_kpis(context: TenantContext = Depends(get_tenant_context)) -> DashboardSummary:
-    store = data_store.get_store(context.tenant_id)
-    opportunities = store.list_opportunities()
-    leads = store.list_leads()
-    activities = store.list_activities()
+    store = await data_store.get_store(context.tenant_id)
+    kpis = await store.kpis()
+    activities = await store.list_activities(limit=DASHBOARD_ACTIVITY_LIMIT)
 
-    receita_prevista = sum(op.valor for op in opportunities)
-    oportunidades_total = len(opportunities)
-    atividades_abertas = len([act for act in activities if act.status.lower() != "concluido"])
+    receita_prevista = kpis.receita_prevista
 
     kpi_cards = [
         KPIItem(label="Receita prevista", value=_format_currency(receita_prevista), change="+14% vs meta"),
-        KPIItem(label="Atividades em aberto", value=str(atividades_abertas), change="3 novas reunioes"),
-        KPIItem(label="Leads ativos", value=str(len(leads)), change="+5 no ultimo ciclo"),
+        KPIItem(label="Atividades em aberto", value=str(kpis.atividades_abertas), change="3 novas reunioes"),
+        KPIItem(label="Leads ativos", value=str(kpis.leads), change="+5 no ultimo ciclo"),
     ]
 
-    stage_totals: dict[str, dict[str, float]] = defaultdict(lambda: {"valor": 0.0, "count": 0})
-    for opportunity in opportunities:
-        stage = opportunity.stage
-        stage_totals[stage]["valor"] += opportunity.valor
-        stage_totals[stage]["count"] += 1
-
     funnel_stages: list[FunnelStage] = []
-    for index, (stage, totals) in enumerate(stage_totals.items()):
-        amount = _format_currency(totals["valor"])
-        progress = min(1.0, (totals["valor"] / receita_prevista) if receita_prevista else 0.25)
+    for index, (stage, totals) in enumerate(kpis.stages.items()):
+        amount = _format_currency(totals.valor)
+        progress = min(1.0, (totals.valor / receita_prevista) if receita_prevista else 0.25)
         accent_palette = ["#00bcd4", "#8bc34a", "#ffc107", "#1a7cb7"]
         funnel_stages.append(
             FunnelStage(
                 title=stage,
                 amount=amount,
-                items=int(totals["count"]),
+                items=totals.count,
                 progress=float(progress),
                 accent=accent_palette[index % len(accent_palette)],
             )
@@ -71,13 +63,13 @@ async def get_dashboard_kpis(context: TenantContext = Depends(get_tenant_context
 
 @router.get("/atividades", summary="List user's activities")
 async def get_user_activities(context: TenantContext = Depends(get_tenant_context)):
-    store = data_store.get_store(context.tenant_id)
-    return {"items": [activity.model_dump() for activity in store.list_activities()]}
+    store = await data_store.get_store(context.tenant_id)
+    return {"items": [activity.model_dump() for activity in await store.list_activities()]}
 
 
 @router.get("/calendario", summary="List calendar activities")
 async def get_calendar_activities(context: TenantContext = Depends(get_tenant_context)):
-    store = data_store.get_store(context.tenant_id)
+    store = await data_store.get_store(context.tenant_id)
     events = [
         {
             "title": activity.action,
@@ -85,12 +77,12 @@ async def get_calendar_activities(context: TenantContext = Depends(get_tenant_co
             "status": activity.status,
             "date": activity.dueDate.isoformat(),
         }
-        for activity in store.list_activities()
+        for activity in await store.list_activities()
     ]
     return {"events": events}
 
 
 @router.get("/lembretes", summary="List reminders based on activities")
 async def get_reminders(context: TenantContext = Depends(get_tenant_context)):
-    store = data_store.get_store(context.tenant_id)
-    return {"items": store.list_reminders()}
+    store = await data_store.get_store(context.tenant_id)
+    return {"items": await store.list_reminders()}
@@ -2,9 +2,11 @@ from fastapi import APIRouter, Depends, status
 
 from app.core.security import TenantContext, get_tenant_context
 from app.models import CampaignCreate, CampaignResponse, SegmentCreate, SegmentResponse
-from app.dependencies.tenancy import get_tenant_session
+from app.dependencies.tenancy import get_tenant_read_session, get_tenant_session
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.repositories.marketing import MarketingRepository
+from app.services.no_code_query import invalidate_no_code_cache
+from app.services.sql_result_cache import invalidate_sql_results
 
 router = APIRouter()
 
@@ -16,7 +18,7 @@ router = APIRouter()
 )
 async def list_campaigns(
     context: TenantContext = Depends(get_tenant_context),
-    session: AsyncSession = Depends(get_tenant_session),
+    session: AsyncSession = Depends(get_tenant_read_session),
 ):
     repo = MarketingRepository(session=session, context=context)
     return await repo.list_campaigns()
@@ -34,7 +36,11 @@ async def create_campaign(
     session: AsyncSession = Depends(get_tenant_session),
 ) -> CampaignResponse:
     repo = MarketingRepository(session=session, context=context)
-    return await repo.create_campaign(payload)
+    created = await repo.create_campaign(payload)
+    await session.commit()
+    invalidate_sql_results(context.tenant_id, "marketing_campaigns")
+    invalidate_no_code_cache(context.tenant_id)
+    return created
 
 
 @router.get(
@@ -44,7 +50,7 @@ async def create_campaign(
 )
 async def list_segments(
     context: TenantContext = Depends(get_tenant_context),
-    session: AsyncSession = Depends(get_tenant_session),
+    session: AsyncSession = Depends(get_tenant_read_session),
 ):
     repo = MarketingRepository(session=session, context=context)
     return await repo.list_segments()
@@ -62,4 +68,8 @@ async def create_segment(
     session: AsyncSession = Depends(get_tenant_session),
 ) -> SegmentResponse:
     repo = MarketingRepository(session=session, context=context)
-    return await repo.create_segment(payload)
+    created = await repo.create_segment(payload)
+    await session.commit()
+    invalidate_sql_results(context.tenant_id, "marketing_segments")
+    invalidate_no_code_cache(context.tenant_id)
+    return created
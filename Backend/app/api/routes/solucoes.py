@@ -13,8 +13,8 @@ router = APIRouter()
     response_model=list[TradeVisit],
 )
 async def list_trade_visits(context: TenantContext = Depends(get_tenant_context)):
-    store = data_store.get_store(context.tenant_id)
-    return store.list_trade_visits()
+    store = await data_store.get_store(context.tenant_id)
+    return await store.list_trade_visits()
 
 
 @router.get(
@@ -23,5 +23,5 @@ async def list_trade_visits(context: TenantContext = Depends(get_tenant_context)
     response_model=list[SupportTicket],
 )
 async def list_support_tickets(context: TenantContext = Depends(get_tenant_context)):
-    store = data_store.get_store(context.tenant_id)
-    return store.list_support_tickets()
+    store = await data_store.get_store(context.tenant_id)
+    return await store.list_support_tickets()
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Query
 
 from app.core.security import TenantContext, get_tenant_context
 from app.models import (
@@ -6,6 +6,7 @@ from app.models import (
     AccountResponse,
     ContactCreate,
     ContactResponse,
+    ImportReport,
     LeadCreate,
     LeadResponse,
     OpportunityCreate,
@@ -14,10 +15,14 @@ from app.models import (
     ProductResponse,
 )
 from app.services import data_store
-from app.dependencies.tenancy import get_tenant_session
+from app.dependencies.tenancy import TenantScope, get_tenant_read_session, get_tenant_scope, get_tenant_session
+from app.services.bulk_import import IMPORT_FORMATS, IMPORT_TARGETS, import_rows
+from app.services.no_code_query import invalidate_no_code_cache
+from app.services.sql_result_cache import invalidate_sql_results
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.repositories import opportunities as opp_repo
 from app.repositories import contacts as contact_repo
+from app.repositories.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, decode_cursor
 
 router = APIRouter()
 
@@ -28,8 +33,8 @@ router = APIRouter()
     response_model=list[LeadResponse],
 )
 async def list_leads(context: TenantContext = Depends(get_tenant_context)):
-    store = data_store.get_store(context.tenant_id)
-    return store.list_leads()
+    store = await data_store.get_store(context.tenant_id)
+    return await store.list_leads()
 
 
 @router.post(
@@ -39,8 +44,8 @@ async def list_leads(context: TenantContext = Depends(get_tenant_context)):
     status_code=status.HTTP_201_CREATED,
 )
 async def create_lead(payload: LeadCreate, context: TenantContext = Depends(get_tenant_context)):
-    store = data_store.get_store(context.tenant_id)
-    return store.create_lead(payload)
+    store = await data_store.get_store(context.tenant_id)
+    return await store.create_lead(payload)
 
 
 @router.get(
@@ -49,9 +54,9 @@ async def create_lead(payload: LeadCreate, context: TenantContext = Depends(get_
     response_model=LeadResponse,
 )
 async def get_lead(lead_id: str, context: TenantContext = Depends(get_tenant_context)):
-    store = data_store.get_store(context.tenant_id)
+    store = await data_store.get_store(context.tenant_id)
     try:
-        return store.get_lead(lead_id)
+        return await store.get_lead(lead_id)
     except KeyError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lead nao encontrado.") from None
 
@@ -66,9 +71,9 @@ async def update_lead(
     payload: LeadCreate,
     context: TenantContext = Depends(get_tenant_context),
 ):
-    store = data_store.get_store(context.tenant_id)
+    store = await data_store.get_store(context.tenant_id)
     try:
-        return store.update_lead(lead_id, payload)
+        return await store.update_lead(lead_id, payload)
     except KeyError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lead nao encontrado.") from None
 
@@ -80,9 +85,9 @@ async def update_lead(
     response_class=Response,
 )
 async def delete_lead(lead_id: str, context: TenantContext = Depends(get_tenant_context)) -> Response:
-    store = data_store.get_store(context.tenant_id)
+    store = await data_store.get_store(context.tenant_id)
     try:
-        store.delete_lead(lead_id)
+        await store.delete_lead(lead_id)
         return Response(status_code=status.HTTP_204_NO_CONTENT)
     except KeyError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lead nao encontrado.") from None
@@ -94,10 +99,16 @@ async def delete_lead(lead_id: str, context: TenantContext = Depends(get_tenant_
     response_model=list[OpportunityResponse],
 )
 async def list_opportunities(
+    response: Response,
+    cursor: str | None = Query(default=None, description="Valor de X-Next-Cursor da pagina anterior"),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     context: TenantContext = Depends(get_tenant_context),
-    session: AsyncSession = Depends(get_tenant_session),
+    session: AsyncSession = Depends(get_tenant_read_session),
 ):
-    return await opp_repo.list_opportunities(session)
+    page = await opp_repo.list_opportunities(session, limit=limit, after=decode_cursor(cursor))
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
 
 
 @router.post(
@@ -111,7 +122,11 @@ async def create_opportunity(
     context: TenantContext = Depends(get_tenant_context),
     session: AsyncSession = Depends(get_tenant_session),
 ):
-    return await opp_repo.create_opportunity(session, context.tenant_id, payload)
+    created = await opp_repo.create_opportunity(session, context.tenant_id, payload)
+    await session.commit()
+    invalidate_sql_results(context.tenant_id, "tb_oportunidade")
+    invalidate_no_code_cache(context.tenant_id)
+    return created
 
 
 @router.get(
@@ -122,7 +137,7 @@ async def create_opportunity(
 async def get_opportunity(
     op_id: str,
     context: TenantContext = Depends(get_tenant_context),
-    session: AsyncSession = Depends(get_tenant_session),
+    session: AsyncSession = Depends(get_tenant_read_session),
 ):
     found = await opp_repo.get_opportunity(session, op_id)
     if not found:
@@ -144,6 +159,9 @@ async def update_opportunity(
     updated = await opp_repo.update_opportunity(session, op_id, payload)
     if not updated:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Oportunidade nao encontrada.")
+    await session.commit()
+    invalidate_sql_results(context.tenant_id, "tb_oportunidade")
+    invalidate_no_code_cache(context.tenant_id)
     return updated
 
 
@@ -161,6 +179,9 @@ async def delete_opportunity(
     deleted = await opp_repo.delete_opportunity(session, op_id)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Oportunidade nao encontrada.")
+    await session.commit()
+    invalidate_sql_results(context.tenant_id, "tb_oportunidade")
+    invalidate_no_code_cache(context.tenant_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -170,8 +191,8 @@ async def delete_opportunity(
     response_model=list[AccountResponse],
 )
 async def list_accounts(context: TenantContext = Depends(get_tenant_context)):
-    store = data_store.get_store(context.tenant_id)
-    return store.list_accounts()
+    store = await data_store.get_store(context.tenant_id)
+    return await store.list_accounts()
 
 
 @router.post(
@@ -181,8 +202,8 @@ async def list_accounts(context: TenantContext = Depends(get_tenant_context)):
     status_code=status.HTTP_201_CREATED,
 )
 async def create_account(payload: AccountCreate, context: TenantContext = Depends(get_tenant_context)):
-    store = data_store.get_store(context.tenant_id)
-    return store.create_account(payload)
+    store = await data_store.get_store(context.tenant_id)
+    return await store.create_account(payload)
 
 
 @router.get(
@@ -191,10 +212,16 @@ async def create_account(payload: AccountCreate, context: TenantContext = Depend
     response_model=list[ContactResponse],
 )
 async def list_contacts(
+    response: Response,
+    cursor: str | None = Query(default=None, description="Valor de X-Next-Cursor da pagina anterior"),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     context: TenantContext = Depends(get_tenant_context),
-    session: AsyncSession = Depends(get_tenant_session),
+    session: AsyncSession = Depends(get_tenant_read_session),
 ):
-    return await contact_repo.list_contacts(session)
+    page = await contact_repo.list_contacts(session, limit=limit, after=decode_cursor(cursor))
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
 
 
 @router.post(
@@ -208,7 +235,31 @@ async def create_contact(
     context: TenantContext = Depends(get_tenant_context),
     session: AsyncSession = Depends(get_tenant_session),
 ):
-    return await contact_repo.create_contact(session, payload)
+    created = await contact_repo.create_contact(session, payload)
+    await session.commit()
+    invalidate_sql_results(context.tenant_id, "tb_contato")
+    invalidate_no_code_cache(context.tenant_id)
+    return created
+
+
+@router.post(
+    "/import/{entity}",
+    summary="Bulk import contacts or opportunities from a CSV/NDJSON upload",
+    response_model=ImportReport,
+)
+async def import_entity(
+    entity: str,
+    request: Request,
+    fmt: str = Query(default="csv", alias="format", pattern=r"^(csv|ndjson)$"),
+    scope: TenantScope = Depends(get_tenant_scope),
+) -> ImportReport:
+    """Corpo da requisicao e o proprio arquivo (text/csv ou application/x-ndjson)."""
+    if entity not in IMPORT_TARGETS or fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Entidade nao importavel.")
+    report = await import_rows(scope.session, scope.schema_name, entity, fmt, request.stream())
+    invalidate_sql_results(scope.context.tenant_id, IMPORT_TARGETS[entity].table)
+    invalidate_no_code_cache(scope.context.tenant_id)
+    return report
 
 
 @router.get(
@@ -217,8 +268,8 @@ async def create_contact(
     response_model=list[ProductResponse],
 )
 async def list_products(context: TenantContext = Depends(get_tenant_context)):
-    store = data_store.get_store(context.tenant_id)
-    return store.list_products()
+    store = await data_store.get_store(context.tenant_id)
+    return await store.list_products()
 
 
 @router.post(
@@ -228,8 +279,8 @@ async def list_products(context: TenantContext = Depends(get_tenant_context)):
     status_code=status.HTTP_201_CREATED,
 )
 async def create_product(payload: ProductCreate, context: TenantContext = Depends(get_tenant_context)):
-    store = data_store.get_store(context.tenant_id)
-    return store.create_product(payload)
+    store = await data_store.get_store(context.tenant_id)
+    return await store.create_product(payload)
 
 
 @router.get(
@@ -241,10 +292,9 @@ async def scanntech_indicadores(
     loja: str | None = Query(default=None),
     context: TenantContext = Depends(get_tenant_context),
 ) -> dict:
-    store = data_store.get_store(context.tenant_id)
+    store = await data_store.get_store(context.tenant_id)
     # Mock simples baseado nos dados existentes
-    oportunidades = store.list_opportunities()
-    receita_total = sum(getattr(op, "valor", 0.0) for op in oportunidades) if oportunidades else 0.0
+    receita_total = (await store.kpis()).receita_prevista
     kpis = [
         {"label": "Receita Total", "value": receita_total, "change": +12.5},
         {"label": "Novos Clientes", "value": 1800, "change": -3.1},
@@ -5,16 +5,19 @@ from typing import List
 
 from fastapi import Depends, Header, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
 from pydantic import BaseModel
 
 from app.core.config import settings
+from app.security.rbac import has_permission
 
 
 class TenantContext(BaseModel):
     tenant_id: str
     user_id: str
     roles: List[str]
+    # Digest de permissoes do JWT (claims "perms"/"pv"), quando o login o embutiu
+    permissions_digest: str | None = None
+    permissions_version: str | None = None
 
     def has_role(self, role: str) -> bool:
         return role in self.roles
@@ -40,11 +43,14 @@ async def get_tenant_context(
         tenant_id = str(jwt_ctx["tenant_id"])  # normalized
         user_id = str(jwt_ctx["user_id"])  # normalized
         roles = [str(r).lower() for r in (jwt_ctx.get("roles") or [])]
+        permissions_digest = jwt_ctx.get("perms")
+        permissions_version = jwt_ctx.get("pv")
     else:
         tenant_id = x_tenant_id or settings.default_tenant_id
         user_id = x_user_id or settings.default_user_id
         roles_header = x_user_roles or settings.default_user_roles
         roles = [role.strip() for role in roles_header.split(",") if role.strip()]
+        permissions_digest = permissions_version = None
 
     if not tenant_id or not user_id:
         raise HTTPException(
@@ -52,7 +58,13 @@ async def get_tenant_context(
             detail="Missing tenant or user context.",
         )
 
-    return TenantContext(tenant_id=tenant_id, user_id=user_id, roles=roles)
+    return TenantContext(
+        tenant_id=tenant_id,
+        user_id=user_id,
+        roles=roles,
+        permissions_digest=permissions_digest,
+        permissions_version=permissions_version,
+    )
 
 
 def require_roles(*expected_roles: str):
@@ -77,22 +89,14 @@ def require_permission(action_key: str):
             return context
 
         roles = [r.lower() for r in context.roles]
-        if not roles:
+        if not roles and context.permissions_digest is None:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Missing roles.")
 
-        schema = settings.tenant_admin_schema
-        q = text(
-            f"""
-            SELECT 1
-            FROM {schema}.roles r
-            JOIN {schema}.role_permissions rp ON rp.role_id = r.role_id
-            JOIN {schema}.permissions p ON p.permission_id = rp.permission_id
-            WHERE lower(r.name) = ANY(:roles) AND p.action_key = :key
-            LIMIT 1
-            """
+        # Lookup em memoria: digest do JWT se a versao do catalogo bate, senao o indice role -> permissoes.
+        allowed = await has_permission(
+            session, roles, action_key, context.permissions_digest, context.permissions_version
         )
-        res = await session.execute(q, {"roles": roles, "key": action_key})
-        if res.scalar() is None:
+        if not allowed:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permission denied.")
         return context
 
@@ -0,0 +1,98 @@
+"""Connection pool instrumentation for the async engines."""
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from threading import Lock
+from typing import Any
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Upper bounds (ms) of the acquire-time histogram buckets; the last bucket is +inf.
+WAIT_BUCKETS_MS: tuple[float, ...] = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolMetrics:
+    """Acquire-time histogram and counters for a single pool."""
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.bucket_counts = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    def observe(self, wait_ms: float) -> None:
+        with self._lock:
+            self.bucket_counts[bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+            self.acquired += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+
+    def observe_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            labels = [f"le_{int(bound)}ms" for bound in WAIT_BUCKETS_MS] + ["le_inf"]
+            cumulative = 0
+            histogram: dict[str, int] = {}
+            for label, count in zip(labels, self.bucket_counts):
+                cumulative += count
+                histogram[label] = cumulative
+            return {
+                "acquired": self.acquired,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total_ms / self.acquired, 3) if self.acquired else 0.0,
+                "wait_max_ms": round(self.wait_max_ms, 3),
+                "wait_histogram_ms": histogram,
+            }
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waits.
+
+    The measured time covers queue waits and, when the pool grows, the time
+    spent opening the new connection.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):  # type: ignore[override]
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.observe_timeout()
+            raise
+        self.metrics.observe((time.perf_counter() - start) * 1000)
+        return record
+
+
+def pool_status(engine: AsyncEngine) -> dict[str, Any]:
+    pool = engine.sync_engine.pool
+    status: dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+                "max_overflow": pool._max_overflow,
+                "timeout_seconds": pool.timeout(),
+            }
+        )
+    metrics = getattr(pool, "metrics", None)
+    if isinstance(metrics, PoolMetrics):
+        status.update(metrics.snapshot())
+    return status
@@ -0,0 +1,91 @@
+"""Replication-lag probe deciding whether reads may be routed to the replica."""
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from typing import Any, Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Em dia (LSN recebido == aplicado) conta como lag 0; fora de recovery as funcoes retornam NULL -> 0.
+LAG_QUERY = """
+SELECT CASE
+         WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+         ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+       END
+"""
+LAG_PROBE_TIMEOUT_SECONDS = 2.0
+
+
+class ReplicaLagMonitor:
+    """Caches the replica lag for ``check_interval_seconds``; one probe at a time.
+
+    A failed or slow probe marks the replica unusable until the next check,
+    so reads fall back to the primary instead of erroring.
+    """
+
+    def __init__(
+        self,
+        engine: Optional[AsyncEngine],
+        max_lag_seconds: float,
+        check_interval_seconds: float,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.engine = engine
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self._timer = timer
+        self._lock = asyncio.Lock()
+        self._checked_at = -math.inf
+        self.healthy = False
+        self.lag_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.replica_reads = 0
+        self.fallbacks = 0
+
+    def _stale(self) -> bool:
+        return self._timer() - self._checked_at >= self.check_interval_seconds
+
+    async def _query_lag(self) -> Any:
+        assert self.engine is not None
+        async with self.engine.connect() as conn:
+            return (await conn.execute(text(LAG_QUERY))).scalar()
+
+    async def _probe(self) -> None:
+        try:
+            # Inclui o checkout/conexao: replica fora do ar nao pode segurar a requisicao.
+            lag = await asyncio.wait_for(self._query_lag(), LAG_PROBE_TIMEOUT_SECONDS)
+            self.lag_seconds = float(lag or 0)
+            self.healthy = self.lag_seconds <= self.max_lag_seconds
+            self.last_error = None
+        except Exception as exc:
+            self.healthy = False
+            self.lag_seconds = None
+            self.last_error = type(exc).__name__
+        self._checked_at = self._timer()
+
+    async def is_usable(self) -> bool:
+        if self.engine is None:
+            return False
+        if self._stale():
+            async with self._lock:
+                if self._stale():
+                    await self._probe()
+        if self.healthy:
+            self.replica_reads += 1
+        else:
+            self.fallbacks += 1
+        return self.healthy
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "configured": self.engine is not None,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+            "last_error": self.last_error,
+            "replica_reads": self.replica_reads,
+            "fallbacks": self.fallbacks,
+        }
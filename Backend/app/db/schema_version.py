@@ -0,0 +1,39 @@
+"""Compare the database's alembic revision with the migration heads shipped in the code."""
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+from typing import FrozenSet
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+
+
+@lru_cache(maxsize=1)
+def expected_heads() -> FrozenSet[str]:
+    """Head revisions of Backend/migrations (read once per process)."""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(str(BACKEND_ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_ROOT / "migrations"))
+    return frozenset(ScriptDirectory.from_config(config).get_heads())
+
+
+async def current_revisions(conn: AsyncConnection) -> FrozenSet[str]:
+    """Revisions stamped in alembic_version; empty when the database was never migrated."""
+    try:
+        # SAVEPOINT: a tabela ausente nao pode abortar a transacao do chamador.
+        async with conn.begin_nested():
+            res = await conn.execute(text("SELECT version_num FROM alembic_version"))
+            return frozenset(row[0] for row in res)
+    except DBAPIError:
+        return frozenset()
+
+
+async def is_at_head(conn: AsyncConnection) -> bool:
+    heads = expected_heads()
+    return bool(heads) and heads <= await current_revisions(conn)
@@ -1,14 +1,78 @@
 """Database session handling for async SQLAlchemy usage."""
+import time
 from collections.abc import AsyncGenerator
 
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.config import settings
+from app.db.pool import InstrumentedAsyncQueuePool
+from app.db.replica import ReplicaLagMonitor
 
-engine = create_async_engine(settings.database_url, echo=settings.sqlalchemy_echo)
+engine = create_async_engine(
+    settings.database_url,
+    echo=settings.sqlalchemy_echo,
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout_seconds,
+    pool_recycle=settings.db_pool_recycle_seconds,
+    pool_pre_ping=settings.db_pool_pre_ping,
+)
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
+# Replica opcional: sem READ_DATABASE_URL as leituras usam o engine primario.
+read_engine = (
+    create_async_engine(
+        settings.read_database_url,
+        echo=settings.sqlalchemy_echo,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=settings.db_read_pool_size,
+        max_overflow=settings.db_read_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    if settings.read_database_url
+    else None
+)
+# Marca as sessoes da replica: resultados lidos nelas podem estar atrasados em relacao ao primario.
+READ_REPLICA_INFO_KEY = "nexus_read_replica"
+ReadSessionLocal = (
+    async_sessionmaker(read_engine, expire_on_commit=False, info={READ_REPLICA_INFO_KEY: True})
+    if read_engine is not None
+    else AsyncSessionLocal
+)
+replica_monitor = ReplicaLagMonitor(
+    read_engine,
+    max_lag_seconds=settings.read_replica_max_lag_seconds,
+    check_interval_seconds=settings.read_replica_lag_check_seconds,
+)
+
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def read_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    """Replica session factory while its lag is within bounds, else the primary's."""
+    if await replica_monitor.is_usable():
+        return ReadSessionLocal
+    return AsyncSessionLocal
+
+
+def reads_replica(session: AsyncSession) -> bool:
+    """Whether ``session`` reads the (possibly lagging) replica."""
+    return bool(session.info.get(READ_REPLICA_INFO_KEY))
+
+
+def data_as_of(session: AsyncSession) -> float:
+    """time.monotonic() the session's reads are at least as recent as.
+
+    Take it before running the query. On the replica it is moved back by the
+    tolerated lag (READ_REPLICA_MAX_LAG_SECONDS): a write invalidated after
+    that instant may be missing from the result.
+    """
+    now = time.monotonic()
+    return now - replica_monitor.max_lag_seconds if reads_replica(session) else now
+
@@ -0,0 +1,103 @@
+"""Single-pass SQL tokenizer shared by the SQL guard and the migration runner.
+
+Understands the Postgres quoting rules that matter for statement splitting
+and keyword checks: '...' strings (with '' escapes and E'...' backslash
+escapes), "..." identifiers, $tag$...$tag$ bodies, -- and /* */ comments.
+Unterminated strings/comments run to the end of the input.
+"""
+from __future__ import annotations
+
+import re
+from typing import List, NamedTuple, Sequence
+
+STRING = "string"
+QUOTED_IDENT = "quoted_ident"
+WORD = "word"
+NUMBER = "number"
+SEMICOLON = "semicolon"
+PUNCT = "punct"
+END = "end"
+
+# Cada match = espacos/comentarios ("trivia") + um token; assim a trivia nao gera
+# objetos e o numero de matches cai pela metade em SQL formatado.
+_TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<trivia>(?:\s+|--[^\n]*|/\*.*?(?:\*/|\Z))*)
+    (?:
+      (?P<string>
+          [Ee]'(?:[^'\\]|\\.|'')*(?:'|\Z)
+        | [BbXxNn]?'(?:[^']|'')*(?:'|\Z)
+        | \$(?P<tag>[A-Za-z_][A-Za-z0-9_]*|)\$.*?(?:\$(?P=tag)\$|\Z)
+      )
+    | (?P<quoted_ident>"(?:[^"]|"")*(?:"|\Z))
+    | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+    | (?P<number>\d+(?:\.\d*)?(?:[Ee][+-]?\d+)?|\.\d+(?:[Ee][+-]?\d+)?)
+    | (?P<semicolon>;)
+    | (?P<end>\Z)
+    | (?P<punct>.)
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+    start: int
+
+    @property
+    def upper(self) -> str:
+        return self.text.upper()
+
+
+def tokenize(sql: str) -> List[Token]:
+    """Code tokens of ``sql``; whitespace and comments are skipped."""
+    tokens: List[Token] = []
+    append = tokens.append
+    for match in _TOKEN_PATTERN.finditer(sql):
+        # lastgroup e o grupo externo mesmo no dollar-quote (o grupo "tag" fecha antes).
+        kind = match.lastgroup
+        if kind == END or kind == "trivia":
+            continue
+        start = match.end("trivia")
+        append(Token(kind, sql[start : match.end()], start))  # type: ignore[arg-type]
+    return tokens
+
+
+def split_code(tokens: Sequence[Token]) -> List[List[Token]]:
+    """Group tokens per statement (semicolons excluded, empty statements dropped)."""
+    statements: List[List[Token]] = []
+    current: List[Token] = []
+    for token in tokens:
+        if token.kind == SEMICOLON:
+            if current:
+                statements.append(current)
+                current = []
+        else:
+            current.append(token)
+    if current:
+        statements.append(current)
+    return statements
+
+
+def split_statements(sql: str) -> List[str]:
+    """Split a script on top-level semicolons, keeping comments inside statements.
+
+    Every statement but an unterminated tail is returned with its ';'.
+    """
+    statements: List[str] = []
+    buf: List[str] = []
+    for match in _TOKEN_PATTERN.finditer(sql):
+        if match.lastgroup == SEMICOLON:
+            buf.append(match.group("trivia"))
+            stmt = "".join(buf).strip()
+            if stmt:
+                statements.append(stmt + ";")
+            buf = []
+            continue
+        buf.append(match.group())
+    tail = "".join(buf).strip()
+    if tail:
+        statements.append(tail)
+    return statements
@@ -1,15 +1,46 @@
-from sqlalchemy import text
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+SEARCH_PATH_INFO_KEY = "nexus_search_path"
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_search_path(session: Session, transaction) -> None:
+    # set_config(..., true) vale apenas para a transacao corrente: apos commit/rollback
+    # o search_path precisa ser reaplicado.
+    if transaction.parent is None:
+        session.info.pop(SEARCH_PATH_INFO_KEY, None)
+
+
+def _already_applied(session: AsyncSession, path: str) -> bool:
+    return session.in_transaction() and session.info.get(SEARCH_PATH_INFO_KEY) == path
 
 
 async def set_tenant_search_path(session: AsyncSession, tenant_schema: str) -> None:
     """Set search_path for the current transaction to the tenant schema and tenant_admin.
 
-    Use at the beginning of a request-bound transaction.
+    Use at the beginning of a request-bound transaction. Calling it again within
+    the same transaction is a no-op (no extra round-trip).
     """
+    path = f"{tenant_schema}, tenant_admin"
+    if _already_applied(session, path):
+        return
     # Postgres nao aceita bind parameters em SET LOCAL search_path.
     # Usamos set_config com is_local=True para efeito transacional e parametro seguro.
     await session.execute(
         text("SELECT set_config('search_path', :path, true)"),
-        {"path": f"{tenant_schema}, tenant_admin"},
+        {"path": path},
+    )
+    session.info[SEARCH_PATH_INFO_KEY] = path
+
+
+async def set_sqlsafe_search_path(session: AsyncSession, tenant_schema: str, statement_timeout_ms: int) -> None:
+    """Restrict search_path to the tenant schema and set statement_timeout in one round-trip."""
+    path = tenant_schema
+    await session.execute(
+        text("SELECT set_config('search_path', :path, true), set_config('statement_timeout', :ms, true)"),
+        {"path": path, "ms": str(int(statement_timeout_ms))},
     )
+    session.info[SEARCH_PATH_INFO_KEY] = path
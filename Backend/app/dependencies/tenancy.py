@@ -1,42 +1,94 @@
 from __future__ import annotations
 
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Dict
+
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_session
-from app.db.utils import set_tenant_search_path
+from app.core.security import TenantContext, get_tenant_context
+from app.db.session import AsyncSessionLocal, get_session, read_sessionmaker
+from app.db.utils import set_sqlsafe_search_path, set_tenant_search_path
 from app.security.jwt_tenancy import validar_jwt_e_tenant
+from app.services.event_bus import TENANT_INFO_KEY
+from app.services.tenant_limiter import tenant_query_limiter
 
+SQLSAFE_STATEMENT_TIMEOUT_MS = 3000
 
-async def get_tenant_session(
-    user: dict = Depends(validar_jwt_e_tenant),
-    session: AsyncSession = Depends(get_session),
-) -> AsyncSession:
-    await set_tenant_search_path(session, user["schema_name"])
-    return session
 
+@dataclass(slots=True)
+class TenantScope:
+    """Request-scoped tenant context plus the single pooled session of the request.
+
+    FastAPI caches dependencies per request, so the JWT is decoded once
+    (validar_jwt_e_tenant), the tenant schema is resolved once (cached across
+    requests) and every dependency below shares the same AsyncSession, except
+    the read-only ones, which may use a session on the read replica.
+    """
+
+    context: TenantContext
+    schema_name: str
+    session: AsyncSession
 
-async def get_tenant_session_sqlsafe(
-    user: dict = Depends(validar_jwt_e_tenant),
+
+async def get_tenant_scope(
+    user: Dict[str, Any] = Depends(validar_jwt_e_tenant),
+    context: TenantContext = Depends(get_tenant_context),
     session: AsyncSession = Depends(get_session),
-) -> AsyncSession:
-    """Tenant-scoped session restricted for SQL Studio.
+) -> TenantScope:
+    # Tenant dos eventos de dominio publicados no commit desta sessao
+    session.info[TENANT_INFO_KEY] = context.tenant_id
+    return TenantScope(context=context, schema_name=user["schema_name"], session=session)
+
+
+async def get_tenant_session(scope: TenantScope = Depends(get_tenant_scope)) -> AsyncSession:
+    # search_path aplicado apenas aqui (uma vez por transacao), nao mais no validar_jwt_e_tenant.
+    await set_tenant_search_path(scope.session, scope.schema_name)
+    return scope.session
+
+
+@asynccontextmanager
+async def _read_session(scope: TenantScope) -> AsyncIterator[AsyncSession]:
+    """The request's own session, or a replica session replacing it (never both at once)."""
+    factory = await read_sessionmaker()
+    if factory is AsyncSessionLocal:
+        yield scope.session
+        return
+    if scope.session.in_transaction():
+        # validar_jwt_e_tenant usou a sessao primaria (cache miss): devolve a conexao antes de abrir a da replica.
+        await scope.session.rollback()
+    async with factory() as session:
+        yield session
+
+
+async def get_tenant_read_session(scope: TenantScope = Depends(get_tenant_scope)) -> AsyncIterator[AsyncSession]:
+    """Like get_tenant_session, but on the read replica while its lag is within bounds.
+
+    Only for read-only handlers: the session may point at a hot standby.
+    """
+    async with _read_session(scope) as session:
+        await set_tenant_search_path(session, scope.schema_name)
+        yield session
+
+
+async def get_tenant_session_sqlsafe(scope: TenantScope = Depends(get_tenant_scope)) -> AsyncIterator[AsyncSession]:
+    """Tenant-scoped session restricted for SQL Studio (replica when available).
 
     - search_path only to tenant schema (no tenant_admin)
     - set statement_timeout to 3s for safety
     """
-    # Restrict search_path to tenant schema only
-    await session.execute(
-        __import__("sqlalchemy", fromlist=["text"]).text(
-            "SELECT set_config('search_path', :path, true)"
-        ),
-        {"path": f"{user['schema_name']}"},
-    )
-    # Set a conservative statement_timeout (in ms)
-    await session.execute(
-        __import__("sqlalchemy", fromlist=["text"]).text(
-            "SET LOCAL statement_timeout = :ms"
-        ),
-        {"ms": 3000},
-    )
-    return session
+    async with _read_session(scope) as session:
+        await set_sqlsafe_search_path(session, scope.schema_name, SQLSAFE_STATEMENT_TIMEOUT_MS)
+        yield session
+
+
+async def tenant_query_slot(context: TenantContext = Depends(get_tenant_context)) -> AsyncIterator[None]:
+    """Hold a tenant_query_limiter slot for the whole request.
+
+    Declare it in the route ``dependencies`` so the slot is taken before the
+    session dependency checks a connection out of the pool.
+    """
+    async with tenant_query_limiter.slot(context.tenant_id):
+        yield
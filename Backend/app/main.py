@@ -1,4 +1,8 @@
 """Entry-point for the Nexus CRM FastAPI application."""
+import asyncio
+import contextlib
+from collections.abc import AsyncIterator
+
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -16,7 +20,57 @@ from app.api.routes import (
     vendas,
 )
 from app.core.config import settings
+from app.repositories.pagination import NEXT_CURSOR_HEADER
 from app.security.jwt_tenancy import validar_jwt_e_tenant
+from app.db.session import AsyncSessionLocal, engine
+from app.services import data_store
+from app.services.admin_config_store import bootstrap_admin_config_schema
+from app.services.event_bus import event_bus
+from app.services.event_notify import event_transport
+from app.services.event_subscribers import register_default_subscribers
+from app.services.kpi_aggregate import run_kpi_consistency_loop
+from app.services.notification_outbox import notification_outbox, run_outbox_worker
+from app.services.notifications import notification_dispatcher
+from app.services.sql_result_handles import run_sql_result_reaper, sql_result_handles
+from app.services.webhooks import run_webhook_dispatcher, webhook_dispatcher
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    # DDL das tabelas de admin config fora do caminho das requisicoes.
+    await bootstrap_admin_config_schema(engine)
+    tasks: list[asyncio.Task] = []
+    if settings.kpi_consistency_interval_seconds > 0:
+        tasks.append(
+            asyncio.create_task(run_kpi_consistency_loop(data_store, settings.kpi_consistency_interval_seconds))
+        )
+    tasks.append(
+        asyncio.create_task(
+            run_sql_result_reaper(sql_result_handles, max(1.0, settings.sql_result_handle_idle_seconds / 2))
+        )
+    )
+    tasks.append(asyncio.create_task(run_webhook_dispatcher(webhook_dispatcher)))
+    register_default_subscribers(event_bus)
+    event_bus.start()
+    if event_transport is not None:
+        tasks.append(asyncio.create_task(event_transport.run()))
+    tasks.extend(
+        asyncio.create_task(
+            run_outbox_worker(notification_outbox, AsyncSessionLocal, settings.notification_outbox_poll_seconds)
+        )
+        for _ in range(settings.notification_outbox_workers)
+    )
+    try:
+        yield
+    finally:
+        # Esvazia as filas dos assinantes antes de parar o envio de webhooks.
+        await event_bus.stop()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await sql_result_handles.close_all()
+        await notification_dispatcher.close()
+        await webhook_dispatcher.close()
 
 
 def get_application() -> FastAPI:
@@ -25,6 +79,7 @@ def get_application() -> FastAPI:
         version=settings.api_version,
         docs_url="/docs",
         openapi_url=f"{settings.api_prefix}/openapi.json",
+        lifespan=lifespan,
     )
 
     # CORS: usar lista de dominios em producao; no dev, liberar geral.
@@ -39,6 +94,7 @@ def get_application() -> FastAPI:
             allow_credentials=True,
             allow_methods=["*"],
             allow_headers=["*"],
+            expose_headers=[NEXT_CURSOR_HEADER],
         )
 
     app.include_router(health.router, tags=["Health"])  # public
@@ -14,11 +14,15 @@ from .data import (
     ContactResponse,
     DashboardListResponse,
     DashboardSaveRequest,
+    DashboardDataResponse,
     DashboardFavoriteUpdate,
     DashboardSummary,
     EmailTemplateCreate,
     EmailTemplateResponse,
     FunnelStage,
+    ImportBatchReport,
+    ImportRejectedRow,
+    ImportReport,
     KPIItem,
     LeadCreate,
     LeadResponse,
@@ -34,6 +38,9 @@ from .data import (
     SchemasResponse,
     SegmentCreate,
     SegmentResponse,
+    SQLPlanSummary,
+    SQLResultOpenRequest,
+    SQLResultPage,
     SQLTestRequest,
     SQLTestResponse,
     SupportTicket,
@@ -44,6 +51,7 @@ from .data import (
     WorkflowCreate,
     WorkflowResponse,
     WorkflowRunResponse,
+    WidgetDataResult,
     WidgetPayload,
     WidgetQueryRequest,
     WidgetQueryResponse,
@@ -63,11 +71,15 @@ __all__ = [
     "ContactResponse",
     "DashboardListResponse",
     "DashboardSaveRequest",
+    "DashboardDataResponse",
     "DashboardFavoriteUpdate",
     "DashboardSummary",
     "EmailTemplateCreate",
     "EmailTemplateResponse",
     "FunnelStage",
+    "ImportBatchReport",
+    "ImportRejectedRow",
+    "ImportReport",
     "KPIItem",
     "LeadCreate",
     "LeadResponse",
@@ -83,6 +95,9 @@ __all__ = [
     "SchemasResponse",
     "SegmentCreate",
     "SegmentResponse",
+    "SQLPlanSummary",
+    "SQLResultOpenRequest",
+    "SQLResultPage",
     "SQLTestRequest",
     "SQLTestResponse",
     "SupportTicket",
@@ -93,6 +108,7 @@ __all__ = [
     "WorkflowCreate",
     "WorkflowResponse",
     "WorkflowRunResponse",
+    "WidgetDataResult",
     "WidgetPayload",
     "WidgetQueryRequest",
     "WidgetQueryResponse",
@@ -21,15 +21,42 @@ class SQLTestRequest(BaseModel):
     query: str = Field(..., description="SQL query that must be validated (SELECT only).")
 
 
+class SQLPlanSummary(BaseModel):
+    totalCost: float
+    planRows: float
+    nodeType: str
+    relations: List[str] = Field(default_factory=list)
+    seqScans: int = 0
+    budget: float | None = None
+
+
 class SQLTestResponse(BaseModel):
     isValid: bool = Field(alias="isValid")
     rowsAffected: int = 0
     normalizedQuery: str | None = None
     message: str | None = None
     time: str | None = None
+    cacheHit: bool = False
+    originalTime: str | None = Field(default=None, description="Execution time of the query that filled the cache.")
+    plan: SQLPlanSummary | None = Field(default=None, description="EXPLAIN estimate checked against the tenant budget.")
     results: List[dict[str, Any]] = Field(default_factory=list)
 
 
+class SQLResultOpenRequest(BaseModel):
+    query: str = Field(..., description="SQL query that must be validated (SELECT only).")
+    pageSize: int = Field(default=100, ge=1, le=1000)
+
+
+class SQLResultPage(BaseModel):
+    handleId: str | None = Field(default=None, description="Null when the result fit in this page.")
+    page: int = 1
+    columns: List[str] = Field(default_factory=list)
+    rows: List[dict[str, Any]] = Field(default_factory=list)
+    hasMore: bool = False
+    time: str | None = None
+    plan: SQLPlanSummary | None = None
+
+
 class MetaObjectCreate(BaseModel):
     idObjeto: str = Field(..., description="Technical identifier, e.g. obj_vendas_por_visita")
     nomeAmigavel: str = Field(..., description="Business friendly name")
@@ -50,6 +77,7 @@ class MetaObjectResponse(BaseModel):
     status: str
     profiles: List[UserProfile] = Field(default_factory=list)
     descricao: str | None = None
+    sqlQuery: str | None = None
     fields: List[str] = Field(default_factory=list)
 
 
@@ -106,6 +134,17 @@ class WidgetQueryResponse(BaseModel):
     rows: List[dict[str, Any]] = Field(default_factory=list)
 
 
+class WidgetDataResult(BaseModel):
+    widgetId: str
+    rows: List[dict[str, Any]] = Field(default_factory=list)
+    error: str | None = Field(default=None, description="Set when the static widget data was used instead.")
+
+
+class DashboardDataResponse(BaseModel):
+    dashboardId: str
+    widgets: List[WidgetDataResult] = Field(default_factory=list)
+
+
 # ---------------------------------------------------------------------------
 # Sales / Marketing / Activities
 # ---------------------------------------------------------------------------
@@ -328,6 +367,32 @@ class EmailTemplateResponse(EmailTemplateBase):
     ultimaAtualizacao: datetime
 
 
+# ---------------------------------------------------------------------------
+# Bulk import
+# ---------------------------------------------------------------------------
+
+
+class ImportBatchReport(BaseModel):
+    batch: int
+    rows: int
+    imported: int
+    rejected: int
+
+
+class ImportRejectedRow(BaseModel):
+    line: int
+    errors: List[str]
+
+
+class ImportReport(BaseModel):
+    entity: str
+    totalRows: int = 0
+    imported: int = 0
+    rejected: int = 0
+    batches: List[ImportBatchReport] = Field(default_factory=list)
+    rejectedRows: List[ImportRejectedRow] = Field(default_factory=list)
+
+
 # ---------------------------------------------------------------------------
 # Authentication
 # ---------------------------------------------------------------------------
@@ -0,0 +1,74 @@
+"""
+Per-request latency of /api/v1/admin/config/roles with and without the schema DDL.
+
+"before" resets the process-wide "schema verified" flag ahead of every
+request, which reproduces the old behaviour (CREATE ... IF NOT EXISTS for
+every admin config table on each call); "after" runs with the flag set by
+the startup bootstrap.
+
+Usage:
+  cd Backend
+  python -m app.ops.bench_admin_config --tenant-id <TENANT_UUID> --user-id <USER_UUID>
+  python -m app.ops.bench_admin_config --tenant-id <TENANT_UUID> --user-id <USER_UUID> -n 500
+
+Notes:
+- The token carries the "admin" role, so require_permission adds no query.
+- Expected: 23 statements/request before (22 DDL + SELECT), 1 after.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Any
+
+from sqlalchemy import event
+
+from app.db.session import engine
+from app.ops.bench_request_roundtrips import _call
+from app.security.jwt_tenancy import create_access_token
+from app.services import admin_config_store
+
+PATH = "/api/v1/admin/config/roles"
+
+
+async def _run(token: str, requests: int, reset_flag: bool) -> tuple[float, float, int]:
+    statements = 0
+
+    def _count(*_: Any) -> None:
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _count)
+    status_code = 0
+    elapsed = 0.0
+    try:
+        for _ in range(requests):
+            if reset_flag:
+                admin_config_store._schema_verified = False
+            start = time.perf_counter()
+            status_code = await _call(PATH, token)
+            elapsed += time.perf_counter() - start
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _count)
+    return elapsed / requests * 1000, statements / requests, status_code
+
+
+async def main(tenant_id: str, user_id: str, requests: int) -> None:
+    token = create_access_token({"user_id": user_id, "tenant_id": tenant_id, "roles": ["admin"]})
+    await admin_config_store.bootstrap_admin_config_schema(engine)
+    await _call(PATH, token)  # aquece o cache de tenant e o pool
+
+    for label, reset_flag in (("before (DDL per request)", True), ("after (verified flag)", False)):
+        ms, stmts, status_code = await _run(token, requests, reset_flag)
+        print(f"{label:26}: status={status_code} {stmts:6.2f} statements/request {ms:8.2f} ms/request")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Admin config per-request latency, before/after")
+    parser.add_argument("--tenant-id", required=True)
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("-n", "--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.tenant_id, args.user_id, args.requests))
@@ -0,0 +1,86 @@
+"""
+Memory benchmark for the DataStore tenant LRU.
+
+Creates N tenants on the memory backend, touching a subset of collections
+per tenant (lazy seeding only materializes those), and reports traced
+memory, time per first access and the LRU counters.
+
+Usage:
+  cd Backend
+  python -m app.ops.bench_data_store
+  python -m app.ops.bench_data_store --tenants 10000 --max-tenants 0 --max-bytes 0
+  python -m app.ops.bench_data_store --collections leads,opportunities,dashboards,meta_objects
+
+Notes:
+- --max-tenants/--max-bytes 0 disables the limit (the previous unbounded
+  behaviour, useful as a baseline).
+- bytes is the serialized JSON size tracked by MemoryStoreBackend; the
+  traced memory is the real Python footprint.
+- Reference run, 10k tenants: ~286 MiB with every collection seeded and no
+  limits (the old eager seeding), ~73 MiB touching 3 collections, ~7 MiB
+  with the default 1000-tenant LRU.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from app.core.config import settings
+from app.services.data_store import DataStore
+
+# Colecao -> metodo de leitura usado para toca-la.
+READERS = {
+    "meta_objects": "list_meta_objects",
+    "dashboards": "list_dashboards",
+    "leads": "list_leads",
+    "opportunities": "list_opportunities",
+    "accounts": "list_accounts",
+    "contacts": "list_contacts",
+    "products": "list_products",
+    "campaigns": "list_campaigns",
+    "segments": "list_segments",
+    "activities": "list_activities",
+    "trade_visits": "list_trade_visits",
+    "support_tickets": "list_support_tickets",
+    "workflows": "list_workflows",
+    "triggers": "list_triggers",
+    "email_templates": "list_email_templates",
+}
+
+
+async def main(tenants: int, max_tenants: int, max_bytes: int, collections: list[str]) -> None:
+    settings.data_store_backend = "memory"
+    store_registry = DataStore(max_tenants=max_tenants, max_bytes=max_bytes)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(tenants):
+        store = await store_registry.get_store(f"bench_tenant_{i}")
+        for collection in collections:
+            await getattr(store, READERS[collection])()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{tenants} tenants, collections={','.join(collections) or '-'}: "
+        f"{elapsed / tenants * 1000:.3f} ms/tenant, "
+        f"traced current={current / 1024 / 1024:.1f} MiB peak={peak / 1024 / 1024:.1f} MiB"
+    )
+    print(store_registry.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DataStore tenant LRU memory benchmark")
+    parser.add_argument("--tenants", type=int, default=10000)
+    parser.add_argument("--max-tenants", type=int, default=settings.data_store_max_tenants)
+    parser.add_argument("--max-bytes", type=int, default=settings.data_store_max_bytes)
+    parser.add_argument("--collections", default="leads,opportunities,activities")
+    args = parser.parse_args()
+    selected = [c for c in args.collections.split(",") if c]
+    unknown = sorted(set(selected) - READERS.keys())
+    if unknown:
+        parser.error(f"colecoes desconhecidas: {', '.join(unknown)}")
+    asyncio.run(main(args.tenants, args.max_tenants, args.max_bytes, selected))
@@ -0,0 +1,160 @@
+"""
+E-mail send throughput against a local stand-in SMTP server, before/after pooling.
+
+"before" reproduces the old /notification/test-email path: a new blocking
+smtplib connection per message, opened on the event loop. "after" goes
+through app.services.notifications (worker threads, reused connections).
+Both report messages/s, connections opened, and the worst event-loop stall
+seen by a 10 ms ticker running alongside the sends.
+
+Usage:
+  cd Backend
+  python -m app.ops.bench_notifications
+  python -m app.ops.bench_notifications -n 500 --concurrency 20 --latency-ms 5
+
+Notes:
+- The stand-in server speaks just enough SMTP (EHLO/MAIL/RCPT/DATA/NOOP/RSET/QUIT)
+  and sleeps --latency-ms on every reply to emulate a remote relay.
+- No credentials and no STARTTLS: the run never leaves localhost.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import smtplib
+import threading
+import time
+from typing import Awaitable, Callable
+
+from app.services.notifications import NotificationDispatcher, SMTPCredentials, build_email
+
+
+class StandInSMTPServer:
+    """Minimal SMTP sink on 127.0.0.1, served from its own thread and event loop."""
+
+    def __init__(self, latency_ms: float) -> None:
+        self.latency = latency_ms / 1000
+        self.connections = 0
+        self.messages = 0
+        self.port = 0
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    async def _reply(self, writer: asyncio.StreamWriter, line: str) -> None:
+        await asyncio.sleep(self.latency)
+        writer.write(f"{line}\r\n".encode())
+        await writer.drain()
+
+    async def _session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        await self._reply(writer, "220 stand-in ESMTP")
+        try:
+            while line := await reader.readline():
+                verb = line.decode(errors="replace").strip().split(" ", 1)[0].upper()
+                if verb in ("EHLO", "HELO"):
+                    await self._reply(writer, "250 stand-in")
+                elif verb == "DATA":
+                    await self._reply(writer, "354 end with <CRLF>.<CRLF>")
+                    while (await reader.readline()) not in (b".\r\n", b""):
+                        pass
+                    self.messages += 1
+                    await self._reply(writer, "250 queued")
+                elif verb == "QUIT":
+                    await self._reply(writer, "221 bye")
+                    break
+                else:  # MAIL, RCPT, NOOP, RSET
+                    await self._reply(writer, "250 ok")
+        finally:
+            writer.close()
+
+    def _serve(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(asyncio.start_server(self._session, "127.0.0.1", 0))
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self) -> None:
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+async def _max_loop_stall(work: Callable[[], Awaitable[None]]) -> float:
+    stall = 0.0
+    done = False
+
+    async def ticker() -> None:
+        nonlocal stall
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            stall = max(stall, time.perf_counter() - start - 0.01)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0)  # o ticker precisa estar rodando antes dos envios
+    try:
+        await work()
+    finally:
+        done = True
+        await tick
+    return stall * 1000
+
+
+async def _run(label: str, server: StandInSMTPServer, messages: int, concurrency: int, send: Callable[[int], Awaitable[None]]) -> None:
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with gate:
+            await send(i)
+
+    opened = server.connections
+    start = time.perf_counter()
+    stall_ms = await _max_loop_stall(lambda: asyncio.gather(*(one(i) for i in range(messages))))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:28}: {messages / elapsed:8.1f} msg/s  "
+        f"{server.connections - opened:5d} connections  max loop stall {stall_ms:8.1f} ms"
+    )
+
+
+async def main(messages: int, concurrency: int, latency_ms: float) -> None:
+    server = StandInSMTPServer(latency_ms)
+    server.start()
+    creds = SMTPCredentials.from_mapping(
+        {"host": "127.0.0.1", "port": server.port, "use_tls": False, "from": "bench@example.com"}
+    )
+
+    async def before(i: int) -> None:
+        # Caminho antigo: conexao nova e smtplib bloqueante direto no event loop.
+        message = build_email(creds.sender, f"user{i}@example.com", "bench", "<p>oi</p>", None)
+        with smtplib.SMTP(host=creds.host, port=creds.port) as smtp:
+            smtp.ehlo()
+            smtp.sendmail(creds.sender, [f"user{i}@example.com"], message)
+
+    dispatcher = NotificationDispatcher(
+        max_connections=concurrency, idle_seconds=30, worker_threads=concurrency, timeout_seconds=10
+    )
+
+    async def after(i: int) -> None:
+        await dispatcher.send_email(creds, f"user{i}@example.com", "bench", html="<p>oi</p>")
+
+    try:
+        await _run("before (connect per message)", server, messages, concurrency, before)
+        await _run("after (pooled, threads)", server, messages, concurrency, after)
+        print(dispatcher.stats())
+    finally:
+        await dispatcher.close()
+        server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SMTP send throughput against a local stand-in server")
+    parser.add_argument("-n", "--messages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.concurrency, args.latency_ms))
@@ -0,0 +1,93 @@
+"""
+Count database round-trips per request for a protected endpoint.
+
+Drives the ASGI app in-process (no HTTP server), with a token minted for an
+existing tenant, and counts every statement sent through the shared engine.
+
+Usage:
+  cd Backend
+  python -m app.ops.bench_request_roundtrips --tenant-id <TENANT_UUID> --user-id <USER_UUID>
+  python -m app.ops.bench_request_roundtrips --tenant-id <TENANT_UUID> --user-id <USER_UUID> --path /api/v1/vendas/contatos -n 200
+
+Notes:
+- The first request warms the tenant schema cache; it is reported separately.
+- Expected for /api/v1/vendas/oportunidades: 2 statements per request in steady
+  state (set_config + SELECT). The previous dependency chain issued 4 (tenant
+  lookup + set_config in validar_jwt_e_tenant, set_config again in
+  get_tenant_session, SELECT).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Any
+
+from sqlalchemy import event
+
+from app.db.session import engine
+from app.main import app
+from app.security.jwt_tenancy import create_access_token
+
+
+async def _call(path: str, token: str) -> int:
+    scope: dict[str, Any] = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"authorization", f"Bearer {token}".encode()), (b"host", b"bench")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    status_code = 0
+
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+
+    await app(scope, receive, send)
+    return status_code
+
+
+async def main(path: str, tenant_id: str, user_id: str, requests: int) -> None:
+    statements = 0
+
+    def _count(*_: Any) -> None:
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _count)
+    token = create_access_token({"user_id": user_id, "tenant_id": tenant_id, "roles": ["admin"]})
+
+    status_code = await _call(path, token)
+    print(f"warm-up: status={status_code} statements={statements}")
+
+    statements = 0
+    start = time.perf_counter()
+    for _ in range(requests):
+        status_code = await _call(path, token)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{path}: {requests} requests, status={status_code}, "
+        f"{statements / requests:.2f} statements/request, {elapsed / requests * 1000:.2f} ms/request"
+    )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count DB round-trips per request")
+    parser.add_argument("--path", default="/api/v1/vendas/oportunidades")
+    parser.add_argument("--tenant-id", required=True)
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("-n", "--requests", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.path, args.tenant_id, args.user_id, args.requests))
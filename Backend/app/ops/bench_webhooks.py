@@ -0,0 +1,145 @@
+"""
+Webhook delivery against a local HTTP stub: unbatched vs coalesced batches.
+
+Publishes N events for one endpoint and waits until every event was
+delivered. "unbatched" runs the dispatcher with batch_size=1 (one POST per
+event); "coalesced" uses the configured batching. The stub verifies every
+HMAC signature, counts TCP connections and can fail a share of the requests
+with 503 to exercise the retries.
+
+Usage:
+  cd Backend
+  python -m app.ops.bench_webhooks
+  python -m app.ops.bench_webhooks -n 5000 --fail-rate 0.1 --latency-ms 20
+
+Notes:
+- No database: the endpoint list is primed straight into the dispatcher's
+  subscription cache.
+- Retries use --backoff-ms as base delay so the run stays short.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from app.db.session import AsyncSessionLocal
+from app.services.webhooks import (
+    OPPORTUNITY_UPDATED,
+    SIGNATURE_HEADER,
+    TIMESTAMP_HEADER,
+    WebhookDispatcher,
+    WebhookEndpoint,
+    _SUBSCRIPTIONS_KEY,
+    run_webhook_dispatcher,
+    sign_payload,
+)
+
+SECRET = "bench-secret"
+TENANT = "bench-tenant"
+
+
+class WebhookStub:
+    """HTTP/1.1 keep-alive receiver on 127.0.0.1 counting events, requests and connections."""
+
+    def __init__(self, latency_ms: float, fail_rate: float) -> None:
+        self.latency = latency_ms / 1000
+        self.fail_rate = fail_rate
+        self.connections = 0
+        self.requests = 0
+        self.events = 0
+        self.bad_signatures = 0
+        self.port = 0
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while request_line := await reader.readline():
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests += 1
+                await asyncio.sleep(self.latency)
+                if random.random() < self.fail_rate:
+                    status = "503 Service Unavailable"
+                else:
+                    expected = sign_payload(SECRET, headers.get(TIMESTAMP_HEADER.lower(), ""), body)
+                    if headers.get(SIGNATURE_HEADER.lower()) != expected:
+                        self.bad_signatures += 1
+                    self.events += len(json.loads(body)["events"])
+                    status = "204 No Content"
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Length: 0\r\n\r\n".encode())
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> asyncio.AbstractServer:
+        server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = server.sockets[0].getsockname()[1]
+        return server
+
+
+async def _run(label: str, stub: WebhookStub, events: int, batch_size: int, args: argparse.Namespace) -> None:
+    dispatcher = WebhookDispatcher(
+        AsyncSessionLocal,
+        max_connections=20,
+        endpoint_concurrency=args.concurrency,
+        batch_size=batch_size,
+        coalesce_ms=args.coalesce_ms,
+        max_attempts=10,
+        backoff_seconds=args.backoff_ms / 1000,
+        backoff_max_seconds=1.0,
+        timeout_seconds=10,
+        queue_size=events,
+        max_pending_per_endpoint=events,
+        subscription_ttl_seconds=3600,
+        allow_private_targets=True,  # o stub escuta em 127.0.0.1
+    )
+    endpoint = WebhookEndpoint("bench", TENANT, OPPORTUNITY_UPDATED, f"http://127.0.0.1:{stub.port}/hook", SECRET)
+    dispatcher._subscriptions.set(_SUBSCRIPTIONS_KEY, {(TENANT, OPPORTUNITY_UPDATED): [endpoint]})
+    router = asyncio.create_task(run_webhook_dispatcher(dispatcher))
+
+    before = (stub.connections, stub.requests, stub.events)
+    start = time.perf_counter()
+    for i in range(events):
+        dispatcher.publish(TENANT, OPPORTUNITY_UPDATED, {"id": i, "estagio": "proposta"})
+    while dispatcher.delivered_events + dispatcher.failed_batches < events and stub.events - before[2] < events:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    router.cancel()
+    await dispatcher.close()
+
+    print(
+        f"{label:10}: {events / elapsed:9.0f} events/s  {stub.requests - before[1]:6d} POSTs  "
+        f"{stub.connections - before[0]:3d} connections  retries={dispatcher.retries} "
+        f"failed_batches={dispatcher.failed_batches} bad_signatures={stub.bad_signatures}"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    stub = WebhookStub(args.latency_ms, args.fail_rate)
+    server = await stub.start()
+    try:
+        await _run("unbatched", stub, args.events, 1, args)
+        await _run("coalesced", stub, args.events, args.batch_size, args)
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Webhook delivery throughput against a local HTTP stub")
+    parser.add_argument("-n", "--events", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--coalesce-ms", type=float, default=50.0)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--backoff-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    asyncio.run(main(args))
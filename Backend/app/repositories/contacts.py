@@ -6,6 +6,9 @@ from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import ContactCreate, ContactResponse
+from app.db.utils import set_tenant_search_path
+from app.repositories.pagination import DEFAULT_PAGE_SIZE, Keyset, Page, build_page, keyset_params
+from app.services.event_bus import CONTACT_CREATED, CONTACTS_IMPORTED, stage_event
 
 
 def _row_to_response(row: dict[str, Any]) -> ContactResponse:
@@ -18,18 +21,28 @@ def _row_to_response(row: dict[str, Any]) -> ContactResponse:
     )
 
 
-async def list_contacts(session: AsyncSession) -> list[ContactResponse]:
+async def list_contacts(
+    session: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, after: Keyset | None = None
+) -> Page[ContactResponse]:
+    where = (
+        "WHERE (COALESCE(c.updated_at, c.created_at), c.id) < (CAST(:cursor_at AS timestamptz), CAST(:cursor_id AS uuid))"
+        if after is not None
+        else ""
+    )
     q = text(
-        """
-        SELECT c.id, c.nome, c.email, c.telefone, a.nome AS conta_nome
+        f"""
+        SELECT c.id, c.nome, c.email, c.telefone, a.nome AS conta_nome,
+               COALESCE(c.updated_at, c.created_at) AS sort_at
         FROM tb_contato c
         LEFT JOIN tb_conta a ON a.id = c.conta_id
-        ORDER BY c.updated_at DESC NULLS LAST, c.created_at DESC
-        LIMIT 200
+        {where}
+        ORDER BY COALESCE(c.updated_at, c.created_at) DESC, c.id DESC
+        LIMIT :limit
         """
     )
-    res = await session.execute(q)
-    return [_row_to_response(dict(r)) for r in res.mappings().all()]
+    res = await session.execute(q, keyset_params(after, limit))
+    rows = [dict(r) for r in res.mappings().all()]
+    return build_page(rows, limit, _row_to_response)
 
 
 async def create_contact(session: AsyncSession, payload: ContactCreate) -> ContactResponse:
@@ -51,5 +64,59 @@ async def create_contact(session: AsyncSession, payload: ContactCreate) -> Conta
     res = await session.execute(q, params)
     row = dict(res.mappings().first())
     row["conta_nome"] = payload.conta
-    return _row_to_response(row)
+    created = _row_to_response(row)
+    stage_event(session, CONTACT_CREATED, created.model_dump(mode="json"))
+    return created
+
+
+async def account_ids_by_name(session: AsyncSession, schema_name: str, names: set[str]) -> dict[str, Any]:
+    """Map account names (tb_conta.nome) to ids; unknown names are left out."""
+    if not names:
+        return {}
+    await set_tenant_search_path(session, schema_name)
+    # Nome repetido: vale a conta mais antiga.
+    res = await session.execute(
+        text("SELECT DISTINCT ON (nome) nome, id FROM tb_conta WHERE nome = ANY(:names) ORDER BY nome, created_at"),
+        {"names": list(names)},
+    )
+    return {row.nome: row.id for row in res}
+
 
+async def resolve_contact_accounts(
+    session: AsyncSession, schema_name: str, payloads: list[ContactCreate]
+) -> dict[str, Any]:
+    """Account ids of the ``conta`` names of an import batch, looked up once for check and copy."""
+    return await account_ids_by_name(session, schema_name, {p.conta for p in payloads if p.conta})
+
+
+async def check_contacts(
+    session: AsyncSession, schema_name: str, payloads: list[ContactCreate], account_ids: dict[str, Any]
+) -> list[str | None]:
+    """Per-row import error (unknown ``conta``) or None, in the order of ``payloads``."""
+    return [
+        "conta: Conta nao encontrada" if p.conta and p.conta not in account_ids else None for p in payloads
+    ]
+
+
+async def copy_contacts(
+    session: AsyncSession, schema_name: str, payloads: list[ContactCreate], account_ids: dict[str, Any]
+) -> int:
+    """Bulk-load contacts with COPY (asyncpg copy_records_to_table) in the session transaction.
+
+    ``conta`` is mapped to tb_conta.id through ``account_ids`` (resolve_contact_accounts);
+    run check_contacts first to reject unknown accounts (they would be loaded without conta_id).
+    """
+    if not payloads:
+        return 0
+    records = [(p.nome, p.email, p.telefone, account_ids.get(p.conta) if p.conta else None) for p in payloads]
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        "tb_contato",
+        records=records,
+        columns=["nome", "email", "telefone", "conta_id"],
+        schema_name=schema_name,
+    )
+    # Publicado no commit do lote (import_rows)
+    stage_event(session, CONTACTS_IMPORTED, {"count": len(records)})
+    return len(records)
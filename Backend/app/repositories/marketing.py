@@ -14,6 +14,7 @@ from app.models import (
     SegmentCreate,
     SegmentResponse,
 )
+from app.services.event_bus import CAMPAIGN_CREATED, SEGMENT_CREATED, stage_event
 
 
 class MarketingRepository:
@@ -63,8 +64,7 @@ class MarketingRepository:
         }
         res = await self.session.execute(q, params)
         row = res.mappings().first()
-        await self.session.commit()
-        return CampaignResponse(
+        created = CampaignResponse(
             id=str(row["id"]),
             nome=row["nome"],
             status=row["status"],
@@ -72,6 +72,8 @@ class MarketingRepository:
             inicio=row["inicio"].isoformat(),
             fim=row["fim"].isoformat(),
         )
+        stage_event(self.session, CAMPAIGN_CREATED, created.model_dump(mode="json"), self.context.tenant_id)
+        return created
 
     # Segments --------------------------------------------------------
     async def list_segments(self) -> List[SegmentResponse]:
@@ -107,8 +109,9 @@ class MarketingRepository:
         }
         res = await self.session.execute(q, params)
         row = res.mappings().first()
-        await self.session.commit()
-        return SegmentResponse(
+        created = SegmentResponse(
             id=str(row["id"]), nome=row["nome"], regra=row["regra"], tamanho=int(row["tamanho"]) or 0
         )
+        stage_event(self.session, SEGMENT_CREATED, created.model_dump(mode="json"), self.context.tenant_id)
+        return created
 
@@ -1,12 +1,21 @@
 from __future__ import annotations
 
 from datetime import datetime
+from decimal import Decimal
 from typing import Any
 
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import OpportunityCreate, OpportunityResponse
+from app.repositories.pagination import DEFAULT_PAGE_SIZE, Keyset, Page, build_page, keyset_params
+from app.services.event_bus import (
+    OPPORTUNITIES_IMPORTED,
+    OPPORTUNITY_CREATED,
+    OPPORTUNITY_DELETED,
+    OPPORTUNITY_UPDATED,
+    stage_event,
+)
 
 
 # Mapping between API "stage" labels and DB allowed values
@@ -50,23 +59,34 @@ def _row_to_response(row: dict[str, Any]) -> OpportunityResponse:
     )
 
 
-async def list_opportunities(session: AsyncSession) -> list[OpportunityResponse]:
+async def list_opportunities(
+    session: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, after: Keyset | None = None
+) -> Page[OpportunityResponse]:
+    # Keyset em (COALESCE(updated_at, created_at), id): usa idx_tb_oportunidade_keyset
+    # e custa o mesmo em qualquer pagina, ao contrario de OFFSET.
+    where = (
+        "WHERE (COALESCE(updated_at, created_at), id) < (CAST(:cursor_at AS timestamptz), CAST(:cursor_id AS uuid))"
+        if after is not None
+        else ""
+    )
     q = text(
-        """
+        f"""
         SELECT id,
                nome,
                valor,
                estagio,
                probabilidade,
-               updated_at
+               updated_at,
+               COALESCE(updated_at, created_at) AS sort_at
         FROM tb_oportunidade
-        ORDER BY updated_at DESC NULLS LAST, created_at DESC
-        LIMIT 200
+        {where}
+        ORDER BY COALESCE(updated_at, created_at) DESC, id DESC
+        LIMIT :limit
         """
     )
-    res = await session.execute(q)
+    res = await session.execute(q, keyset_params(after, limit))
     rows = [dict(r) for r in res.mappings().all()]
-    return [_row_to_response(r) for r in rows]
+    return build_page(rows, limit, _row_to_response)
 
 
 async def get_opportunity(session: AsyncSession, op_id: str) -> OpportunityResponse | None:
@@ -116,7 +136,9 @@ async def create_opportunity(
     row = dict(res.mappings().first())
     # Echo owner (not persisted yet)
     row["owner"] = payload.owner
-    return _row_to_response(row)
+    created = _row_to_response(row)
+    stage_event(session, OPPORTUNITY_CREATED, created.model_dump(mode="json"), tenant_id)
+    return created
 
 
 async def update_opportunity(
@@ -147,11 +169,39 @@ async def update_opportunity(
         return None
     row = dict(row)
     row["owner"] = payload.owner
-    return _row_to_response(row)
+    updated = _row_to_response(row)
+    stage_event(session, OPPORTUNITY_UPDATED, updated.model_dump(mode="json"))
+    return updated
 
 
 async def delete_opportunity(session: AsyncSession, op_id: str) -> bool:
     q = text("DELETE FROM tb_oportunidade WHERE id = :id")
     res = await session.execute(q, {"id": op_id})
     # When using text, rowcount is available
-    return (res.rowcount or 0) > 0
+    if not res.rowcount:
+        return False
+    stage_event(session, OPPORTUNITY_DELETED, {"id": op_id})
+    return True
+
+
+async def copy_opportunities(
+    session: AsyncSession, schema_name: str, payloads: list[OpportunityCreate], refs: Any = None
+) -> int:
+    """Bulk-load opportunities with COPY (asyncpg copy_records_to_table) in the session transaction."""
+    if not payloads:
+        return 0
+    records = [
+        (p.nome, Decimal(str(p.valor)), _to_db_stage(p.stage), int(round((p.probabilidade or 0.0) * 100)))
+        for p in payloads
+    ]
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        "tb_oportunidade",
+        records=records,
+        columns=["nome", "valor", "estagio", "probabilidade"],
+        schema_name=schema_name,
+    )
+    # Publicado no commit do lote (import_rows)
+    stage_event(session, OPPORTUNITIES_IMPORTED, {"count": len(records)})
+    return len(records)
@@ -0,0 +1,64 @@
+"""Opaque keyset cursors shared by the list repositories."""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Generic, List, Optional, TypeVar
+from uuid import UUID
+
+from fastapi import HTTPException, status
+
+T = TypeVar("T")
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass(slots=True)
+class Keyset:
+    sort_at: datetime
+    id: UUID
+
+
+@dataclass(slots=True)
+class Page(Generic[T]):
+    items: List[T] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(sort_at: datetime, row_id: Any) -> str:
+    raw = json.dumps({"t": sort_at.isoformat(), "id": str(row_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> Keyset | None:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return Keyset(sort_at=datetime.fromisoformat(data["t"]), id=UUID(data["id"]))
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor invalido.") from None
+
+
+def keyset_params(keyset: Keyset | None, limit: int) -> dict[str, Any]:
+    # Busca um registro a mais para saber se existe proxima pagina.
+    params: dict[str, Any] = {"limit": limit + 1}
+    if keyset is not None:
+        params.update({"cursor_at": keyset.sort_at, "cursor_id": keyset.id})
+    return params
+
+
+def build_page(rows: list[dict[str, Any]], limit: int, to_item) -> Page:
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(last["sort_at"], last["id"])
+    return Page(items=[to_item(r) for r in rows], next_cursor=next_cursor)
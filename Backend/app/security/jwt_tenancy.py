@@ -11,13 +11,19 @@ from passlib.context import CryptContext
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.db.session import get_session
-from app.db.utils import set_tenant_search_path
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# tenant_id -> schema_name; evita o SELECT em tenant_admin.tb_tenant a cada requisicao.
+tenant_schema_cache: TTLCache[str, str] = TTLCache(
+    maxsize=settings.tenant_schema_cache_max_entries,
+    ttl_seconds=settings.tenant_schema_cache_ttl_seconds,
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     try:
@@ -93,12 +99,27 @@ async def get_tenant_schema_by_id(session: AsyncSession, tenant_id: str) -> Opti
     return schema
 
 
+async def resolve_tenant_schema(session: AsyncSession, tenant_id: str) -> Optional[str]:
+    """Cached variant of get_tenant_schema_by_id used on the auth path."""
+    schema = tenant_schema_cache.get(tenant_id)
+    if schema is not None:
+        return schema
+    schema = await get_tenant_schema_by_id(session, tenant_id)
+    if schema:
+        # Tenants inexistentes nao sao cacheados para nao mascarar um provisionamento recente.
+        tenant_schema_cache.set(tenant_id, schema)
+    return schema
+
+
 async def validar_jwt_e_tenant(
     request: Request, session: AsyncSession = Depends(get_session)
 ) -> Dict[str, Any]:
     """
-    Dependency for securing routes: validates JWT, resolves tenant schema,
-    and applies search_path for the duration of the request transaction.
+    Dependency for securing routes: validates JWT and resolves the tenant schema.
+
+    The session is only touched on a tenant cache miss; search_path is applied
+    by get_tenant_session / get_tenant_session_sqlsafe, so routes that do not
+    need the database cost no round-trips here.
     """
     auth_header = request.headers.get("Authorization")
     if not auth_header or not auth_header.lower().startswith("bearer "):
@@ -115,12 +136,10 @@ async def validar_jwt_e_tenant(
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalido ou expirado") from None
 
-    schema_name = await get_tenant_schema_by_id(session, tenant_id)
+    schema_name = await resolve_tenant_schema(session, tenant_id)
     if not schema_name:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tenant nao encontrado")
 
-    await set_tenant_search_path(session, schema_name)
-
     # Tornar o contexto disponivel para outras dependencias (ex.: get_tenant_context)
     # sem precisar decodificar o JWT novamente.
     context_dict = {
@@ -129,6 +148,8 @@ async def validar_jwt_e_tenant(
         "perfil": perfil,
         "roles": payload.get("roles", []) or ([] if perfil is None else [perfil.lower()]),
         "schema_name": schema_name,
+        "perms": payload.get("perms"),
+        "pv": payload.get("pv"),
     }
     try:
         request.state.nexus_context = context_dict
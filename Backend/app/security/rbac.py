@@ -0,0 +1,162 @@
+"""Compiled role -> permission index used by require_permission and the JWT permission digest."""
+from __future__ import annotations
+
+import asyncio
+import base64
+import binascii
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Mapping, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.services.event_bus import RBAC_CHANGED, DomainEvent, event_bus
+
+
+@dataclass(frozen=True, slots=True)
+class RoleIndex:
+    """Snapshot of the RBAC tables.
+
+    ``catalog`` fixes the bit position of every action key in the JWT digest;
+    ``version`` hashes the catalog and every role grant, so any RBAC change
+    invalidates the digests minted before it.
+    """
+
+    roles: Mapping[str, FrozenSet[str]]
+    catalog: Tuple[str, ...]
+    positions: Mapping[str, int]
+    version: str
+
+    @classmethod
+    def build(cls, catalog: Iterable[str], grants: Iterable[Tuple[str, str]]) -> "RoleIndex":
+        keys = tuple(sorted(set(catalog)))
+        grouped: Dict[str, set[str]] = {}
+        for role_name, action_key in grants:
+            grouped.setdefault(role_name, set()).add(action_key)
+        roles = {role_name: frozenset(action_keys) for role_name, action_keys in grouped.items()}
+        fingerprint = hashlib.sha256()
+        fingerprint.update("\n".join(keys).encode())
+        for role_name in sorted(roles):
+            fingerprint.update(f"\n{role_name}:{','.join(sorted(roles[role_name]))}".encode())
+        return cls(
+            roles=roles,
+            catalog=keys,
+            positions={key: position for position, key in enumerate(keys)},
+            version=fingerprint.hexdigest()[:12],
+        )
+
+    def allows(self, roles: Iterable[str], action_key: str) -> bool:
+        return any(action_key in self.roles.get(role.lower(), ()) for role in roles)
+
+    def digest_for(self, roles: Iterable[str]) -> str:
+        """Bitmask over ``catalog`` of everything ``roles`` grant, base64url without padding."""
+        mask = 0
+        for role in roles:
+            for action_key in self.roles.get(role.lower(), ()):
+                mask |= 1 << self.positions[action_key]
+        raw = mask.to_bytes((mask.bit_length() + 7) // 8 or 1, "little")
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+    def digest_allows(self, digest: str, action_key: str) -> bool:
+        position = self.positions.get(action_key)
+        if position is None:
+            return False
+        raw = base64.urlsafe_b64decode(digest + "=" * (-len(digest) % 4))
+        return bool(int.from_bytes(raw, "little") >> position & 1)
+
+
+_INDEX_KEY = "role_permissions"
+# Uma unica entrada: as tabelas de RBAC em tenant_admin sao compartilhadas por todos os tenants.
+role_permission_cache: TTLCache[str, RoleIndex] = TTLCache(
+    maxsize=1,
+    ttl_seconds=settings.rbac_cache_ttl_seconds,
+)
+# O mesmo indice, consultado so para validar digests sem passar por role_index(). Com o canal
+# LISTEN/NOTIFY toda mudanca de RBAC chega aos outros workers e ele pode viver mais que o indice.
+digest_index_cache: TTLCache[str, RoleIndex] = TTLCache(
+    maxsize=1,
+    ttl_seconds=(
+        max(settings.rbac_digest_version_ttl_seconds, settings.rbac_cache_ttl_seconds)
+        if settings.event_bus_notify_channel
+        else settings.rbac_cache_ttl_seconds
+    ),
+)
+_load_lock = asyncio.Lock()
+# Incrementado a cada invalidacao: uma carga iniciada antes dela nao pode repovoar o cache.
+_generation = 0
+
+
+async def load_role_index(session: AsyncSession) -> RoleIndex:
+    schema = settings.tenant_admin_schema
+    res = await session.execute(
+        text(
+            f"""
+            SELECT p.action_key, lower(r.name) AS role_name
+            FROM {schema}.permissions p
+            LEFT JOIN {schema}.role_permissions rp ON rp.permission_id = p.permission_id
+            LEFT JOIN {schema}.roles r ON r.role_id = rp.role_id
+            """
+        )
+    )
+    rows = res.all()
+    return RoleIndex.build(
+        (action_key for action_key, _ in rows),
+        ((role_name, action_key) for action_key, role_name in rows if role_name is not None),
+    )
+
+
+async def role_index(session: AsyncSession) -> RoleIndex:
+    """Cached index; on a miss a single request reloads it for everyone."""
+    index = role_permission_cache.get(_INDEX_KEY)
+    if index is not None:
+        return index
+    async with _load_lock:
+        index = role_permission_cache.get(_INDEX_KEY)
+        if index is None:
+            generation = _generation
+            index = await load_role_index(session)
+            if generation == _generation:
+                role_permission_cache.set(_INDEX_KEY, index)
+                digest_index_cache.set(_INDEX_KEY, index)
+    return index
+
+
+async def has_permission(
+    session: AsyncSession,
+    roles: Iterable[str],
+    action_key: str,
+    digest: Optional[str] = None,
+    digest_version: Optional[str] = None,
+) -> bool:
+    """Check the JWT digest when it matches the current catalog version, else the roles.
+
+    A digest of the known version is decided without role_index(); the index
+    is only loaded when the versions differ or there is no digest.
+    """
+    index = digest_index_cache.get(_INDEX_KEY) if digest is not None else None
+    if index is None or digest_version != index.version:
+        index = await role_index(session)
+    if digest is not None and digest_version == index.version:
+        try:
+            return index.digest_allows(digest, action_key)
+        except (binascii.Error, ValueError):
+            pass  # digest corrompido: decide pelos roles
+    return index.allows(roles, action_key)
+
+
+def invalidate_role_permissions(broadcast: bool = True) -> None:
+    """Call after committing a change to roles, permissions, role_permissions or user_roles.
+
+    With ``broadcast`` the change is published as rbac.changed, which the
+    other workers receive over LISTEN/NOTIFY when it is configured; without
+    it they pick the change up within RBAC_CACHE_TTL_SECONDS.
+    """
+    global _generation
+    _generation += 1
+    role_permission_cache.clear()
+    digest_index_cache.clear()
+    if broadcast:
+        event_bus.publish(DomainEvent(name=RBAC_CHANGED, tenant_id=None, data={}))
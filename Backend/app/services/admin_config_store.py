@@ -1,13 +1,18 @@
 from __future__ import annotations
 
+import asyncio
 import hashlib
+import logging
 import os
 from typing import Iterable
 
 from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
 from app.core.config import settings
+from app.db.schema_version import is_at_head
+
+logger = logging.getLogger(__name__)
 
 
 TENANT_ADMIN = settings.tenant_admin_schema
@@ -54,9 +59,12 @@ CREATE_STATEMENTS: list[str] = [
         event_name VARCHAR(100) NOT NULL,
         target_url TEXT NOT NULL,
         secret_key TEXT,
-        status VARCHAR(50) NOT NULL DEFAULT 'ACTIVE'
+        status VARCHAR(50) NOT NULL DEFAULT 'ACTIVE',
+        tenant_id TEXT
     )
     """,
+    # Tabela criada antes da coluna tenant_id (migration 20251114_000007)
+    f"ALTER TABLE {TENANT_ADMIN}.webhooks ADD COLUMN IF NOT EXISTS tenant_id TEXT",
     f"""
     CREATE TABLE IF NOT EXISTS {TENANT_ADMIN}.templates (
         template_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -198,9 +206,55 @@ CREATE_STATEMENTS: list[str] = [
 ]
 
 
+# Verificado uma vez por processo (startup ou primeira requisicao); depois e so um bool.
+_schema_verified = False
+_schema_lock = asyncio.Lock()
+
+
+def admin_config_schema_verified() -> bool:
+    return _schema_verified
+
+
+async def bootstrap_admin_config_schema(engine: AsyncEngine) -> bool:
+    """Startup check: trust alembic when the database is at head, else run CREATE_STATEMENTS once.
+
+    Returns whether the schema was verified; failures are logged and left to
+    the lazy fallback in ensure_admin_config_schema.
+    """
+    global _schema_verified
+    async with _schema_lock:
+        if _schema_verified:
+            return True
+        try:
+            async with engine.begin() as conn:
+                if not await is_at_head(conn):
+                    logger.warning("Banco fora do head do alembic; criando tabelas de admin config (IF NOT EXISTS)")
+                    for stmt in CREATE_STATEMENTS:
+                        await conn.execute(text(stmt))
+        except Exception:
+            logger.exception("Falha ao verificar o schema de admin config no startup")
+            return False
+        _schema_verified = True
+        return True
+
+
 async def ensure_admin_config_schema(session: AsyncSession) -> None:
-    for stmt in CREATE_STATEMENTS:
-        await session.execute(text(stmt))
+    """No-op once verified; otherwise (startup failed) create the tables in their own transaction.
+
+    The DDL does not run in ``session``: a rollback of the request must not
+    leave the flag set with the tables never created.
+    """
+    global _schema_verified
+    if _schema_verified:
+        return
+    async with _schema_lock:
+        if _schema_verified:
+            return
+        engine: AsyncEngine = session.bind
+        async with engine.begin() as conn:
+            for stmt in CREATE_STATEMENTS:
+                await conn.execute(text(stmt))
+        _schema_verified = True
 
 
 def _hash_api_key(raw: str) -> tuple[str, str]:
@@ -0,0 +1,176 @@
+"""Batch import of contacts/opportunities from CSV or NDJSON uploads via COPY."""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import tempfile
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import (
+    ContactCreate,
+    ImportBatchReport,
+    ImportRejectedRow,
+    ImportReport,
+    OpportunityCreate,
+)
+from app.repositories import contacts as contact_repo
+from app.repositories import opportunities as opp_repo
+
+IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_REJECTIONS = 100
+SPOOL_MAX_MEMORY_BYTES = 8 * 1024 * 1024
+
+
+@dataclass(frozen=True, slots=True)
+class ImportTarget:
+    model: type[BaseModel]
+    table: str
+    # copy/check recebem o que resolve devolveu para o lote (None sem resolve)
+    copy: Callable[[AsyncSession, str, list[Any], Any], Awaitable[int]]
+    # Validacao que depende do banco (ex.: conta existente): erro por linha ou None
+    check: Callable[[AsyncSession, str, list[Any], Any], Awaitable[list[str | None]]] | None = None
+    # Consultas do lote feitas uma vez so (ex.: contas por nome)
+    resolve: Callable[[AsyncSession, str, list[Any]], Awaitable[Any]] | None = None
+
+
+IMPORT_TARGETS: dict[str, ImportTarget] = {
+    "contatos": ImportTarget(
+        model=ContactCreate,
+        table="tb_contato",
+        copy=contact_repo.copy_contacts,
+        check=contact_repo.check_contacts,
+        resolve=contact_repo.resolve_contact_accounts,
+    ),
+    "oportunidades": ImportTarget(model=OpportunityCreate, table="tb_oportunidade", copy=opp_repo.copy_opportunities),
+}
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+
+def _iter_csv(text_stream: io.TextIOBase) -> Iterator[tuple[int, dict[str, Any] | None]]:
+    reader = csv.DictReader(text_stream)
+    for row in reader:
+        # Celulas vazias viram None para que campos opcionais usem o default do modelo.
+        yield reader.line_num, {k: (v if v != "" else None) for k, v in row.items() if k}
+
+
+def _iter_ndjson(text_stream: io.TextIOBase) -> Iterator[tuple[int, dict[str, Any] | None]]:
+    for line_no, line in enumerate(text_stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+        except json.JSONDecodeError:
+            yield line_no, None
+            continue
+        yield line_no, obj if isinstance(obj, dict) else None
+
+
+def _batches(rows: Iterator[tuple[int, dict[str, Any] | None]], size: int) -> Iterator[list]:
+    batch: list = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def import_rows(
+    session: AsyncSession,
+    schema_name: str,
+    entity: str,
+    fmt: str,
+    body: AsyncIterator[bytes],
+) -> ImportReport:
+    """Spool the upload, validate it in batches and COPY valid rows, committing per batch.
+
+    An upload that is not UTF-8 or not parseable CSV stops the import with a
+    400 whose detail says how many batches were already committed.
+    """
+    target = IMPORT_TARGETS[entity]
+    report = ImportReport(entity=entity)
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY_BYTES) as spool:
+        async for chunk in body:
+            spool.write(chunk)
+        spool.seek(0)
+        text_stream = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+        rows = _iter_csv(text_stream) if fmt == "csv" else _iter_ndjson(text_stream)
+
+        try:
+            for batch_no, batch in enumerate(_batches(rows, IMPORT_BATCH_SIZE), start=1):
+                await _import_batch(session, schema_name, target, report, batch_no, batch)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            reason = "codificacao diferente de UTF-8" if isinstance(exc, UnicodeDecodeError) else f"CSV invalido: {exc}"
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=(
+                    f"Arquivo invalido apos {report.totalRows} linha(s) processada(s) ({reason}). "
+                    f"{len(report.batches)} lote(s) ja importado(s), {report.imported} registro(s)."
+                ),
+            ) from exc
+
+    return report
+
+
+def _reject(report: ImportReport, line_no: int, errors: list[str]) -> None:
+    if len(report.rejectedRows) < MAX_REPORTED_REJECTIONS:
+        report.rejectedRows.append(ImportRejectedRow(line=line_no, errors=errors))
+
+
+async def _import_batch(
+    session: AsyncSession,
+    schema_name: str,
+    target: ImportTarget,
+    report: ImportReport,
+    batch_no: int,
+    batch: list[tuple[int, dict[str, Any] | None]],
+) -> None:
+    valid: list[tuple[int, Any]] = []
+    rejected = 0
+    for line_no, raw in batch:
+        try:
+            if raw is None:
+                raise ValueError("Linha invalida")
+            valid.append((line_no, target.model.model_validate(raw)))
+        except (ValidationError, ValueError) as exc:
+            rejected += 1
+            _reject(
+                report,
+                line_no,
+                [f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in exc.errors()]
+                if isinstance(exc, ValidationError)
+                else [str(exc)],
+            )
+
+    refs = None
+    if target.resolve is not None and valid:
+        refs = await target.resolve(session, schema_name, [payload for _, payload in valid])
+
+    if target.check is not None and valid:
+        errors = await target.check(session, schema_name, [payload for _, payload in valid], refs)
+        checked: list[tuple[int, Any]] = []
+        for (line_no, payload), error in zip(valid, errors):
+            if error is None:
+                checked.append((line_no, payload))
+            else:
+                rejected += 1
+                _reject(report, line_no, [error])
+        valid = checked
+
+    imported = await target.copy(session, schema_name, [payload for _, payload in valid], refs)
+    await session.commit()
+
+    report.batches.append(ImportBatchReport(batch=batch_no, rows=len(batch), imported=imported, rejected=rejected))
+    report.totalRows += len(batch)
+    report.imported += imported
+    report.rejected += rejected
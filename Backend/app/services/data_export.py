@@ -0,0 +1,82 @@
+"""Streaming export of tenant CRM tables (NDJSON / CSV) with constant memory."""
+from __future__ import annotations
+
+import csv
+import io
+import json
+from collections.abc import AsyncIterator
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import text
+
+from app.db.session import read_sessionmaker
+from app.db.utils import set_tenant_search_path
+
+# Entidade exposta na API -> tabela do schema do tenant (whitelist; nunca interpolar input do usuario).
+EXPORTABLE_ENTITIES: dict[str, str] = {
+    "oportunidades": "tb_oportunidade",
+    "contatos": "tb_contato",
+    "contas": "tb_conta",
+    "leads": "tb_lead",
+    "produtos": "tb_produto",
+    "atividades": "tb_atividade",
+    "campanhas": "marketing_campaigns",
+    "segmentos": "marketing_segments",
+}
+
+EXPORT_FORMATS: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+EXPORT_BATCH_SIZE = 1000
+
+
+def _to_jsonable(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    return value
+
+
+def _encode_ndjson(rows: list[dict[str, Any]]) -> bytes:
+    return "".join(
+        json.dumps(row, default=_to_jsonable, ensure_ascii=False) + "\n" for row in rows
+    ).encode("utf-8")
+
+
+def _encode_csv(rows: list[tuple[Any, ...]]) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerows([[_to_jsonable(v) for v in row] for row in rows])
+    return buf.getvalue().encode("utf-8")
+
+
+async def stream_entity(schema_name: str, entity: str, fmt: str) -> AsyncIterator[bytes]:
+    """Yield encoded chunks of ``entity`` using a server-side cursor.
+
+    Opens its own session: the request-scoped session from the dependencies is
+    already closed when StreamingResponse starts iterating. Reads from the
+    replica when one is configured and fresh enough.
+    """
+    table = EXPORTABLE_ENTITIES[entity]
+    factory = await read_sessionmaker()
+    async with factory() as session:
+        await set_tenant_search_path(session, schema_name)
+        result = await session.stream(
+            text(f"SELECT * FROM {table}"),
+            execution_options={"yield_per": EXPORT_BATCH_SIZE},
+        )
+        if fmt == "csv":
+            header = io.StringIO()
+            csv.writer(header).writerow(list(result.keys()))
+            yield header.getvalue().encode("utf-8")
+            async for partition in result.partitions(EXPORT_BATCH_SIZE):
+                yield _encode_csv([tuple(row) for row in partition])
+        else:
+            async for partition in result.mappings().partitions(EXPORT_BATCH_SIZE):
+                yield _encode_ndjson([dict(row) for row in partition])
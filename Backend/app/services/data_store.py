@@ -1,12 +1,18 @@
-"""In-memory, per-tenant data store used during the MVP."""
+"""Per-tenant CRM data store used during the MVP (memory or Postgres backend)."""
 from __future__ import annotations
 
+import asyncio
+import logging
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 import secrets
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Type, TypeVar
 from uuid import uuid4
 
+from pydantic import BaseModel
+
+from app.core.config import settings
 from app.models import (
     AccountCreate,
     AccountResponse,
@@ -39,7 +45,11 @@ from app.models import (
     WorkflowResponse,
     WorkflowRunResponse,
 )
+from app.services.event_bus import STORE_KPIS_CHANGED, DomainEvent, event_bus
+from app.services.kpi_aggregate import KPIAggregate
+from app.services.store_backends import Document, StoreBackend, create_backend
 
+logger = logging.getLogger(__name__)
 
 DEFAULT_PROFILES: List[UserProfile] = [
     UserProfile(id="vendas", name="Vendas"),
@@ -56,24 +66,31 @@ BASE_TABLES = [
     "tb_segmento",
 ]
 
-
-@dataclass
-class MetaObjectRecord:
-    meta_id: str
-    payload: MetaObjectResponse
-
-    def to_response(self) -> MetaObjectResponse:
-        return self.payload
-
-
-@dataclass
-class WidgetRecord:
-    widget_id: str
-    dashboard_id: str
-    payload: WidgetPayload
-
-    def to_payload(self) -> WidgetPayload:
-        return self.payload
+# Colecoes do StoreBackend
+META_OBJECTS = "meta_objects"
+DASHBOARDS = "dashboards"
+DASHBOARD_FAVORITES = "dashboard_favorites"
+LEADS = "leads"
+OPPORTUNITIES = "opportunities"
+ACCOUNTS = "accounts"
+CONTACTS = "contacts"
+PRODUCTS = "products"
+CAMPAIGNS = "campaigns"
+SEGMENTS = "segments"
+ACTIVITIES = "activities"
+TRADE_VISITS = "trade_visits"
+SUPPORT_TICKETS = "support_tickets"
+WORKFLOWS = "workflows"
+TRIGGERS = "triggers"
+EMAIL_TEMPLATES = "email_templates"
+STORE_META = "_store"
+
+# Marcador de seed "seeding" mais antigo que isso e de um worker que morreu no meio.
+SEED_LEASE_SECONDS = 60
+SEED_POLL_SECONDS = 0.1
+
+M = TypeVar("M", bound=BaseModel)
+Seeder = Callable[["TenantStore"], Awaitable[None]]
 
 
 @dataclass
@@ -81,7 +98,7 @@ class DashboardRecord:
     dashboard_id: str
     name: str
     layout: List[dict] = field(default_factory=list)
-    widgets: Dict[str, WidgetRecord] = field(default_factory=dict)
+    widgets: List[WidgetPayload] = field(default_factory=list)
     owner_id: str | None = None
     owner_name: str | None = None
     shared_with: List[str] = field(default_factory=list)
@@ -92,33 +109,59 @@ class DashboardRecord:
             id=self.dashboard_id,
             name=self.name,
             layout=self.layout,
-            widgets=[widget.payload for widget in self.widgets.values()],
+            widgets=list(self.widgets),
             ownerId=self.owner_id,
             ownerName=self.owner_name,
             sharedWith=self.shared_with,
             thumbnailUrl=self.thumbnail_url,
         )
 
+    def to_doc(self) -> Document:
+        return {
+            "dashboard_id": self.dashboard_id,
+            "name": self.name,
+            "layout": self.layout,
+            "widgets": [widget.model_dump(mode="json") for widget in self.widgets],
+            "owner_id": self.owner_id,
+            "owner_name": self.owner_name,
+            "shared_with": self.shared_with,
+            "thumbnail_url": self.thumbnail_url,
+        }
+
+    @classmethod
+    def from_doc(cls, doc: Document) -> "DashboardRecord":
+        return cls(
+            dashboard_id=doc["dashboard_id"],
+            name=doc["name"],
+            layout=doc.get("layout") or [],
+            widgets=[WidgetPayload.model_validate(widget) for widget in doc.get("widgets", [])],
+            owner_id=doc.get("owner_id"),
+            owner_name=doc.get("owner_name"),
+            shared_with=list(doc.get("shared_with") or []),
+            thumbnail_url=doc.get("thumbnail_url"),
+        )
+
 
-class TenantMemoryStore:
-    def __init__(self) -> None:
-        self.meta_objects: Dict[str, MetaObjectRecord] = {}
-        self.dashboards: Dict[str, DashboardRecord] = {}
-        self.widgets: Dict[str, WidgetRecord] = {}
+class TenantStore:
+    """Tenant CRM data kept as JSON documents in a StoreBackend."""
+
+    def __init__(
+        self,
+        backend: StoreBackend,
+        seeders: Dict[str, Seeder] | None = None,
+        on_kpis_changed: Callable[[], None] | None = None,
+    ) -> None:
+        self.backend = backend
+        # Colecoes sao semeadas no primeiro acesso, nao na criacao do tenant.
+        self._seeders = seeders or {}
+        self._seeded: Set[str] = set()
+        self._seed_lock = asyncio.Lock()
+        self._seeding_task: asyncio.Task | None = None
+        # KPIs do dashboard inicial: calculados no primeiro uso e mantidos a cada escrita.
+        self._kpis: KPIAggregate | None = None
+        # Avisa os outros workers que o agregado deles ficou desatualizado (backend compartilhado).
+        self._on_kpis_changed = on_kpis_changed
         self.available_profiles = DEFAULT_PROFILES.copy()
-        self.leads: Dict[str, LeadResponse] = {}
-        self.opportunities: Dict[str, OpportunityResponse] = {}
-        self.accounts: Dict[str, AccountResponse] = {}
-        self.contacts: Dict[str, ContactResponse] = {}
-        self.campaigns: Dict[str, CampaignResponse] = {}
-        self.segments: Dict[str, SegmentResponse] = {}
-        self.activities: List[ActivityItem] = []
-        self.products: Dict[str, ProductResponse] = {}
-        self.trade_visits: List[TradeVisit] = []
-        self.support_tickets: List[SupportTicket] = []
-        self.workflows: Dict[str, WorkflowResponse] = {}
-        self.triggers: Dict[str, AutomationTriggerResponse] = {}
-        self.email_templates: Dict[str, EmailTemplateResponse] = {}
         self._thumbnail_palette = [
             "0f172a/63ffb6",
             "101827/f4f6fb",
@@ -126,30 +169,95 @@ class TenantMemoryStore:
             "081229/3b82f6",
             "0f192f/facc15",
         ]
-        self.dashboard_favorites: Dict[str, set[str]] = {}
 
     def _generate_thumbnail(self, seed: str) -> str:
         palette = self._thumbnail_palette[hash(seed) % len(self._thumbnail_palette)]
         return f"https://placehold.co/600x360/{palette}?text=Dashboard"
 
+    async def _ensure_seeded(self, collection: str) -> None:
+        if collection in self._seeded or collection not in self._seeders:
+            return
+        if self._seeding_task is not None and self._seeding_task is asyncio.current_task():
+            # Chamadas feitas pelo proprio seeder (ele usa os metodos publicos da colecao).
+            return
+        async with self._seed_lock:
+            if collection in self._seeded:
+                return
+            self._seeding_task = asyncio.current_task()
+            try:
+                key = f"seeded:{collection}"
+                if await self._claim_seed(key):
+                    try:
+                        await self._seeders[collection](self)
+                    except BaseException:
+                        # Libera o marcador: o proximo acesso (neste ou em outro worker) semeia de novo.
+                        await self.backend.delete(STORE_META, key)
+                        raise
+                    await self.backend.put(STORE_META, key, {"status": "done", "at": datetime.utcnow().isoformat()})
+                self._seeded.add(collection)
+            finally:
+                self._seeding_task = None
+
+    async def _claim_seed(self, key: str) -> bool:
+        """True when this process must run the seeder; False once another one has finished it.
+
+        The marker goes through "seeding" -> "done", so other workers wait for
+        the seed instead of reading a half-seeded collection. A "seeding"
+        marker older than SEED_LEASE_SECONDS (worker died mid-seed) is released.
+        """
+        while True:
+            marker = {"status": "seeding", "at": datetime.utcnow().isoformat()}
+            # O marcador garante um unico seed por colecao mesmo com varios workers no backend Postgres.
+            if await self.backend.put_if_absent(STORE_META, key, marker):
+                return True
+            current = await self.backend.get(STORE_META, key)
+            if current is None:
+                continue  # o seed em andamento falhou e liberou o marcador
+            if current.get("status", "done") == "done":  # marcadores antigos nao tem status
+                return False
+            if datetime.utcnow() - datetime.fromisoformat(current["at"]) > timedelta(seconds=SEED_LEASE_SECONDS):
+                await self.backend.delete(STORE_META, key)
+                continue
+            await asyncio.sleep(SEED_POLL_SECONDS)
+
+    async def _list(self, collection: str, model: Type[M], limit: Optional[int] = None) -> List[M]:
+        await self._ensure_seeded(collection)
+        return [model.model_validate(doc) for doc in await self.backend.list(collection, limit)]
+
+    async def _get(self, collection: str, key: str, model: Type[M]) -> M:
+        await self._ensure_seeded(collection)
+        doc = await self.backend.get(collection, key)
+        if doc is None:
+            raise KeyError(key)
+        return model.model_validate(doc)
+
+    async def _put(self, collection: str, key: str, item: BaseModel) -> None:
+        await self._ensure_seeded(collection)
+        await self.backend.put(collection, key, item.model_dump(mode="json"))
+
+    async def _delete(self, collection: str, key: str) -> None:
+        await self._ensure_seeded(collection)
+        if not await self.backend.delete(collection, key):
+            raise KeyError(key)
+
     # Meta objetos -----------------------------------------------------
-    def list_meta_objects(self) -> List[MetaObjectResponse]:
-        return [record.to_response() for record in self.meta_objects.values()]
+    async def list_meta_objects(self) -> List[MetaObjectResponse]:
+        return await self._list(META_OBJECTS, MetaObjectResponse)
 
-    def list_meta_objects_for_roles(self, role_ids: List[str]) -> List[MetaObjectResponse]:
+    async def list_meta_objects_for_roles(self, role_ids: List[str]) -> List[MetaObjectResponse]:
         if not role_ids:
             return []
         normalized = {role.lower() for role in role_ids}
         allowed: List[MetaObjectResponse] = []
-        for record in self.meta_objects.values():
-            if not record.payload.profiles:
+        for meta in await self.list_meta_objects():
+            if not meta.profiles:
                 continue
-            profile_ids = {profile.id.lower() for profile in record.payload.profiles}
+            profile_ids = {profile.id.lower() for profile in meta.profiles}
             if normalized.intersection(profile_ids):
-                allowed.append(record.to_response())
+                allowed.append(meta)
         return allowed
 
-    def create_meta_object(self, payload: MetaObjectCreate) -> MetaObjectResponse:
+    async def create_meta_object(self, payload: MetaObjectCreate) -> MetaObjectResponse:
         meta_id = str(uuid4())
         response = MetaObjectResponse(
             metaId=meta_id,
@@ -158,51 +266,61 @@ class TenantMemoryStore:
             tipo=payload.tipo,
             status=payload.status,
             descricao=payload.descricao,
+            sqlQuery=payload.sqlQuery,
             profiles=[],
             fields=payload.fields,
         )
-        self.meta_objects[meta_id] = MetaObjectRecord(meta_id=meta_id, payload=response)
+        await self._put(META_OBJECTS, meta_id, response)
         return response
 
-    def update_permissions(self, meta_id: str, profile_ids: List[str]) -> MetaObjectResponse:
-        if meta_id not in self.meta_objects:
-            raise KeyError(meta_id)
-        profiles = [profile for profile in self.available_profiles if profile.id in profile_ids]
-        record = self.meta_objects[meta_id]
-        record.payload.profiles = profiles
-        return record.payload
-
-    def delete_meta_object(self, meta_id: str) -> None:
-        if meta_id not in self.meta_objects:
-            raise KeyError(meta_id)
+    async def update_permissions(self, meta_id: str, profile_ids: List[str]) -> MetaObjectResponse:
+        meta = await self._get(META_OBJECTS, meta_id, MetaObjectResponse)
+        meta.profiles = [profile for profile in self.available_profiles if profile.id in profile_ids]
+        await self._put(META_OBJECTS, meta_id, meta)
+        return meta
+
+    async def delete_meta_object(self, meta_id: str) -> None:
         # Em um futuro proximo, poderiamos validar dependencias com widgets/dashboards
-        del self.meta_objects[meta_id]
+        await self._delete(META_OBJECTS, meta_id)
 
     # Widgets / Dashboards ---------------------------------------------
-    def list_dashboards(self) -> List[DashboardSaveRequest]:
-        return [dashboard.to_response() for dashboard in self.dashboards.values()]
+    async def _dashboard_records(self) -> List[DashboardRecord]:
+        await self._ensure_seeded(DASHBOARDS)
+        return [DashboardRecord.from_doc(doc) for doc in await self.backend.list(DASHBOARDS)]
+
+    async def list_dashboards(self) -> List[DashboardSaveRequest]:
+        return [dashboard.to_response() for dashboard in await self._dashboard_records()]
 
-    def is_favorite(self, user_id: str | None, dashboard_id: str) -> bool:
+    async def is_favorite(self, user_id: str | None, dashboard_id: str) -> bool:
         if not user_id:
             return False
-        return dashboard_id in self.dashboard_favorites.get(user_id, set())
+        return dashboard_id in await self.list_favorites(user_id)
+
+    async def list_favorites(self, user_id: str) -> set[str]:
+        doc = await self.backend.get(DASHBOARD_FAVORITES, user_id)
+        return set(doc["dashboards"]) if doc else set()
 
-    def set_favorite(self, user_id: str, dashboard_id: str, favorite: bool) -> None:
-        favorites = self.dashboard_favorites.setdefault(user_id, set())
+    async def set_favorite(self, user_id: str, dashboard_id: str, favorite: bool) -> None:
+        favorites = await self.list_favorites(user_id)
         if favorite:
             favorites.add(dashboard_id)
         else:
             favorites.discard(dashboard_id)
+        await self.backend.put(DASHBOARD_FAVORITES, user_id, {"dashboards": sorted(favorites)})
 
-    def get_dashboard(self, dashboard_id: str) -> DashboardSaveRequest | None:
-        dashboard = self.dashboards.get(dashboard_id)
-        return dashboard.to_response() if dashboard else None
+    async def get_dashboard(self, dashboard_id: str) -> DashboardSaveRequest | None:
+        await self._ensure_seeded(DASHBOARDS)
+        doc = await self.backend.get(DASHBOARDS, dashboard_id)
+        return DashboardRecord.from_doc(doc).to_response() if doc else None
 
-    def save_dashboard(self, payload: DashboardSaveRequest) -> DashboardSaveRequest:
+    async def save_dashboard(self, payload: DashboardSaveRequest) -> DashboardSaveRequest:
+        await self._ensure_seeded(DASHBOARDS)
         dashboard_id = payload.id or str(uuid4())
-        dashboard = self.dashboards.get(
-            dashboard_id,
-            DashboardRecord(
+        doc = await self.backend.get(DASHBOARDS, dashboard_id)
+        dashboard = (
+            DashboardRecord.from_doc(doc)
+            if doc
+            else DashboardRecord(
                 dashboard_id=dashboard_id,
                 name=payload.name,
                 layout=payload.layout or [],
@@ -210,17 +328,14 @@ class TenantMemoryStore:
                 owner_name=payload.ownerName,
                 shared_with=list(payload.sharedWith or []),
                 thumbnail_url=payload.thumbnailUrl or self._generate_thumbnail(dashboard_id),
-            ),
+            )
         )
 
         # Replace widgets for this dashboard
-        dashboard.widgets = {}
+        dashboard.widgets = []
         for widget in payload.widgets:
-            widget_id = widget.id or str(uuid4())
-            widget.id = widget_id
-            record = WidgetRecord(widget_id=widget_id, dashboard_id=dashboard_id, payload=widget)
-            dashboard.widgets[widget_id] = record
-            self.widgets[widget_id] = record
+            widget.id = widget.id or str(uuid4())
+            dashboard.widgets.append(widget)
 
         dashboard.name = payload.name
         dashboard.layout = payload.layout or []
@@ -230,182 +345,228 @@ class TenantMemoryStore:
         dashboard.thumbnail_url = payload.thumbnailUrl or dashboard.thumbnail_url or self._generate_thumbnail(
             dashboard_id
         )
-        self.dashboards[dashboard_id] = dashboard
+        await self.backend.put(DASHBOARDS, dashboard_id, dashboard.to_doc())
         return dashboard.to_response()
 
-    def list_widgets_for_target(self, target: str) -> List[WidgetPayload]:
+    async def list_widgets_for_target(self, target: str) -> List[WidgetPayload]:
         return [
-            record.to_payload()
-            for record in self.widgets.values()
-            if target in record.payload.publishTargets
+            widget
+            for dashboard in await self._dashboard_records()
+            for widget in dashboard.widgets
+            if target in widget.publishTargets
         ]
 
     # Sales data -------------------------------------------------------
-    def list_leads(self) -> List[LeadResponse]:
-        return list(self.leads.values())
+    async def list_leads(self) -> List[LeadResponse]:
+        return await self._list(LEADS, LeadResponse)
 
-    def create_lead(self, payload: LeadCreate) -> LeadResponse:
+    async def create_lead(self, payload: LeadCreate) -> LeadResponse:
         lead_id = str(uuid4())
         lead = LeadResponse(id=lead_id, createdAt=datetime.utcnow(), **payload.model_dump())
-        self.leads[lead_id] = lead
+        await self._put(LEADS, lead_id, lead)
+        if self._kpis is not None:
+            self._kpis.leads += 1
+        self._kpis_changed()
         return lead
 
-    def get_lead(self, lead_id: str) -> LeadResponse:
-        if lead_id not in self.leads:
-            raise KeyError(lead_id)
-        return self.leads[lead_id]
+    async def get_lead(self, lead_id: str) -> LeadResponse:
+        return await self._get(LEADS, lead_id, LeadResponse)
 
-    def update_lead(self, lead_id: str, payload: LeadCreate) -> LeadResponse:
-        lead = self.get_lead(lead_id)
+    async def update_lead(self, lead_id: str, payload: LeadCreate) -> LeadResponse:
+        lead = await self.get_lead(lead_id)
         updated = lead.model_copy(update=payload.model_dump())
-        self.leads[lead_id] = updated
+        await self._put(LEADS, lead_id, updated)
         return updated
 
-    def delete_lead(self, lead_id: str) -> None:
-        if lead_id not in self.leads:
-            raise KeyError(lead_id)
-        del self.leads[lead_id]
+    async def delete_lead(self, lead_id: str) -> None:
+        await self._delete(LEADS, lead_id)
+        if self._kpis is not None:
+            self._kpis.leads -= 1
+        self._kpis_changed()
 
-    def list_opportunities(self) -> List[OpportunityResponse]:
-        return list(self.opportunities.values())
+    async def list_opportunities(self) -> List[OpportunityResponse]:
+        return await self._list(OPPORTUNITIES, OpportunityResponse)
 
-    def create_opportunity(self, payload: OpportunityCreate) -> OpportunityResponse:
+    async def create_opportunity(self, payload: OpportunityCreate) -> OpportunityResponse:
         op_id = str(uuid4())
         opportunity = OpportunityResponse(
             id=op_id,
             updatedAt=datetime.utcnow(),
             **payload.model_dump(),
         )
-        self.opportunities[op_id] = opportunity
+        await self._put(OPPORTUNITIES, op_id, opportunity)
+        if self._kpis is not None:
+            self._kpis.add_opportunity(opportunity)
+        self._kpis_changed()
         return opportunity
 
-    def get_opportunity(self, op_id: str) -> OpportunityResponse:
-        if op_id not in self.opportunities:
-            raise KeyError(op_id)
-        return self.opportunities[op_id]
+    async def get_opportunity(self, op_id: str) -> OpportunityResponse:
+        return await self._get(OPPORTUNITIES, op_id, OpportunityResponse)
 
-    def update_opportunity(self, op_id: str, payload: OpportunityCreate) -> OpportunityResponse:
-        opportunity = self.get_opportunity(op_id)
+    async def update_opportunity(self, op_id: str, payload: OpportunityCreate) -> OpportunityResponse:
+        opportunity = await self.get_opportunity(op_id)
         updated = opportunity.model_copy(update={**payload.model_dump(), "updatedAt": datetime.utcnow()})
-        self.opportunities[op_id] = updated
+        await self._put(OPPORTUNITIES, op_id, updated)
+        if self._kpis is not None:
+            self._kpis.remove_opportunity(opportunity)
+            self._kpis.add_opportunity(updated)
+        self._kpis_changed()
         return updated
 
-    def delete_opportunity(self, op_id: str) -> None:
-        if op_id not in self.opportunities:
-            raise KeyError(op_id)
-        del self.opportunities[op_id]
+    async def delete_opportunity(self, op_id: str) -> None:
+        opportunity = await self.get_opportunity(op_id)
+        await self._delete(OPPORTUNITIES, op_id)
+        if self._kpis is not None:
+            self._kpis.remove_opportunity(opportunity)
+        self._kpis_changed()
 
-    def list_accounts(self) -> List[AccountResponse]:
-        return list(self.accounts.values())
+    async def list_accounts(self) -> List[AccountResponse]:
+        return await self._list(ACCOUNTS, AccountResponse)
 
-    def create_account(self, payload: AccountCreate) -> AccountResponse:
+    async def create_account(self, payload: AccountCreate) -> AccountResponse:
         account_id = str(uuid4())
         account = AccountResponse(id=account_id, **payload.model_dump())
-        self.accounts[account_id] = account
+        await self._put(ACCOUNTS, account_id, account)
         return account
 
-    def list_contacts(self) -> List[ContactResponse]:
-        return list(self.contacts.values())
+    async def list_contacts(self) -> List[ContactResponse]:
+        return await self._list(CONTACTS, ContactResponse)
 
-    def create_contact(self, payload: ContactCreate) -> ContactResponse:
+    async def create_contact(self, payload: ContactCreate) -> ContactResponse:
         contact_id = str(uuid4())
         contact = ContactResponse(id=contact_id, **payload.model_dump())
-        self.contacts[contact_id] = contact
+        await self._put(CONTACTS, contact_id, contact)
         return contact
 
     # Product catalog -------------------------------------------------
-    def list_products(self) -> List[ProductResponse]:
-        return list(self.products.values())
+    async def list_products(self) -> List[ProductResponse]:
+        return await self._list(PRODUCTS, ProductResponse)
 
-    def create_product(self, payload: ProductCreate) -> ProductResponse:
+    async def create_product(self, payload: ProductCreate) -> ProductResponse:
         product_id = str(uuid4())
         product = ProductResponse(id=product_id, **payload.model_dump())
-        self.products[product_id] = product
+        await self._put(PRODUCTS, product_id, product)
         return product
 
     # Marketing data ---------------------------------------------------
-    def list_campaigns(self) -> List[CampaignResponse]:
-        return list(self.campaigns.values())
+    async def list_campaigns(self) -> List[CampaignResponse]:
+        return await self._list(CAMPAIGNS, CampaignResponse)
 
-    def create_campaign(self, payload: CampaignCreate) -> CampaignResponse:
+    async def create_campaign(self, payload: CampaignCreate) -> CampaignResponse:
         campaign_id = str(uuid4())
         campaign = CampaignResponse(id=campaign_id, **payload.model_dump())
-        self.campaigns[campaign_id] = campaign
+        await self._put(CAMPAIGNS, campaign_id, campaign)
         return campaign
 
-    def list_segments(self) -> List[SegmentResponse]:
-        return list(self.segments.values())
+    async def list_segments(self) -> List[SegmentResponse]:
+        return await self._list(SEGMENTS, SegmentResponse)
 
-    def create_segment(self, payload: SegmentCreate) -> SegmentResponse:
+    async def create_segment(self, payload: SegmentCreate) -> SegmentResponse:
         segment_id = str(uuid4())
         segment = SegmentResponse(id=segment_id, **payload.model_dump())
-        self.segments[segment_id] = segment
+        await self._put(SEGMENTS, segment_id, segment)
         return segment
 
     # Solucoes (Trade Marketing / Atendimento) -----------------------
-    def list_trade_visits(self) -> List[TradeVisit]:
-        return self.trade_visits
+    async def list_trade_visits(self) -> List[TradeVisit]:
+        return await self._list(TRADE_VISITS, TradeVisit)
 
-    def add_trade_visit(self, visit: TradeVisit) -> None:
-        self.trade_visits.append(visit)
+    async def add_trade_visit(self, visit: TradeVisit) -> None:
+        await self._put(TRADE_VISITS, visit.id, visit)
 
-    def list_support_tickets(self) -> List[SupportTicket]:
-        return self.support_tickets
+    async def list_support_tickets(self) -> List[SupportTicket]:
+        return await self._list(SUPPORT_TICKETS, SupportTicket)
 
-    def add_support_ticket(self, ticket: SupportTicket) -> None:
-        self.support_tickets.append(ticket)
+    async def add_support_ticket(self, ticket: SupportTicket) -> None:
+        await self._put(SUPPORT_TICKETS, ticket.id, ticket)
 
     # Automacao -------------------------------------------------------
-    def list_workflows(self) -> List[WorkflowResponse]:
-        return list(self.workflows.values())
+    async def list_workflows(self) -> List[WorkflowResponse]:
+        return await self._list(WORKFLOWS, WorkflowResponse)
 
-    def save_workflow(self, payload: WorkflowCreate) -> WorkflowResponse:
+    async def save_workflow(self, payload: WorkflowCreate) -> WorkflowResponse:
         workflow_id = str(uuid4())
         workflow = WorkflowResponse(id=workflow_id, ultimaExecucao=None, **payload.model_dump())
-        self.workflows[workflow_id] = workflow
+        await self._put(WORKFLOWS, workflow_id, workflow)
         return workflow
 
-    def trigger_workflow(self, workflow_id: str) -> WorkflowRunResponse:
-        if workflow_id not in self.workflows:
-            raise KeyError(workflow_id)
+    async def trigger_workflow(self, workflow_id: str) -> WorkflowRunResponse:
+        workflow = await self._get(WORKFLOWS, workflow_id, WorkflowResponse)
         triggered_at = datetime.utcnow()
-        workflow = self.workflows[workflow_id]
         workflow.ultimaExecucao = triggered_at
+        await self._put(WORKFLOWS, workflow_id, workflow)
         return WorkflowRunResponse(workflowId=workflow_id, status="triggered", triggeredAt=triggered_at)
 
-    def list_triggers(self) -> List[AutomationTriggerResponse]:
-        return list(self.triggers.values())
+    async def list_triggers(self) -> List[AutomationTriggerResponse]:
+        return await self._list(TRIGGERS, AutomationTriggerResponse)
 
-    def create_trigger(self, payload: AutomationTriggerCreate) -> AutomationTriggerResponse:
+    async def create_trigger(self, payload: AutomationTriggerCreate) -> AutomationTriggerResponse:
         trigger_id = str(uuid4())
         trigger = AutomationTriggerResponse(id=trigger_id, **payload.model_dump())
-        self.triggers[trigger_id] = trigger
+        await self._put(TRIGGERS, trigger_id, trigger)
         return trigger
 
-    def list_email_templates(self) -> List[EmailTemplateResponse]:
-        return list(self.email_templates.values())
+    async def list_email_templates(self) -> List[EmailTemplateResponse]:
+        return await self._list(EMAIL_TEMPLATES, EmailTemplateResponse)
 
-    def create_email_template(self, payload: EmailTemplateCreate) -> EmailTemplateResponse:
+    async def create_email_template(self, payload: EmailTemplateCreate) -> EmailTemplateResponse:
         template_id = str(uuid4())
         template = EmailTemplateResponse(
             id=template_id,
             ultimaAtualizacao=datetime.utcnow(),
             **payload.model_dump(),
         )
-        self.email_templates[template_id] = template
+        await self._put(EMAIL_TEMPLATES, template_id, template)
         return template
 
     # Inicio dashboard -------------------------------------------------
-    def list_activities(self) -> List[ActivityItem]:
-        return self.activities
-
-    def add_activity(self, activity: ActivityItem) -> None:
-        self.activities.append(activity)
+    async def list_activities(self, limit: Optional[int] = None) -> List[ActivityItem]:
+        """Activities in insertion order; with ``limit``, only the most recent ones."""
+        return await self._list(ACTIVITIES, ActivityItem, limit)
+
+    async def add_activity(self, activity: ActivityItem) -> None:
+        # _put substitui uma atividade com o mesmo id; o agregado desconta a versao anterior.
+        previous = await self.backend.get(ACTIVITIES, activity.id) if self._kpis is not None else None
+        await self._put(ACTIVITIES, activity.id, activity)
+        if self._kpis is not None:
+            if previous is not None:
+                self._kpis.remove_activity(ActivityItem.model_validate(previous))
+            self._kpis.add_activity(activity)
+        self._kpis_changed()
+
+    async def _compute_kpis(self) -> KPIAggregate:
+        return KPIAggregate.compute(
+            await self.list_opportunities(),
+            await self.list_activities(),
+            len(await self.list_leads()),
+        )
 
-    def list_reminders(self) -> List[dict[str, str]]:
+    async def kpis(self) -> KPIAggregate:
+        if self._kpis is None:
+            self._kpis = await self._compute_kpis()
+        return self._kpis
+
+    def _kpis_changed(self) -> None:
+        if self._on_kpis_changed is not None:
+            self._on_kpis_changed()
+
+    def invalidate_kpis(self) -> None:
+        """Drop the aggregate; the next kpis() recomputes it (writes made by another worker)."""
+        self._kpis = None
+
+    async def check_kpis(self) -> bool:
+        """Recompute the aggregate from scratch; return False if it had drifted."""
+        if self._kpis is None:
+            return True
+        fresh = await self._compute_kpis()
+        consistent = self._kpis.matches(fresh)
+        self._kpis = fresh
+        return consistent
+
+    async def list_reminders(self) -> List[dict[str, str]]:
         reminders: List[dict[str, str]] = []
         now = datetime.utcnow()
-        for activity in self.activities:
+        for activity in await self.list_activities():
             urgency = "Alto" if activity.dueDate <= now + timedelta(days=1) else "Normal"
             reminders.append(
                 {
@@ -422,318 +583,452 @@ class TenantMemoryStore:
         return reminders
 
 
-class DataStore:
-    """Keeps a TenantMemoryStore per tenant_id."""
-
-    def __init__(self) -> None:
-        self._stores: Dict[str, TenantMemoryStore] = {}
-        # Legacy in-memory auth removed; JWT stateless is used instead.
-
-    def get_store(self, tenant_id: str) -> TenantMemoryStore:
-        if tenant_id not in self._stores:
-            self._stores[tenant_id] = TenantMemoryStore()
-            self._seed_defaults(self._stores[tenant_id])
-        return self._stores[tenant_id]
-
-    def _seed_defaults(self, store: TenantMemoryStore) -> None:
-        # Seed a few meta objects so the UI is populated.
-        defaults = [
-            MetaObjectCreate(
-                idObjeto="tb_oportunidade",
-                nomeAmigavel="Oportunidades (Base)",
-                tipo="BASE",
-                status="Ativo",
-                descricao="Tabela base de oportunidades.",
-                fields=["ID", "NOME", "STATUS", "VALOR"],
-            ),
-            MetaObjectCreate(
-                idObjeto="obj_vendas_campanha",
-                nomeAmigavel="Vendas por Campanha",
-                tipo="CUSTOMIZADO",
-                status="Ativo",
-                descricao="Objeto criado no Estudio SQL unindo vendas e campanhas.",
-                fields=["CAMPANHA_NOME", "VALOR_ESTIMADO"],
-            ),
-        ]
-        for meta in defaults:
-            record = store.create_meta_object(meta)
-            store.update_permissions(record.metaId, [profile.id for profile in DEFAULT_PROFILES])
-
-        # Simulate an initial widget so the containers render something
-        initial_widget = WidgetPayload(
-            id=str(uuid4()),
-            title="Vendas por Campanha",
-            chartType="bar",
-            objectId="obj_vendas_campanha",
-            objectLabel="Vendas por Campanha",
-            groupBy="campanha",
-            aggregate="SUM",
-            aggregateField="valor",
-            data=[
-                {"campanha": "Natal", "valor": 52000},
-                {"campanha": "Black Friday", "valor": 87000},
-                {"campanha": "Lancamento Q4", "valor": 34000},
-            ],
-            publishTargets=["DASHBOARD_INICIO", "MOD_VENDAS"],
+# Seeds por colecao ----------------------------------------------------
+# Cada seeder so escreve na propria colecao: TenantStore._ensure_seeded
+# segura o lock de seed enquanto ele roda.
+async def _seed_meta_objects(store: TenantStore) -> None:
+    # Seed a few meta objects so the UI is populated.
+    defaults = [
+        MetaObjectCreate(
+            idObjeto="tb_oportunidade",
+            nomeAmigavel="Oportunidades (Base)",
+            tipo="BASE",
+            status="Ativo",
+            descricao="Tabela base de oportunidades.",
+            fields=["ID", "NOME", "STATUS", "VALOR"],
+        ),
+        MetaObjectCreate(
+            idObjeto="obj_vendas_campanha",
+            nomeAmigavel="Vendas por Campanha",
+            tipo="CUSTOMIZADO",
+            status="Ativo",
+            descricao="Objeto criado no Estudio SQL unindo vendas e campanhas.",
+            fields=["CAMPANHA_NOME", "VALOR_ESTIMADO"],
+        ),
+    ]
+    for meta in defaults:
+        record = await store.create_meta_object(meta)
+        await store.update_permissions(record.metaId, [profile.id for profile in DEFAULT_PROFILES])
+
+
+async def _seed_dashboards(store: TenantStore) -> None:
+    # Simulate an initial widget so the containers render something
+    initial_widget = WidgetPayload(
+        id=str(uuid4()),
+        title="Vendas por Campanha",
+        chartType="bar",
+        objectId="obj_vendas_campanha",
+        objectLabel="Vendas por Campanha",
+        groupBy="campanha",
+        aggregate="SUM",
+        aggregateField="valor",
+        data=[
+            {"campanha": "Natal", "valor": 52000},
+            {"campanha": "Black Friday", "valor": 87000},
+            {"campanha": "Lancamento Q4", "valor": 34000},
+        ],
+        publishTargets=["DASHBOARD_INICIO", "MOD_VENDAS"],
+    )
+    dashboard = DashboardSaveRequest(
+        id=str(uuid4()),
+        name="Painel Comercial",
+        widgets=[initial_widget],
+        ownerId="aline@nexuscrm.com",
+        ownerName="aline@nexuscrm.com",
+        thumbnailUrl=store._generate_thumbnail("painel_comercial"),
+        sharedWith=["diretoria@nexuscrm.com", "marketing@nexuscrm.com"],
+    )
+    await store.save_dashboard(dashboard)
+
+
+async def _seed_leads(store: TenantStore) -> None:
+    await store.create_lead(
+        LeadCreate(
+            nome="Luana Ribeiro",
+            email="luana@superlima.com",
+            status="Novo",
+            origem="Inbound",
+            owner="Aline Husni",
         )
-        dashboard = DashboardSaveRequest(
-            id=str(uuid4()),
-            name="Painel Comercial",
-            widgets=[initial_widget],
-            ownerId="aline@nexuscrm.com",
-            ownerName="aline@nexuscrm.com",
-            thumbnailUrl=store._generate_thumbnail("painel_comercial"),
-            sharedWith=["diretoria@nexuscrm.com", "marketing@nexuscrm.com"],
-        )
-        store.save_dashboard(dashboard)
-
-        # Sales seed data
-        store.create_lead(
-            LeadCreate(
-                nome="Luana Ribeiro",
-                email="luana@superlima.com",
-                status="Novo",
-                origem="Inbound",
-                owner="Aline Husni",
-            )
-        )
-        store.create_lead(
-            LeadCreate(
-                nome="Carlos Mendes",
-                email="carlos@clinicmais.com",
-                status="Qualificado",
-                origem="Evento",
-                owner="Carlos Nogueira",
-            )
+    )
+    await store.create_lead(
+        LeadCreate(
+            nome="Carlos Mendes",
+            email="carlos@clinicmais.com",
+            status="Qualificado",
+            origem="Evento",
+            owner="Carlos Nogueira",
         )
+    )
 
-        store.create_opportunity(
-            OpportunityCreate(
-                nome="Supermercado Lima",
-                stage="Propostas",
-                valor=52000,
-                probabilidade=0.62,
-                owner="Aline Husni",
-            )
+
+async def _seed_opportunities(store: TenantStore) -> None:
+    await store.create_opportunity(
+        OpportunityCreate(
+            nome="Supermercado Lima",
+            stage="Propostas",
+            valor=52000,
+            probabilidade=0.62,
+            owner="Aline Husni",
         )
-        store.create_opportunity(
-            OpportunityCreate(
-                nome="Rede Clinic+",
-                stage="Negociacao",
-                valor=35000,
-                probabilidade=0.55,
-                owner="Carlos Nogueira",
-            )
+    )
+    await store.create_opportunity(
+        OpportunityCreate(
+            nome="Rede Clinic+",
+            stage="Negociacao",
+            valor=35000,
+            probabilidade=0.55,
+            owner="Carlos Nogueira",
         )
-        store.create_opportunity(
-            OpportunityCreate(
-                nome="Grupo Aurora",
-                stage="Demonstracao",
-                valor=19000,
-                probabilidade=0.45,
-                owner="Patricia Sampaio",
-            )
+    )
+    await store.create_opportunity(
+        OpportunityCreate(
+            nome="Grupo Aurora",
+            stage="Demonstracao",
+            valor=19000,
+            probabilidade=0.45,
+            owner="Patricia Sampaio",
         )
-
-        store.create_account(
-            AccountCreate(nome="Supermercado Lima", segmento="Varejo", cidade="Fortaleza", estado="CE")
+    )
+
+
+async def _seed_accounts(store: TenantStore) -> None:
+    await store.create_account(
+        AccountCreate(nome="Supermercado Lima", segmento="Varejo", cidade="Fortaleza", estado="CE")
+    )
+    await store.create_account(
+        AccountCreate(nome="Rede Clinic+", segmento="Saude", cidade="Curitiba", estado="PR")
+    )
+
+
+async def _seed_contacts(store: TenantStore) -> None:
+    await store.create_contact(
+        ContactCreate(nome="Marina Torres", email="marina@superlima.com", telefone="(85) 98888-1122", conta="Supermercado Lima")
+    )
+    await store.create_contact(
+        ContactCreate(nome="Roberto Dias", email="rdias@clinicmais.com", telefone="(41) 97777-4411", conta="Rede Clinic+")
+    )
+
+
+async def _seed_products(store: TenantStore) -> None:
+    await store.create_product(
+        ProductCreate(
+            sku="SKU-CRM-001",
+            nome="Modulo Field Sales",
+            categoria="Software",
+            preco=1990.0,
+            margem=0.42,
+            disponibilidade="Disponivel",
+            descricao="Pacote de licencas com roteirizacao e checklists.",
         )
-        store.create_account(
-            AccountCreate(nome="Rede Clinic+", segmento="Saude", cidade="Curitiba", estado="PR")
+    )
+    await store.create_product(
+        ProductCreate(
+            sku="SKU-CRM-014",
+            nome="Kit Trade Marketing",
+            categoria="Servicos",
+            preco=7200.0,
+            margem=0.55,
+            disponibilidade="Backorder",
+            descricao="Time dedicado para execucao de campanhas em loja.",
         )
+    )
 
-        store.create_contact(
-            ContactCreate(nome="Marina Torres", email="marina@superlima.com", telefone="(85) 98888-1122", conta="Supermercado Lima")
-        )
-        store.create_contact(
-            ContactCreate(nome="Roberto Dias", email="rdias@clinicmais.com", telefone="(41) 97777-4411", conta="Rede Clinic+")
-        )
 
-        store.create_product(
-            ProductCreate(
-                sku="SKU-CRM-001",
-                nome="Modulo Field Sales",
-                categoria="Software",
-                preco=1990.0,
-                margem=0.42,
-                disponibilidade="Disponivel",
-                descricao="Pacote de licencas com roteirizacao e checklists.",
-            )
+async def _seed_campaigns(store: TenantStore) -> None:
+    await store.create_campaign(
+        CampaignCreate(
+            nome="Black Friday 2025",
+            status="Ativa",
+            investimento=87000,
+            inicio="2025-11-01",
+            fim="2025-11-30",
         )
-        store.create_product(
-            ProductCreate(
-                sku="SKU-CRM-014",
-                nome="Kit Trade Marketing",
-                categoria="Servicos",
-                preco=7200.0,
-                margem=0.55,
-                disponibilidade="Backorder",
-                descricao="Time dedicado para execucao de campanhas em loja.",
-            )
+    )
+    await store.create_campaign(
+        CampaignCreate(
+            nome="Lançamento Q4",
+            status="Planejada",
+            investimento=34000,
+            inicio="2025-12-05",
+            fim="2026-01-05",
         )
+    )
 
-        store.create_campaign(
-            CampaignCreate(
-                nome="Black Friday 2025",
-                status="Ativa",
-                investimento=87000,
-                inicio="2025-11-01",
-                fim="2025-11-30",
-            )
-        )
-        store.create_campaign(
-            CampaignCreate(
-                nome="Lançamento Q4",
-                status="Planejada",
-                investimento=34000,
-                inicio="2025-12-05",
-                fim="2026-01-05",
-            )
-        )
 
-        store.create_segment(
-            SegmentCreate(nome="Clientes VIP", regra="Ticket > R$ 40k nos ultimos 90 dias", tamanho=42)
-        )
-        store.create_segment(
-            SegmentCreate(nome="Segmento Nordeste", regra="Contas da regiao Nordeste", tamanho=185)
-        )
+async def _seed_segments(store: TenantStore) -> None:
+    await store.create_segment(
+        SegmentCreate(nome="Clientes VIP", regra="Ticket > R$ 40k nos ultimos 90 dias", tamanho=42)
+    )
+    await store.create_segment(
+        SegmentCreate(nome="Segmento Nordeste", regra="Contas da regiao Nordeste", tamanho=185)
+    )
 
-        now = datetime.utcnow()
-        store.add_activity(
-            ActivityItem(
-                id=str(uuid4()),
-                customer="Supermercado Lima",
-                action="Enviar proposta Platinum",
-                status="Em andamento",
-                badge="Pipeline",
-                dueDate=now + timedelta(days=1),
-            )
+
+async def _seed_activities(store: TenantStore) -> None:
+    now = datetime.utcnow()
+    await store.add_activity(
+        ActivityItem(
+            id=str(uuid4()),
+            customer="Supermercado Lima",
+            action="Enviar proposta Platinum",
+            status="Em andamento",
+            badge="Pipeline",
+            dueDate=now + timedelta(days=1),
         )
-        store.add_activity(
-            ActivityItem(
-                id=str(uuid4()),
-                customer="Rede Clinic+",
-                action="Agendar follow-up",
-                status="Aguardando cliente",
-                badge="Agenda",
-                dueDate=now + timedelta(days=2),
-            )
+    )
+    await store.add_activity(
+        ActivityItem(
+            id=str(uuid4()),
+            customer="Rede Clinic+",
+            action="Agendar follow-up",
+            status="Aguardando cliente",
+            badge="Agenda",
+            dueDate=now + timedelta(days=2),
         )
-        store.add_activity(
-            ActivityItem(
-                id=str(uuid4()),
-                customer="Grupo Aurora",
-                action="Revisar metas do trimestre",
-                status="Planejado",
-                badge="Estrategia",
-                dueDate=now + timedelta(days=3),
-            )
+    )
+    await store.add_activity(
+        ActivityItem(
+            id=str(uuid4()),
+            customer="Grupo Aurora",
+            action="Revisar metas do trimestre",
+            status="Planejado",
+            badge="Estrategia",
+            dueDate=now + timedelta(days=3),
         )
+    )
 
-        store.add_trade_visit(
-            TradeVisit(
-                id=str(uuid4()),
-                cliente="Rede Norte Atacado",
-                canal="Cash&Carry",
-                objetivo="Auditar ponta extra",
-                status="Concluido",
-                responsavel="Bruna Azevedo",
-                proximaAcao="Enviar relatorio com fotos",
-                data=now - timedelta(days=1),
-            )
+
+async def _seed_trade_visits(store: TenantStore) -> None:
+    now = datetime.utcnow()
+    await store.add_trade_visit(
+        TradeVisit(
+            id=str(uuid4()),
+            cliente="Rede Norte Atacado",
+            canal="Cash&Carry",
+            objetivo="Auditar ponta extra",
+            status="Concluido",
+            responsavel="Bruna Azevedo",
+            proximaAcao="Enviar relatorio com fotos",
+            data=now - timedelta(days=1),
         )
-        store.add_trade_visit(
-            TradeVisit(
-                id=str(uuid4()),
-                cliente="Supermercado Lima",
-                canal="Varejo",
-                objetivo="Ativar degustacao premium",
-                status="Em andamento",
-                responsavel="Lucas Porto",
-                proximaAcao="Confirmar equipe de promotoras",
-                data=now + timedelta(days=2),
-            )
+    )
+    await store.add_trade_visit(
+        TradeVisit(
+            id=str(uuid4()),
+            cliente="Supermercado Lima",
+            canal="Varejo",
+            objetivo="Ativar degustacao premium",
+            status="Em andamento",
+            responsavel="Lucas Porto",
+            proximaAcao="Confirmar equipe de promotoras",
+            data=now + timedelta(days=2),
         )
+    )
 
-        store.add_support_ticket(
-            SupportTicket(
-                id=str(uuid4()),
-                cliente="Rede Clinic+",
-                canal="E-mail",
-                assunto="Integracao BI travada",
-                prioridade="Alta",
-                status="Aberto",
-                owner="Time Atendimento",
-                sla="4h",
-            )
+
+async def _seed_support_tickets(store: TenantStore) -> None:
+    await store.add_support_ticket(
+        SupportTicket(
+            id=str(uuid4()),
+            cliente="Rede Clinic+",
+            canal="E-mail",
+            assunto="Integracao BI travada",
+            prioridade="Alta",
+            status="Aberto",
+            owner="Time Atendimento",
+            sla="4h",
         )
-        store.add_support_ticket(
-            SupportTicket(
-                id=str(uuid4()),
-                cliente="Supermercado Lima",
-                canal="Portal",
-                assunto="Erro ao sincronizar contas",
-                prioridade="Media",
-                status="Em progresso",
-                owner="CS Aline",
-                sla="8h",
-            )
+    )
+    await store.add_support_ticket(
+        SupportTicket(
+            id=str(uuid4()),
+            cliente="Supermercado Lima",
+            canal="Portal",
+            assunto="Erro ao sincronizar contas",
+            prioridade="Media",
+            status="Em progresso",
+            owner="CS Aline",
+            sla="8h",
         )
+    )
 
-        store.save_workflow(
-            WorkflowCreate(
-                nome="Onboarding de Leads Enterprise",
-                descricao="Cria tarefa para SDR e envia e-mail automatizado.",
-                status="Ativo",
-            )
+
+async def _seed_workflows(store: TenantStore) -> None:
+    await store.save_workflow(
+        WorkflowCreate(
+            nome="Onboarding de Leads Enterprise",
+            descricao="Cria tarefa para SDR e envia e-mail automatizado.",
+            status="Ativo",
         )
-        store.save_workflow(
-            WorkflowCreate(
-                nome="Reengajar oportunidades congeladas",
-                descricao="Dispara alerta para gestor apos 30 dias sem movimentacao.",
-                status="Ativo",
-            )
+    )
+    await store.save_workflow(
+        WorkflowCreate(
+            nome="Reengajar oportunidades congeladas",
+            descricao="Dispara alerta para gestor apos 30 dias sem movimentacao.",
+            status="Ativo",
         )
+    )
 
-        store.create_trigger(
-            AutomationTriggerCreate(
-                nome="Lead com ticket > 50k",
-                objeto="Lead",
-                condicao="valor_estimado > 50000",
-                acao="Notificar Diretoria",
-                status="Ativo",
-            )
+
+async def _seed_triggers(store: TenantStore) -> None:
+    await store.create_trigger(
+        AutomationTriggerCreate(
+            nome="Lead com ticket > 50k",
+            objeto="Lead",
+            condicao="valor_estimado > 50000",
+            acao="Notificar Diretoria",
+            status="Ativo",
         )
-        store.create_trigger(
-            AutomationTriggerCreate(
-                nome="Campanha com CPA acima do teto",
-                objeto="Campanha",
-                condicao="cpa > 120",
-                acao="Pausar automacao",
-                status="Monitorando",
-            )
+    )
+    await store.create_trigger(
+        AutomationTriggerCreate(
+            nome="Campanha com CPA acima do teto",
+            objeto="Campanha",
+            condicao="cpa > 120",
+            acao="Pausar automacao",
+            status="Monitorando",
         )
+    )
 
-        store.create_email_template(
-            EmailTemplateCreate(
-                nome="Follow-up Padrao",
-                assunto="Seguimos com a proposta, {{contato}}?",
-                owner="Marketing Ops",
-                status="Ativo",
-                conteudo="Ola {{contato}}, passando para saber se conseguiu revisar nossa proposta.",
-            )
+
+async def _seed_email_templates(store: TenantStore) -> None:
+    await store.create_email_template(
+        EmailTemplateCreate(
+            nome="Follow-up Padrao",
+            assunto="Seguimos com a proposta, {{contato}}?",
+            owner="Marketing Ops",
+            status="Ativo",
+            conteudo="Ola {{contato}}, passando para saber se conseguiu revisar nossa proposta.",
         )
-        store.create_email_template(
-            EmailTemplateCreate(
-                nome="Alerta de renovacao",
-                assunto="Sua renovacao Nexus CRM vence em 30 dias",
-                owner="Customer Success",
-                status="Rascunho",
-                conteudo="Ola {{cliente}}, segue briefing da renovacao e condicoes especiais.",
-            )
+    )
+    await store.create_email_template(
+        EmailTemplateCreate(
+            nome="Alerta de renovacao",
+            assunto="Sua renovacao Nexus CRM vence em 30 dias",
+            owner="Customer Success",
+            status="Rascunho",
+            conteudo="Ola {{cliente}}, segue briefing da renovacao e condicoes especiais.",
+        )
+    )
+
+
+DEFAULT_SEEDERS: Dict[str, Seeder] = {
+    META_OBJECTS: _seed_meta_objects,
+    DASHBOARDS: _seed_dashboards,
+    LEADS: _seed_leads,
+    OPPORTUNITIES: _seed_opportunities,
+    ACCOUNTS: _seed_accounts,
+    CONTACTS: _seed_contacts,
+    PRODUCTS: _seed_products,
+    CAMPAIGNS: _seed_campaigns,
+    SEGMENTS: _seed_segments,
+    ACTIVITIES: _seed_activities,
+    TRADE_VISITS: _seed_trade_visits,
+    SUPPORT_TICKETS: _seed_support_tickets,
+    WORKFLOWS: _seed_workflows,
+    TRIGGERS: _seed_triggers,
+    EMAIL_TEMPLATES: _seed_email_templates,
+}
+
+
+class DataStore:
+    """Bounded LRU of TenantStore per tenant_id on the configured backend.
+
+    Only stores whose backend persists the documents (Postgres) are evicted:
+    dropping one only drops the handle. The memory backend holds the only
+    copy of the tenant's data, so it is never evicted; exceeding the limits
+    there is logged instead.
+    """
+
+    def __init__(self, max_tenants: int | None = None, max_bytes: int | None = None) -> None:
+        self._stores: "OrderedDict[str, TenantStore]" = OrderedDict()
+        self.max_tenants = settings.data_store_max_tenants if max_tenants is None else max_tenants
+        self.max_bytes = settings.data_store_max_bytes if max_bytes is None else max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self._over_limit_logged = False
+        # Legacy in-memory auth removed; JWT stateless is used instead.
+
+    def _track_bytes(self, delta: int) -> None:
+        self.bytes += delta
+
+    async def get_store(self, tenant_id: str) -> TenantStore:
+        store = self._stores.get(tenant_id)
+        if store is None:
+            self.misses += 1
+            backend = create_backend(tenant_id, self._track_bytes)
+            # Com o backend memory cada worker tem os proprios dados: nao ha o que avisar.
+            notify = (lambda: self._publish_kpis_changed(tenant_id)) if backend.persistent else None
+            store = TenantStore(backend, DEFAULT_SEEDERS, notify)
+            self._stores[tenant_id] = store
+        else:
+            self.hits += 1
+            self._stores.move_to_end(tenant_id)
+        self._evict()
+        return store
+
+    def _over_limit(self) -> bool:
+        return (self.max_tenants > 0 and len(self._stores) > self.max_tenants) or (
+            self.max_bytes > 0 and self.bytes > self.max_bytes
         )
 
-        # Demo user seeding removed (legacy in-memory auth).
+    def _evict(self) -> None:
+        if not self._over_limit():
+            self._over_limit_logged = False
+            return
+        # Todos os stores usam o mesmo backend (DATA_STORE_BACKEND).
+        if not next(iter(self._stores.values())).backend.persistent:
+            if not self._over_limit_logged:
+                self._over_limit_logged = True
+                logger.warning(
+                    "DataStore acima do limite (%s tenants, %s bytes); backend memory nao descarta dados",
+                    len(self._stores),
+                    self.bytes,
+                )
+            return
+        # O tenant mais recente (fim do OrderedDict) nunca e removido.
+        while len(self._stores) > 1 and self._over_limit():
+            _, evicted = self._stores.popitem(last=False)
+            evicted.backend.detach()
+            self.bytes -= evicted.backend.bytes
+            self.evicted_bytes += evicted.backend.bytes
+            self.evictions += 1
+
+    @staticmethod
+    def _publish_kpis_changed(tenant_id: str) -> None:
+        event_bus.publish(DomainEvent(name=STORE_KPIS_CHANGED, tenant_id=tenant_id, data={}))
+
+    def invalidate_kpis(self, tenant_id: str) -> None:
+        store = self._stores.get(tenant_id)
+        if store is not None:
+            store.invalidate_kpis()
+
+    async def check_kpis(self) -> dict[str, int]:
+        checked = drifted = 0
+        for store in list(self._stores.values()):
+            if store._kpis is None:
+                continue
+            checked += 1
+            if not await store.check_kpis():
+                drifted += 1
+        return {"checked": checked, "drifted": drifted}
+
+    def stats(self) -> dict[str, int | str]:
+        return {
+            "backend": settings.data_store_backend,
+            "tenants": len(self._stores),
+            "max_tenants": self.max_tenants,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+        }
+
 
-    
 data_store = DataStore()
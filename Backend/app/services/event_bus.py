@@ -0,0 +1,266 @@
+"""In-process domain event bus fed by the repositories after commit.
+
+Repositories call stage_event() next to their write; the events ride on the
+session (session.info) and are published by the Session ``after_commit``
+hook, so subscribers only ever see committed changes. A rollback discards
+them. The tenant comes from the session as well (get_tenant_scope tags it).
+
+Each subscriber owns a bounded queue and a consumer task that hands it
+batches of up to ``batch_size`` events, waiting at most ``max_wait_ms`` to
+fill one. publish() never blocks: when a subscriber's queue is full the
+event is dropped for that subscriber and counted. Events published by other
+processes (app.services.event_notify) carry their origin, so a subscriber
+can choose local, remote or all events. An event committed without a tenant
+(neither passed to stage_event nor tagged on the session) is not published:
+it is logged and counted as ``untagged``.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+OPPORTUNITY_CREATED = "opportunity.created"
+OPPORTUNITY_UPDATED = "opportunity.updated"
+OPPORTUNITY_DELETED = "opportunity.deleted"
+OPPORTUNITIES_IMPORTED = "opportunities.imported"
+CONTACT_CREATED = "contact.created"
+CONTACTS_IMPORTED = "contacts.imported"
+CAMPAIGN_CREATED = "campaign.created"
+SEGMENT_CREATED = "segment.created"
+# Mudanca nas tabelas de RBAC (globais, sem tenant; publicado direto por invalidate_role_permissions)
+RBAC_CHANGED = "rbac.changed"
+# Escrita do DataStore que altera os KPIs do dashboard (publicado direto, sem sessao SQL)
+STORE_KPIS_CHANGED = "store.kpis_changed"
+
+PENDING_EVENTS_INFO_KEY = "nexus_pending_events"
+TENANT_INFO_KEY = "nexus_tenant_id"
+
+# Identifica os eventos publicados por este processo (vs. recebidos via LISTEN/NOTIFY)
+PROCESS_ID = uuid.uuid4().hex
+
+SCOPES = ("local", "remote", "all")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@dataclass(frozen=True, slots=True)
+class DomainEvent:
+    name: str
+    tenant_id: Optional[str]
+    data: Mapping[str, Any]
+    event_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    occurred_at: str = field(default_factory=_now)
+    origin: str = PROCESS_ID
+
+    @property
+    def is_local(self) -> bool:
+        return self.origin == PROCESS_ID
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), separators=(",", ":"), default=str)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "DomainEvent":
+        """ValueError when ``raw`` is not a serialized DomainEvent."""
+        try:
+            return cls(**json.loads(raw))
+        except (TypeError, json.JSONDecodeError) as exc:
+            raise ValueError("Evento invalido") from exc
+
+
+Handler = Callable[[List[DomainEvent]], Awaitable[None]]
+
+
+class Subscription:
+    """A subscriber's filter, bounded queue and delivery counters."""
+
+    def __init__(
+        self,
+        name: str,
+        handler: Handler,
+        events: Optional[Iterable[str]],
+        scope: str,
+        batch_size: int,
+        max_wait_ms: float,
+        queue_size: int,
+    ) -> None:
+        if scope not in SCOPES:
+            raise ValueError(f"scope deve ser um de {SCOPES}")
+        self.name = name
+        self.handler = handler
+        self.events: Optional[FrozenSet[str]] = frozenset(events) if events is not None else None
+        self.scope = scope
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.queue: asyncio.Queue[DomainEvent] = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
+        self.delivered = 0
+        self.dropped = 0
+        self.failed_batches = 0
+
+    def accepts(self, domain_event: DomainEvent) -> bool:
+        if self.events is not None and domain_event.name not in self.events:
+            return False
+        if self.scope == "local":
+            return domain_event.is_local
+        if self.scope == "remote":
+            return not domain_event.is_local
+        return True
+
+    async def _next_batch(self) -> List[DomainEvent]:
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def consume(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self.handler(batch)
+                self.delivered += len(batch)
+            except Exception:  # pragma: no cover - um assinante nao derruba os outros
+                self.failed_batches += 1
+                logger.exception("Assinante de eventos %s falhou em um lote de %s", self.name, len(batch))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "scope": self.scope,
+            "queued": self.queue.qsize(),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "failed_batches": self.failed_batches,
+        }
+
+
+class EventBus:
+    def __init__(self, queue_size: int) -> None:
+        self.queue_size = queue_size
+        self.subscriptions: Dict[str, Subscription] = {}
+        self._forwarders: List[Callable[[DomainEvent], None]] = []
+        self.published = 0
+        self.untagged = 0
+
+    def subscribe(
+        self,
+        name: str,
+        handler: Handler,
+        *,
+        events: Optional[Iterable[str]] = None,
+        scope: str = "all",
+        batch_size: int = 100,
+        max_wait_ms: float = 50.0,
+        queue_size: Optional[int] = None,
+    ) -> Subscription:
+        if name in self.subscriptions:
+            raise ValueError(f"Assinante ja registrado: {name}")
+        subscription = Subscription(
+            name, handler, events, scope, batch_size, max_wait_ms, queue_size or self.queue_size
+        )
+        self.subscriptions[name] = subscription
+        return subscription
+
+    def add_forwarder(self, forward: Callable[[DomainEvent], None]) -> None:
+        """Non-blocking callback receiving every published event (transports)."""
+        self._forwarders.append(forward)
+
+    def publish(self, domain_event: DomainEvent) -> None:
+        self.published += 1
+        for subscription in self.subscriptions.values():
+            if not subscription.accepts(domain_event):
+                continue
+            try:
+                subscription.queue.put_nowait(domain_event)
+            except asyncio.QueueFull:
+                subscription.dropped += 1
+        for forward in self._forwarders:
+            forward(domain_event)
+
+    def start(self) -> None:
+        for subscription in self.subscriptions.values():
+            if subscription.task is None or subscription.task.done():
+                subscription.task = asyncio.create_task(subscription.consume())
+
+    async def stop(self, drain_seconds: float = 2.0) -> None:
+        """Give the consumers ``drain_seconds`` to empty their queues, then cancel them."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + drain_seconds
+        while loop.time() < deadline and any(s.queue.qsize() for s in self.subscriptions.values()):
+            await asyncio.sleep(0.05)
+        tasks = [s.task for s in self.subscriptions.values() if s.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for subscription in self.subscriptions.values():
+            subscription.task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "published": self.published,
+            "untagged": self.untagged,
+            "dropped": sum(s.dropped for s in self.subscriptions.values()),
+            "subscribers": {name: s.stats() for name, s in self.subscriptions.items()},
+        }
+
+
+event_bus = EventBus(queue_size=settings.event_bus_queue_size)
+
+
+def stage_event(
+    session: AsyncSession, name: str, data: Mapping[str, Any], tenant_id: Optional[str] = None
+) -> None:
+    """Attach an event to the session's transaction; it is published only if the transaction commits.
+
+    Call it after the write statement, so that the transaction is already open.
+    Without ``tenant_id`` the tenant tagged on the session (get_tenant_scope) is used.
+    """
+    session.info.setdefault(PENDING_EVENTS_INFO_KEY, []).append((name, data, tenant_id))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session) -> None:
+    pending = session.info.pop(PENDING_EVENTS_INFO_KEY, None)
+    if not pending:
+        return
+    session_tenant_id = session.info.get(TENANT_INFO_KEY)
+    for name, data, tenant_id in pending:
+        tenant_id = tenant_id or session_tenant_id
+        if tenant_id is None:
+            # Sessao fora de get_tenant_scope (scripts, jobs): sem tenant nao ha assinante que entregue.
+            event_bus.untagged += 1
+            logger.warning("Evento %s sem tenant descartado; passe tenant_id para stage_event", name)
+            continue
+        event_bus.publish(DomainEvent(name=name, tenant_id=tenant_id, data=data))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session) -> None:
+    session.info.pop(PENDING_EVENTS_INFO_KEY, None)
@@ -0,0 +1,136 @@
+"""Optional Postgres LISTEN/NOTIFY transport fanning domain events out to every worker.
+
+Local events are forwarded (never blocking the publisher) to a bounded
+outbound queue and sent with pg_notify on a dedicated asyncpg connection,
+which also LISTENs on the channel and republishes the other processes'
+events on the local bus. NOTIFY payloads are limited to 8000 bytes: larger
+events travel without ``data`` (name, tenant and ids only), which is all the
+remote subscribers need. Delivery is best effort; a lost connection is
+re-established with backoff and the events sent meanwhile are dropped. An
+idle connection is pinged every PING_SECONDS (and asyncpg's termination
+callback flags a closed one), so a worker that only listens notices the
+loss instead of silently missing the remote events.
+"""
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import logging
+from typing import Any, Optional
+
+import asyncpg
+
+from app.core.config import settings
+from app.services.event_bus import DomainEvent, EventBus, event_bus
+
+logger = logging.getLogger(__name__)
+
+# Limite do Postgres e 8000 bytes; folga para o envelope.
+MAX_PAYLOAD_BYTES = 7900
+# Sem eventos para enviar, a conexao LISTEN e testada com SELECT 1 neste intervalo.
+PING_SECONDS = 15.0
+
+
+def _asyncpg_dsn(database_url: str) -> str:
+    return database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+class PgNotifyTransport:
+    def __init__(self, bus: EventBus, database_url: str, channel: str, queue_size: int) -> None:
+        self.bus = bus
+        self.dsn = _asyncpg_dsn(database_url)
+        self.channel = channel
+        self._outbound: asyncio.Queue[DomainEvent] = asyncio.Queue(maxsize=queue_size)
+        self.connected = False
+        self.last_error: Optional[str] = None
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+        self.truncated = 0
+        self.pings = 0
+        self.reconnects = 0
+        bus.add_forwarder(self.forward)
+
+    def forward(self, domain_event: DomainEvent) -> None:
+        if not domain_event.is_local:
+            return  # evento remoto ja passou pelo NOTIFY
+        try:
+            self._outbound.put_nowait(domain_event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def _payload(self, domain_event: DomainEvent) -> str:
+        payload = domain_event.to_json()
+        if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+            self.truncated += 1
+            payload = dataclasses.replace(domain_event, data={"truncated": True}).to_json()
+        return payload
+
+    def _on_notify(self, _conn: Any, _pid: int, _channel: str, payload: str) -> None:
+        try:
+            domain_event = DomainEvent.from_json(payload)
+        except ValueError:
+            logger.warning("Payload de evento invalido no canal %s", self.channel)
+            return
+        if domain_event.is_local:
+            return  # o proprio NOTIFY volta para quem faz LISTEN
+        self.received += 1
+        self.bus.publish(domain_event)
+
+    async def run(self) -> None:
+        failures = 0
+        while True:
+            conn: Optional[asyncpg.Connection] = None
+            terminated = asyncio.Event()
+            try:
+                conn = await asyncpg.connect(self.dsn)
+                conn.add_termination_listener(lambda _conn: terminated.set())
+                await conn.add_listener(self.channel, self._on_notify)
+                self.connected, self.last_error, failures = True, None, 0
+                while True:
+                    if terminated.is_set():
+                        raise ConnectionError("conexao LISTEN encerrada")
+                    try:
+                        domain_event = await asyncio.wait_for(self._outbound.get(), timeout=PING_SECONDS)
+                    except asyncio.TimeoutError:
+                        await conn.fetchval("SELECT 1", timeout=PING_SECONDS)
+                        self.pings += 1
+                        continue
+                    await conn.execute("SELECT pg_notify($1, $2)", self.channel, self._payload(domain_event))
+                    self.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                failures += 1
+                if self.connected:
+                    self.reconnects += 1
+                self.last_error = type(exc).__name__
+                logger.warning("Transporte LISTEN/NOTIFY indisponivel (%s); nova tentativa", self.last_error)
+            finally:
+                self.connected = False
+                if conn is not None and not conn.is_closed():
+                    await conn.close(timeout=2)
+            await asyncio.sleep(min(2 ** failures, 30))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "channel": self.channel,
+            "connected": self.connected,
+            "last_error": self.last_error,
+            "queued": self._outbound.qsize(),
+            "sent": self.sent,
+            "received": self.received,
+            "dropped": self.dropped,
+            "truncated": self.truncated,
+            "pings": self.pings,
+            "reconnects": self.reconnects,
+        }
+
+
+event_transport: Optional[PgNotifyTransport] = (
+    PgNotifyTransport(
+        event_bus, settings.database_url, settings.event_bus_notify_channel, settings.event_bus_queue_size
+    )
+    if settings.event_bus_notify_channel
+    else None
+)
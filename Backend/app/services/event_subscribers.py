@@ -0,0 +1,101 @@
+"""Default subscribers of the domain event bus."""
+from __future__ import annotations
+
+from typing import Dict, List
+
+from app.services.event_bus import (
+    CAMPAIGN_CREATED,
+    CONTACT_CREATED,
+    CONTACTS_IMPORTED,
+    OPPORTUNITIES_IMPORTED,
+    OPPORTUNITY_CREATED,
+    OPPORTUNITY_DELETED,
+    OPPORTUNITY_UPDATED,
+    RBAC_CHANGED,
+    SEGMENT_CREATED,
+    STORE_KPIS_CHANGED,
+    DomainEvent,
+    EventBus,
+)
+from app.security.rbac import invalidate_role_permissions
+from app.services.data_store import data_store
+from app.services.no_code_query import invalidate_no_code_cache
+from app.services.sql_result_cache import invalidate_sql_results
+from app.services.webhooks import webhook_dispatcher
+
+# Tabela do Estudio SQL afetada por cada evento
+EVENT_TABLES: Dict[str, str] = {
+    OPPORTUNITY_CREATED: "tb_oportunidade",
+    OPPORTUNITY_UPDATED: "tb_oportunidade",
+    OPPORTUNITY_DELETED: "tb_oportunidade",
+    OPPORTUNITIES_IMPORTED: "tb_oportunidade",
+    CONTACT_CREATED: "tb_contato",
+    CONTACTS_IMPORTED: "tb_contato",
+    CAMPAIGN_CREATED: "marketing_campaigns",
+    SEGMENT_CREATED: "marketing_segments",
+}
+
+
+async def deliver_webhooks(events: List[DomainEvent]) -> None:
+    for domain_event in events:
+        if domain_event.tenant_id:
+            webhook_dispatcher.publish(domain_event.tenant_id, domain_event.name, domain_event.data)
+
+
+async def invalidate_remote_sql_results(events: List[DomainEvent]) -> None:
+    # Um lote com varias escritas na mesma tabela invalida uma vez so.
+    pairs = {(e.tenant_id, EVENT_TABLES[e.name]) for e in events if e.tenant_id}
+    for tenant_id, table in pairs:
+        invalidate_sql_results(tenant_id, table)
+    # O cache no-code e invalidado por tenant inteiro.
+    for tenant_id in {tenant_id for tenant_id, _ in pairs}:
+        invalidate_no_code_cache(tenant_id)
+
+
+async def invalidate_remote_kpis(events: List[DomainEvent]) -> None:
+    for tenant_id in {e.tenant_id for e in events if e.tenant_id}:
+        data_store.invalidate_kpis(tenant_id)
+
+
+async def invalidate_remote_role_permissions(events: List[DomainEvent]) -> None:
+    # Sem broadcast: o evento ja veio de outro worker.
+    invalidate_role_permissions(broadcast=False)
+
+
+def register_default_subscribers(bus: EventBus) -> None:
+    """Idempotent: the lifespan may run more than once per process (tests)."""
+    if "webhooks" not in bus.subscriptions:
+        # So eventos locais: cada worker entrega os webhooks das proprias escritas.
+        # Eventos internos (STORE_KPIS_CHANGED) nao viram webhook.
+        bus.subscribe(
+            "webhooks", deliver_webhooks, events=EVENT_TABLES, scope="local", batch_size=200, max_wait_ms=10
+        )
+    if "sql-cache" not in bus.subscriptions:
+        # O worker que escreveu ja invalidou na rota; aqui so as escritas dos outros workers.
+        bus.subscribe(
+            "sql-cache",
+            invalidate_remote_sql_results,
+            events=EVENT_TABLES,
+            scope="remote",
+            batch_size=500,
+            max_wait_ms=50,
+        )
+    if "kpis" not in bus.subscriptions:
+        # Escritas de outros workers no DataStore postgres: o agregado local e recalculado no proximo uso.
+        bus.subscribe(
+            "kpis",
+            invalidate_remote_kpis,
+            events=[STORE_KPIS_CHANGED],
+            scope="remote",
+            batch_size=500,
+            max_wait_ms=50,
+        )
+    if "rbac" not in bus.subscriptions:
+        bus.subscribe(
+            "rbac",
+            invalidate_remote_role_permissions,
+            events=[RBAC_CHANGED],
+            scope="remote",
+            batch_size=100,
+            max_wait_ms=10,
+        )
@@ -0,0 +1,109 @@
+"""Incrementally maintained home-dashboard KPIs for a TenantStore."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Iterable
+
+from app.models import ActivityItem, OpportunityResponse
+
+if TYPE_CHECKING:
+    from app.services.data_store import DataStore
+
+logger = logging.getLogger(__name__)
+
+CLOSED_ACTIVITY_STATUS = "concluido"
+
+
+def is_open_activity(activity: ActivityItem) -> bool:
+    return activity.status.lower() != CLOSED_ACTIVITY_STATUS
+
+
+@dataclass
+class StageTotal:
+    valor: float = 0.0
+    count: int = 0
+
+
+@dataclass
+class KPIAggregate:
+    """Revenue, per-stage totals, open activities and lead count of a tenant.
+
+    Stages keep the order in which they first appeared, like the old
+    per-request grouping over the opportunity list.
+    """
+
+    receita_prevista: float = 0.0
+    oportunidades: int = 0
+    stages: Dict[str, StageTotal] = field(default_factory=dict)
+    atividades_abertas: int = 0
+    leads: int = 0
+
+    @classmethod
+    def compute(
+        cls,
+        opportunities: Iterable[OpportunityResponse],
+        activities: Iterable[ActivityItem],
+        leads: int,
+    ) -> "KPIAggregate":
+        aggregate = cls(leads=leads)
+        for opportunity in opportunities:
+            aggregate.add_opportunity(opportunity)
+        for activity in activities:
+            aggregate.add_activity(activity)
+        return aggregate
+
+    def add_opportunity(self, opportunity: OpportunityResponse) -> None:
+        totals = self.stages.setdefault(opportunity.stage, StageTotal())
+        totals.valor += opportunity.valor
+        totals.count += 1
+        self.receita_prevista += opportunity.valor
+        self.oportunidades += 1
+
+    def remove_opportunity(self, opportunity: OpportunityResponse) -> None:
+        totals = self.stages.get(opportunity.stage)
+        if totals is not None:
+            totals.valor -= opportunity.valor
+            totals.count -= 1
+            if totals.count <= 0:
+                del self.stages[opportunity.stage]
+        self.receita_prevista -= opportunity.valor
+        self.oportunidades -= 1
+
+    def add_activity(self, activity: ActivityItem) -> None:
+        if is_open_activity(activity):
+            self.atividades_abertas += 1
+
+    def remove_activity(self, activity: ActivityItem) -> None:
+        if is_open_activity(activity):
+            self.atividades_abertas -= 1
+
+    def matches(self, other: "KPIAggregate", tolerance: float = 0.01) -> bool:
+        """Compare values (stage order is ignored); floats within ``tolerance``."""
+        if (
+            self.oportunidades != other.oportunidades
+            or self.atividades_abertas != other.atividades_abertas
+            or self.leads != other.leads
+            or abs(self.receita_prevista - other.receita_prevista) > tolerance
+            or self.stages.keys() != other.stages.keys()
+        ):
+            return False
+        return all(
+            totals.count == other.stages[stage].count
+            and abs(totals.valor - other.stages[stage].valor) <= tolerance
+            for stage, totals in self.stages.items()
+        )
+
+
+async def run_kpi_consistency_loop(store_registry: "DataStore", interval_seconds: float) -> None:
+    """Periodically recompute every cached aggregate from scratch and fix drift."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            result = await store_registry.check_kpis()
+        except Exception:  # pragma: no cover - o job nunca deve derrubar a aplicacao
+            logger.exception("Falha na verificacao de consistencia dos KPIs")
+            continue
+        if result["drifted"]:
+            logger.warning("KPIs divergentes recalculados: %s", result)
@@ -0,0 +1,205 @@
+"""Compile and run the no-code widget queries (/dados/query/no-code)."""
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, List
+
+from fastapi import HTTPException, status
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.session import data_as_of, read_sessionmaker
+from app.db.utils import set_sqlsafe_search_path
+from app.dependencies.tenancy import SQLSAFE_STATEMENT_TIMEOUT_MS
+from app.models import MetaObjectResponse, WidgetQueryRequest
+from app.services.data_store import BASE_TABLES, TenantStore
+from app.services.sql_guard import validar_sql_somente_leitura
+from app.services.tenant_limiter import tenant_query_limiter
+
+IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+NO_CODE_MAX_GROUPS = 500
+AGGREGATES = ("SUM", "AVG", "COUNT")
+# Conexoes do pool usadas ao mesmo tempo por um /dashboards/{id}/data
+NO_CODE_BATCH_CONCURRENCY = 4
+
+# (tenant_id, objectId, groupBy, aggregate, aggregateField) -> linhas
+CacheKey = tuple[str, str, str, str, str]
+no_code_cache: TTLCache[CacheKey, List[dict[str, Any]]] = TTLCache(
+    maxsize=settings.no_code_cache_max_entries,
+    ttl_seconds=settings.no_code_cache_ttl_seconds,
+)
+# tenant_id -> time.monotonic() da ultima invalidacao; linhas lidas antes dela nao entram no cache
+_invalidated_at: dict[str, float] = {}
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledQuery:
+    sql: str
+    params: dict[str, Any]
+
+
+def _quote_field(name: str, meta: MetaObjectResponse) -> str:
+    if not IDENTIFIER_PATTERN.match(name):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Campo invalido: {name}.")
+    allowed = {field.lower() for field in meta.fields}
+    if allowed and name.lower() not in allowed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campo {name} nao pertence ao objeto {meta.idObjeto}.",
+        )
+    # Identificadores sem aspas viram minusculas no Postgres; os fields do meta-objeto seguem a mesma regra.
+    return f'"{name.lower()}"'
+
+
+def _source_for(meta: MetaObjectResponse) -> str:
+    if meta.tipo == "BASE":
+        if meta.idObjeto not in BASE_TABLES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Tabela base {meta.idObjeto} nao permitida.",
+            )
+        return meta.idObjeto
+    if not meta.sqlQuery:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Objeto {meta.idObjeto} nao possui SQL salvo.",
+        )
+    return f"({validar_sql_somente_leitura(meta.sqlQuery).rstrip(';')}) AS src"
+
+
+def compile_no_code_query(meta: MetaObjectResponse, spec: WidgetQueryRequest) -> CompiledQuery:
+    """Build a whitelisted GROUP BY; only identifiers checked above are interpolated."""
+    aggregate = spec.aggregate.upper()
+    if aggregate not in AGGREGATES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Agregacao invalida.")
+    group_by = _quote_field(spec.groupBy, meta)
+    if aggregate == "COUNT" and spec.aggregateField == "*":
+        value = "COUNT(*)"
+    else:
+        value = f"{aggregate}({_quote_field(spec.aggregateField, meta)})"
+    sql = (
+        f"SELECT {group_by} AS grupo, {value} AS valor "
+        f"FROM {_source_for(meta)} GROUP BY 1 ORDER BY 1 LIMIT :limit"
+    )
+    return CompiledQuery(sql=sql, params={"limit": NO_CODE_MAX_GROUPS})
+
+
+def _find_meta_object(meta_objects: List[MetaObjectResponse], object_id: str) -> MetaObjectResponse:
+    for meta in meta_objects:
+        if object_id in (meta.idObjeto, meta.metaId):
+            return meta
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meta objeto nao encontrado.")
+
+
+def _to_number(value: Any) -> Any:
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def _cache_key(tenant_id: str, spec: WidgetQueryRequest) -> CacheKey:
+    return (tenant_id, spec.objectId, spec.groupBy, spec.aggregate.upper(), spec.aggregateField)
+
+
+async def _execute(
+    session: AsyncSession,
+    compiled: CompiledQuery,
+    tenant_id: str,
+    spec: WidgetQueryRequest,
+) -> List[dict[str, Any]]:
+    as_of = data_as_of(session)
+    try:
+        result = await session.execute(text(compiled.sql), compiled.params)
+    except DBAPIError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nao foi possivel executar a consulta do widget.",
+        ) from None
+    rows = [
+        {spec.groupBy: _to_number(row.grupo), spec.aggregateField: _to_number(row.valor)}
+        for row in result
+    ]
+    # Replica atrasada: linhas anteriores a uma invalidacao ja feita nao entram no cache.
+    if _invalidated_at.get(tenant_id, -1.0) < as_of:
+        no_code_cache.set(_cache_key(tenant_id, spec), rows)
+    return rows
+
+
+async def run_no_code_query(
+    session: AsyncSession,
+    store: TenantStore,
+    tenant_id: str,
+    spec: WidgetQueryRequest,
+) -> List[dict[str, Any]]:
+    """Rows shaped as ``{groupBy: grupo, aggregateField: valor}``, cached per (tenant, spec)."""
+    cached = no_code_cache.get(_cache_key(tenant_id, spec))
+    if cached is None:
+        meta = _find_meta_object(await store.list_meta_objects(), spec.objectId)
+        cached = await _execute(session, compile_no_code_query(meta, spec), tenant_id, spec)
+    return [dict(row) for row in cached]
+
+
+async def run_no_code_batch(
+    schema_name: str,
+    store: TenantStore,
+    tenant_id: str,
+    specs: List[WidgetQueryRequest],
+) -> List[List[dict[str, Any]] | Exception]:
+    """Evaluate many specs concurrently; one result (rows or the error) per spec, in order.
+
+    Identical specs run once. Cache misses run in parallel, each on its own
+    pooled session with the Estudio SQL restrictions; at most
+    NO_CODE_BATCH_CONCURRENCY connections are held at a time, each under a
+    tenant_query_limiter slot (a 429 there becomes that widget's error).
+    """
+    results: dict[CacheKey, List[dict[str, Any]] | Exception] = {}
+    pending: dict[CacheKey, WidgetQueryRequest] = {}
+    for spec in specs:
+        key = _cache_key(tenant_id, spec)
+        if key in results or key in pending:
+            continue
+        cached = no_code_cache.get(key)
+        if cached is not None:
+            results[key] = cached
+        else:
+            pending[key] = spec
+
+    compiled: dict[CacheKey, CompiledQuery] = {}
+    if pending:
+        meta_objects = await store.list_meta_objects()
+        # Erros de validacao nao chegam a ocupar uma conexao do pool.
+        for key, spec in pending.items():
+            try:
+                compiled[key] = compile_no_code_query(_find_meta_object(meta_objects, spec.objectId), spec)
+            except HTTPException as exc:
+                results[key] = exc
+
+    if compiled:
+        semaphore = asyncio.Semaphore(NO_CODE_BATCH_CONCURRENCY)
+        factory = await read_sessionmaker()
+
+        async def _run(key: CacheKey) -> List[dict[str, Any]]:
+            async with semaphore, tenant_query_limiter.slot(tenant_id), factory() as session:
+                await set_sqlsafe_search_path(session, schema_name, SQLSAFE_STATEMENT_TIMEOUT_MS)
+                return await _execute(session, compiled[key], tenant_id, pending[key])
+
+        outcomes = await asyncio.gather(*(_run(key) for key in compiled), return_exceptions=True)
+        for key, outcome in zip(compiled, outcomes):
+            if isinstance(outcome, BaseException) and not isinstance(outcome, Exception):
+                raise outcome
+            results[key] = outcome
+
+    return [
+        [dict(row) for row in result] if isinstance(result, list) else result
+        for result in (results[_cache_key(tenant_id, spec)] for spec in specs)
+    ]
+
+
+def invalidate_no_code_cache(tenant_id: str) -> int:
+    _invalidated_at[tenant_id] = time.monotonic()
+    return no_code_cache.invalidate_where(lambda key: key[0] == tenant_id)
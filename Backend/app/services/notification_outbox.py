@@ -0,0 +1,369 @@
+"""Durable outbox for template notifications (tenant_admin.tb_notification_outbox).
+
+The HTTP handlers only insert rows. Background workers claim due rows in
+batches with FOR UPDATE SKIP LOCKED (so several workers and processes never
+pick the same row), render them, deliver them grouped per channel with one
+provider lookup per batch, and write the outcome back in one statement per
+outcome. Failed sends are retried with exponential backoff up to
+``max_attempts``; a claimed row carries a lease so a crashed worker's batch
+is picked up again once the lease expires. The lease counts as an attempt:
+a row whose lease expired after its last attempt (e.g. one that crashes the
+worker every time) is marked FAILED instead of being claimed again.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.services.notifications import (
+    NotificationDispatcher,
+    NotificationError,
+    SMTPCredentials,
+    notification_dispatcher,
+)
+from app.services.template_render import load_templates
+
+logger = logging.getLogger(__name__)
+
+ADMIN = settings.tenant_admin_schema
+OUTBOX = f"{ADMIN}.tb_notification_outbox"
+RATE_WINDOW_SECONDS = 60.0
+
+# Canal da notificacao -> tipos aceitos em notification_services (mesmos das rotas de teste)
+CHANNEL_SERVICE_TYPES: Dict[str, Tuple[str, ...]] = {
+    "EMAIL": ("SMTP",),
+    "SMS": ("SMS", "SMS_TWILIO"),
+    "PUSH": ("PUSH", "PUSH_FIREBASE"),
+}
+
+CLAIM_SQL = f"""
+UPDATE {OUTBOX} o
+SET status = 'SENDING',
+    attempts = o.attempts + 1,
+    locked_until = NOW() + make_interval(secs => CAST(:lease AS double precision))
+WHERE o.outbox_id IN (
+    SELECT outbox_id FROM {OUTBOX}
+    WHERE status IN ('PENDING', 'SENDING')
+      AND next_attempt_at <= NOW()
+      AND (status = 'PENDING' OR locked_until < NOW())
+      AND attempts < :max_attempts
+    ORDER BY next_attempt_at
+    LIMIT :batch
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING o.outbox_id, o.tenant_id, o.template_id, o.channel, o.recipient, o.variables, o.attempts
+"""
+
+# Linhas que esgotaram as tentativas sem chegar ao _settle (lease expirado): nao voltam ao claim.
+EXPIRE_SQL = f"""
+UPDATE {OUTBOX}
+SET status = 'FAILED', locked_until = NULL, last_error = 'Tentativas esgotadas sem confirmacao do worker'
+WHERE status IN ('PENDING', 'SENDING')
+  AND next_attempt_at <= NOW()
+  AND (status = 'PENDING' OR locked_until < NOW())
+  AND attempts >= :max_attempts
+"""
+
+MARK_SENT_SQL = f"""
+UPDATE {OUTBOX}
+SET status = 'SENT', sent_at = NOW(), locked_until = NULL, last_error = NULL
+WHERE outbox_id = ANY(CAST(:ids AS bigint[]))
+"""
+
+# Backoff exponencial a partir de attempts (ja incrementado no claim), limitado a :cap.
+MARK_FAILED_SQL = f"""
+UPDATE {OUTBOX} o
+SET status = CASE WHEN f.retry AND o.attempts < :max_attempts THEN 'PENDING' ELSE 'FAILED' END,
+    next_attempt_at = NOW() + make_interval(
+        secs => LEAST(CAST(:base AS double precision) * power(2, o.attempts - 1), CAST(:cap AS double precision))
+    ),
+    locked_until = NULL,
+    last_error = f.err
+FROM unnest(CAST(:ids AS bigint[]), CAST(:errs AS text[]), CAST(:retry AS boolean[])) AS f(id, err, retry)
+WHERE o.outbox_id = f.id
+RETURNING o.status
+"""
+
+
+def _json(value: Any) -> Any:
+    return json.loads(value) if isinstance(value, str) else value
+
+
+@dataclass(slots=True)
+class OutboxMessage:
+    outbox_id: int
+    tenant_id: str
+    template_id: str
+    channel: str
+    recipient: str
+    variables: Dict[str, Any]
+    attempts: int
+
+
+@dataclass(slots=True)
+class Failure:
+    outbox_id: int
+    error: str
+    retry: bool = True
+
+
+async def enqueue(
+    session: AsyncSession,
+    tenant_id: str,
+    template_id: str,
+    channel: str,
+    messages: Iterable[Tuple[str, Mapping[str, Any]]],
+) -> int:
+    """Insert one outbox row per (recipient, variables) in a single statement; the caller commits."""
+    rows = [{"to": to, "variables": dict(variables or {})} for to, variables in messages]
+    if not rows:
+        return 0
+    res = await session.execute(
+        text(
+            f"""
+            INSERT INTO {OUTBOX} (tenant_id, template_id, channel, recipient, variables)
+            SELECT :tenant_id, CAST(:template_id AS uuid), :channel, r."to", COALESCE(r.variables, '{{}}'::jsonb)
+            FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r("to" text, variables jsonb)
+            """
+        ),
+        {"tenant_id": tenant_id, "template_id": template_id, "channel": channel, "rows": json.dumps(rows)},
+    )
+    return res.rowcount
+
+
+async def tenant_counts(session: AsyncSession, tenant_id: str) -> Dict[str, int]:
+    res = await session.execute(
+        text(f"SELECT status, count(*) FROM {OUTBOX} WHERE tenant_id = :t GROUP BY status"),
+        {"t": tenant_id},
+    )
+    return {row[0]: row[1] for row in res.all()}
+
+
+class NotificationOutbox:
+    """Claims, delivers and settles outbox batches; shared by all worker tasks of the process."""
+
+    def __init__(
+        self,
+        dispatcher: NotificationDispatcher,
+        batch_size: int,
+        lease_seconds: float,
+        max_attempts: int,
+        backoff_seconds: float,
+        backoff_max_seconds: float,
+    ) -> None:
+        self.dispatcher = dispatcher
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        # Acordado pelo enqueue deste processo; os outros processos acham as linhas no proximo poll.
+        self._wakeup = asyncio.Event()
+        self._recent: Deque[Tuple[float, int]] = deque()
+        self.batches = 0
+        self.claimed = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.last_batch_ms = 0.0
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    async def wait_for_work(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _claim(self, session: AsyncSession) -> List[OutboxMessage]:
+        expired = await session.execute(text(EXPIRE_SQL), {"max_attempts": self.max_attempts})
+        if expired.rowcount:
+            self.failed += expired.rowcount
+            logger.warning("Outbox: %s notificacao(oes) marcada(s) FAILED apos esgotar as tentativas", expired.rowcount)
+        res = await session.execute(
+            text(CLAIM_SQL),
+            {"lease": self.lease_seconds, "batch": self.batch_size, "max_attempts": self.max_attempts},
+        )
+        messages = [
+            OutboxMessage(
+                outbox_id=row["outbox_id"],
+                tenant_id=row["tenant_id"],
+                template_id=str(row["template_id"]),
+                channel=row["channel"],
+                recipient=row["recipient"],
+                variables=_json(row["variables"]) or {},
+                attempts=row["attempts"],
+            )
+            for row in res.mappings()
+        ]
+        await session.commit()
+        return messages
+
+    async def _services(self, session: AsyncSession) -> Dict[str, Any]:
+        res = await session.execute(
+            text(f"SELECT type, credentials FROM {ADMIN}.notification_services WHERE status = 'ACTIVE'")
+        )
+        active = {row["type"]: _json(row["credentials"]) or {} for row in res.mappings()}
+        services: Dict[str, Any] = {}
+        for channel, types in CHANNEL_SERVICE_TYPES.items():
+            for service_type in types:
+                if service_type in active:
+                    services[channel] = active[service_type]
+                    break
+        return services
+
+    async def _deliver(
+        self,
+        channel: str,
+        credentials: Optional[Mapping[str, Any]],
+        batch: List[Tuple[OutboxMessage, str, str]],
+    ) -> Tuple[List[int], List[Failure]]:
+        if credentials is None:
+            # Servico pode ser configurado depois: segue no backoff.
+            return [], [Failure(msg.outbox_id, f"Servico {channel} nao configurado/ativo") for msg, _, _ in batch]
+        if channel != "EMAIL":
+            # MVP: como nas rotas de teste, SMS e Push sao simulados.
+            return [msg.outbox_id for msg, _, _ in batch], []
+        try:
+            creds = SMTPCredentials.from_mapping(credentials)
+        except ValueError as exc:
+            return [], [Failure(msg.outbox_id, str(exc)) for msg, _, _ in batch]
+
+        results = await asyncio.gather(
+            *(self.dispatcher.send_email(creds, msg.recipient, subject, html=body) for msg, subject, body in batch),
+            return_exceptions=True,
+        )
+        sent: List[int] = []
+        failures: List[Failure] = []
+        for (msg, _, _), result in zip(batch, results):
+            if result is None:
+                sent.append(msg.outbox_id)
+            elif isinstance(result, NotificationError):
+                failures.append(Failure(msg.outbox_id, str(result)))
+            elif isinstance(result, BaseException):
+                failures.append(Failure(msg.outbox_id, f"{type(result).__name__}: {result}"))
+        return sent, failures
+
+    async def _settle(self, session: AsyncSession, sent: List[int], failures: List[Failure]) -> None:
+        if sent:
+            await session.execute(text(MARK_SENT_SQL), {"ids": sent})
+        if failures:
+            res = await session.execute(
+                text(MARK_FAILED_SQL),
+                {
+                    "ids": [f.outbox_id for f in failures],
+                    "errs": [f.error[:1000] for f in failures],
+                    "retry": [f.retry for f in failures],
+                    "max_attempts": self.max_attempts,
+                    "base": self.backoff_seconds,
+                    "cap": self.backoff_max_seconds,
+                },
+            )
+            statuses = [row[0] for row in res.all()]
+            self.failed += statuses.count("FAILED")
+            self.retried += statuses.count("PENDING")
+        await session.commit()
+
+    async def process_batch(self, sessionmaker: async_sessionmaker[AsyncSession]) -> int:
+        """Claim and deliver one batch; returns how many rows were claimed (0 = queue drained)."""
+        async with sessionmaker() as session:
+            messages = await self._claim(session)
+            if not messages:
+                return 0
+            started = time.monotonic()
+            templates = await load_templates(session, (m.template_id for m in messages))
+            services = await self._services(session)
+            await session.commit()  # nao segura transacao aberta durante o envio
+
+            by_template: Dict[str, List[OutboxMessage]] = {}
+            for msg in messages:
+                by_template.setdefault(msg.template_id, []).append(msg)
+            by_channel: Dict[str, List[Tuple[OutboxMessage, str, str]]] = {}
+            failures: List[Failure] = []
+            for template_id, group in by_template.items():
+                template = templates.get(template_id)
+                if template is None:
+                    failures.extend(Failure(msg.outbox_id, "Template nao encontrado", retry=False) for msg in group)
+                    continue
+                bodies = template.body.render_many(msg.variables for msg in group)
+                for msg, body in zip(group, bodies):
+                    by_channel.setdefault(msg.channel, []).append((msg, template.subject, body))
+
+            sent: List[int] = []
+            for channel, batch in by_channel.items():
+                ok, failed = await self._deliver(channel, services.get(channel), batch)
+                sent.extend(ok)
+                failures.extend(failed)
+
+            await self._settle(session, sent, failures)
+
+        now = time.monotonic()
+        self.batches += 1
+        self.claimed += len(messages)
+        self.sent += len(sent)
+        self.last_batch_ms = (now - started) * 1000
+        self._recent.append((now, len(sent)))
+        return len(messages)
+
+    async def queue_depth(self, session: AsyncSession) -> Dict[str, int]:
+        res = await session.execute(
+            text(f"SELECT status, count(*) FROM {OUTBOX} WHERE status IN ('PENDING', 'SENDING') GROUP BY status")
+        )
+        depth = {"PENDING": 0, "SENDING": 0}
+        depth.update({row[0]: row[1] for row in res.all()})
+        return depth
+
+    def stats(self) -> dict[str, Any]:
+        cutoff = time.monotonic() - RATE_WINDOW_SECONDS
+        while self._recent and self._recent[0][0] < cutoff:
+            self._recent.popleft()
+        return {
+            "batches": self.batches,
+            "claimed": self.claimed,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "sent_last_minute": sum(count for _, count in self._recent),
+            "last_batch_ms": round(self.last_batch_ms, 2),
+        }
+
+
+async def run_outbox_worker(
+    outbox: NotificationOutbox,
+    sessionmaker: async_sessionmaker[AsyncSession],
+    poll_seconds: float,
+) -> None:
+    """Drain the outbox batch after batch; sleep (or wait for an enqueue) when it is empty."""
+    errors = 0
+    while True:
+        try:
+            claimed = await outbox.process_batch(sessionmaker)
+            errors = 0
+        except Exception:  # pragma: no cover - o job nunca deve derrubar a aplicacao
+            errors += 1
+            logger.exception("Falha ao processar lote do outbox de notificacoes")
+            await asyncio.sleep(min(poll_seconds * 2 ** errors, 60.0))
+            continue
+        if claimed < outbox.batch_size:
+            await outbox.wait_for_work(poll_seconds)
+
+
+notification_outbox = NotificationOutbox(
+    notification_dispatcher,
+    batch_size=settings.notification_outbox_batch_size,
+    lease_seconds=settings.notification_outbox_lease_seconds,
+    max_attempts=settings.notification_outbox_max_attempts,
+    backoff_seconds=settings.notification_outbox_backoff_seconds,
+    backoff_max_seconds=settings.notification_outbox_backoff_max_seconds,
+)
@@ -0,0 +1,277 @@
+"""Notification delivery off the event loop, with pooled SMTP connections.
+
+smtplib is blocking, so every SMTP call runs in a dedicated thread pool.
+Connections are kept per credential set (notification_services.credentials)
+and reused across sends; a connection idle for longer than ``idle_seconds``
+is checked with NOOP before reuse and dropped when the server closed it.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import smtplib
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Any, Deque, Dict, List, Mapping, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+RATE_WINDOW_SECONDS = 60.0
+
+
+class NotificationError(Exception):
+    """Delivery failed; the message is safe to show to an admin."""
+
+
+@dataclass(frozen=True, slots=True)
+class SMTPCredentials:
+    host: str
+    port: int
+    username: Optional[str]
+    password: Optional[str]
+    use_ssl: bool
+    use_tls: bool
+    sender: str
+
+    @classmethod
+    def from_mapping(cls, creds: Mapping[str, Any]) -> "SMTPCredentials":
+        """Parse notification_services.credentials; ValueError when host/sender are missing."""
+        username = creds.get("username")
+        sender = creds.get("from", username)
+        host = creds.get("host")
+        if not host or not sender:
+            raise ValueError("Credenciais SMTP incompletas")
+        return cls(
+            host=str(host),
+            port=int(creds.get("port", 587)),
+            username=username,
+            password=creds.get("password"),
+            use_ssl=bool(creds.get("use_ssl", False)),
+            use_tls=bool(creds.get("use_tls", True)),
+            sender=str(sender),
+        )
+
+    @property
+    def label(self) -> str:
+        return f"{self.host}:{self.port}"
+
+
+class SMTPConnectionPool:
+    """Idle connections of one credential set; only touched from worker threads."""
+
+    def __init__(self, creds: SMTPCredentials, max_size: int, idle_seconds: float, timeout: float) -> None:
+        self.creds = creds
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self.timeout = timeout
+        self._idle: Deque[Tuple[smtplib.SMTP, float]] = deque()
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.last_used = time.monotonic()
+
+    def _connect(self) -> smtplib.SMTP:
+        creds = self.creds
+        if creds.use_ssl:
+            server: smtplib.SMTP = smtplib.SMTP_SSL(host=creds.host, port=creds.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(host=creds.host, port=creds.port, timeout=self.timeout)
+            server.ehlo()
+            if creds.use_tls:
+                server.starttls()
+                server.ehlo()
+        if creds.username and creds.password:
+            server.login(creds.username, creds.password)
+        self.opened += 1
+        return server
+
+    def acquire(self) -> smtplib.SMTP:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                server, released_at = self._idle.pop()
+            if time.monotonic() - released_at < self.idle_seconds:
+                return server
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            _quit(server)
+        return self._connect()
+
+    def release(self, server: smtplib.SMTP, reusable: bool) -> None:
+        self.last_used = time.monotonic()
+        if reusable:
+            with self._lock:
+                if len(self._idle) < self.max_size:
+                    self._idle.append((server, self.last_used))
+                    return
+        _quit(server)
+
+    def send(self, sender: str, recipients: List[str], message: str) -> None:
+        server = self.acquire()
+        try:
+            server.sendmail(sender, recipients, message)
+        except smtplib.SMTPServerDisconnected:
+            # Conexao reaproveitada caiu entre o NOOP e o envio: uma nova tentativa com conexao nova.
+            _quit(server)
+            server = self._connect()
+            try:
+                server.sendmail(sender, recipients, message)
+            except BaseException:
+                self.release(server, reusable=False)
+                raise
+        except smtplib.SMTPRecipientsRefused:
+            self.release(server, reusable=True)  # a sessao SMTP continua valida
+            raise
+        except BaseException:
+            self.release(server, reusable=False)
+            raise
+        self.release(server, reusable=True)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for server, _ in idle:
+            _quit(server)
+
+    @property
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+
+def _quit(server: smtplib.SMTP) -> None:
+    try:
+        server.quit()
+    except (smtplib.SMTPException, OSError):
+        server.close()
+
+
+def build_email(sender: str, to: str, subject: str, html: Optional[str], text: Optional[str]) -> str:
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = subject
+    msg["From"] = sender
+    msg["To"] = to
+    if text:
+        msg.attach(MIMEText(text, "plain", "utf-8"))
+    if html:
+        msg.attach(MIMEText(html, "html", "utf-8"))
+    return msg.as_string()
+
+
+class NotificationDispatcher:
+    """Sends e-mail through per-credential SMTP pools on a bounded thread pool."""
+
+    def __init__(self, max_connections: int, idle_seconds: float, worker_threads: int, timeout_seconds: float) -> None:
+        self.max_connections = max(1, max_connections)
+        self.idle_seconds = idle_seconds
+        self.timeout_seconds = timeout_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, worker_threads), thread_name_prefix="smtp")
+        self._pools: Dict[SMTPCredentials, SMTPConnectionPool] = {}
+        # Limita envios simultaneos por credencial ao tamanho do pool (no event loop, sem bloquear threads).
+        self._slots: Dict[SMTPCredentials, asyncio.Semaphore] = {}
+        # Envios em andamento ou aguardando vaga, por credencial: pool com algum nao pode ser podado.
+        self._inflight: Dict[SMTPCredentials, int] = {}
+        self._recent: Deque[float] = deque()
+        self.sent = 0
+        self.failed = 0
+        self.send_total_ms = 0.0
+        self.send_max_ms = 0.0
+
+    def _pool_for(self, creds: SMTPCredentials) -> Tuple[SMTPConnectionPool, asyncio.Semaphore]:
+        pool = self._pools.get(creds)
+        if pool is None:
+            self._prune()
+            pool = SMTPConnectionPool(creds, self.max_connections, self.idle_seconds, self.timeout_seconds)
+            self._pools[creds] = pool
+            self._slots[creds] = asyncio.Semaphore(self.max_connections)
+        return pool, self._slots[creds]
+
+    def _prune(self) -> None:
+        # Credenciais trocadas deixam pools orfaos; fecha os que ficaram ociosos.
+        deadline = time.monotonic() - self.idle_seconds
+        for creds, pool in list(self._pools.items()):
+            if pool.last_used < deadline and not self._inflight.get(creds):
+                del self._pools[creds], self._slots[creds]
+                self._executor.submit(pool.close)
+
+    def _record(self, started: float, ok: bool) -> None:
+        now = time.monotonic()
+        elapsed_ms = (now - started) * 1000
+        self.send_total_ms += elapsed_ms
+        self.send_max_ms = max(self.send_max_ms, elapsed_ms)
+        if ok:
+            self.sent += 1
+            self._recent.append(now)
+        else:
+            self.failed += 1
+
+    async def send_email(
+        self,
+        creds: SMTPCredentials,
+        to: str,
+        subject: str,
+        html: Optional[str] = None,
+        text: Optional[str] = None,
+    ) -> None:
+        message = build_email(creds.sender, to, subject, html, text)
+        pool, slots = self._pool_for(creds)
+        loop = asyncio.get_running_loop()
+        self._inflight[creds] = self._inflight.get(creds, 0) + 1
+        try:
+            async with slots:
+                started = time.monotonic()
+                try:
+                    await loop.run_in_executor(self._executor, pool.send, creds.sender, [to], message)
+                except (smtplib.SMTPException, OSError) as exc:
+                    self._record(started, ok=False)
+                    raise NotificationError(f"Falha ao enviar email: {exc}") from exc
+                self._record(started, ok=True)
+        finally:
+            remaining = self._inflight.get(creds, 1) - 1
+            if remaining:
+                self._inflight[creds] = remaining
+            else:
+                self._inflight.pop(creds, None)
+
+    def stats(self) -> dict[str, Any]:
+        cutoff = time.monotonic() - RATE_WINDOW_SECONDS
+        while self._recent and self._recent[0] < cutoff:
+            self._recent.popleft()
+        attempts = self.sent + self.failed
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "sent_last_minute": len(self._recent),
+            "send_avg_ms": round(self.send_total_ms / attempts, 2) if attempts else 0.0,
+            "send_max_ms": round(self.send_max_ms, 2),
+            "smtp_pools": [
+                {"server": pool.creds.label, "idle": pool.idle_count, "opened": pool.opened}
+                for pool in self._pools.values()
+            ],
+        }
+
+    async def close(self) -> None:
+        pools = list(self._pools.values())
+        self._pools.clear()
+        self._slots.clear()
+        self._inflight.clear()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, pool.close) for pool in pools))
+        self._executor.shutdown(wait=False)
+
+
+notification_dispatcher = NotificationDispatcher(
+    max_connections=settings.smtp_pool_max_connections,
+    idle_seconds=settings.smtp_pool_idle_seconds,
+    worker_threads=settings.notification_worker_threads,
+    timeout_seconds=settings.smtp_timeout_seconds,
+)
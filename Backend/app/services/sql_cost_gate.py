@@ -0,0 +1,115 @@
+"""EXPLAIN-based cost gate run by the Estudio SQL guard before executing a query."""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+# tenant_id -> orcamento (None = default das settings); mesma validade do cache de schema.
+tenant_cost_budget_cache: TTLCache[str, Optional[float]] = TTLCache(
+    maxsize=settings.tenant_schema_cache_max_entries,
+    ttl_seconds=settings.tenant_schema_cache_ttl_seconds,
+)
+
+
+@dataclass(slots=True)
+class PlanSummary:
+    total_cost: float
+    plan_rows: float
+    node_type: str
+    relations: List[str] = field(default_factory=list)
+    seq_scans: int = 0
+    budget: Optional[float] = None
+
+    def as_dict(self) -> dict[str, Any]:
+        # Mesmas chaves do SQLPlanSummary exposto na API.
+        return {
+            "totalCost": self.total_cost,
+            "planRows": self.plan_rows,
+            "nodeType": self.node_type,
+            "relations": self.relations,
+            "seqScans": self.seq_scans,
+            "budget": self.budget,
+        }
+
+
+def summarize_plan(explain_output: Any) -> PlanSummary:
+    """Root cost/rows plus the scanned relations of an ``EXPLAIN (FORMAT JSON)`` result."""
+    if isinstance(explain_output, str):
+        explain_output = json.loads(explain_output)
+    root = explain_output[0]["Plan"]
+    relations: List[str] = []
+    seq_scans = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        relation = node.get("Relation Name")
+        if relation and relation not in relations:
+            relations.append(relation)
+        if node.get("Node Type") == "Seq Scan":
+            seq_scans += 1
+        stack.extend(reversed(node.get("Plans", ())))
+    return PlanSummary(
+        total_cost=float(root.get("Total Cost", 0.0)),
+        plan_rows=float(root.get("Plan Rows", 0.0)),
+        node_type=str(root.get("Node Type", "")),
+        relations=relations,
+        seq_scans=seq_scans,
+    )
+
+
+async def tenant_cost_budget(session: AsyncSession, tenant_id: str) -> float:
+    """Budget of ``tenant_id`` (tb_tenant.sql_cost_budget or the settings default); 0 = no gate."""
+    budget = tenant_cost_budget_cache.get(tenant_id, default=False)
+    if budget is False:
+        res = await session.execute(
+            text("SELECT sql_cost_budget FROM tenant_admin.tb_tenant WHERE id = :tenant_id LIMIT 1"),
+            {"tenant_id": tenant_id},
+        )
+        value = res.scalar_one_or_none()
+        budget = float(value) if value is not None else None
+        tenant_cost_budget_cache.set(tenant_id, budget)
+    return settings.sql_cost_budget_default if budget is None else budget
+
+
+async def explain_query(session: AsyncSession, query: str) -> PlanSummary:
+    # EXPLAIN sem ANALYZE: apenas planeja, nao executa a consulta.
+    try:
+        res = await session.execute(text(f"EXPLAIN (FORMAT JSON) {query}"))
+    except DBAPIError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nao foi possivel planejar a consulta.",
+        ) from None
+    return summarize_plan(res.scalar_one())
+
+
+async def ensure_within_cost_budget(session: AsyncSession, tenant_id: str, query: str) -> Optional[PlanSummary]:
+    """Plan ``query`` and reject it (422 with the plan summary) when it exceeds the tenant budget.
+
+    ``query`` must already have passed the read-only guard. Returns None when
+    the gate is disabled for the tenant.
+    """
+    budget = await tenant_cost_budget(session, tenant_id)
+    if budget <= 0:
+        return None
+    plan = await explain_query(session, query)
+    plan.budget = budget
+    if plan.total_cost > budget:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={
+                "message": "Custo estimado da consulta excede o limite do tenant. Filtre ou agregue mais os dados.",
+                "plan": plan.as_dict(),
+            },
+        )
+    return plan
+
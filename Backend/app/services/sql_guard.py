@@ -1,7 +1,6 @@
 """Centralized SQL validation helpers for the Estudio SQL module."""
 from __future__ import annotations
 
-import re
 from dataclasses import dataclass
 import time
 from typing import Any, List
@@ -10,7 +9,11 @@ from fastapi import HTTPException, status
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-COMMENT_PATTERN = re.compile(r"(--.*?$)|(/\*.*?\*/)", re.MULTILINE | re.DOTALL)
+from app.db.session import data_as_of
+from app.db.sql_lexer import WORD, Token, split_code, tokenize
+from app.services.sql_cost_gate import PlanSummary, ensure_within_cost_budget
+from app.services.sql_result_cache import cache_key_text, is_cacheable, referenced_tables, sql_result_cache
+
 FORBIDDEN_COMMANDS = (
     "INSERT",
     "UPDATE",
@@ -43,71 +46,91 @@ class SQLValidationResult:
     rows_affected: int
     sample_rows: List[dict[str, Any]]
     execution_time_ms: int
+    cache_hit: bool = False
+    original_execution_time_ms: int | None = None
+    plan: PlanSummary | None = None
 
 
-def _strip_comments(query: str) -> str:
-    return COMMENT_PATTERN.sub(" ", query)
-
+FORBIDDEN_KEYWORDS = frozenset(command for command in FORBIDDEN_COMMANDS if " " not in command)
+FORBIDDEN_SEQUENCES = tuple(tuple(command.split()) for command in FORBIDDEN_COMMANDS if " " in command)
 
-def _normalize_query(raw_query: str) -> str:
-    if not raw_query or not raw_query.strip():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="A consulta SQL nao pode ser vazia.",
-        )
 
-    normalized = raw_query.strip()
-    if not normalized.endswith(";"):
-        normalized = f"{normalized};"
-    return normalized
+@dataclass(slots=True)
+class ReadOnlyStatement:
+    normalized_query: str
+    tokens: List[Token]  # sem espacos, comentarios e o ';' final
 
 
-def _ensure_single_statement(query: str) -> None:
-    body = query.rstrip(";")
-    if ";" in body:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Envie apenas uma instrucao SQL por vez.",
-        )
+def _bad_request(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
 
 
-def _ensure_no_forbidden_keywords(query: str) -> None:
-    normalized = re.sub(r"\s+", " ", _strip_comments(query).upper())
-    for keyword in FORBIDDEN_COMMANDS:
-        pattern = rf"\b{re.escape(keyword)}\b"
-        if re.search(pattern, normalized):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Comando SQL proibido detectado. Apenas SELECT/CTE sao permitidos.",
-            )
+def _ensure_no_forbidden_keywords(tokens: List[Token]) -> None:
+    # Apenas palavras soltas contam: literais e "identificadores" entre aspas nunca batem.
+    words = [token.upper for token in tokens if token.kind == WORD]
+    forbidden = not FORBIDDEN_KEYWORDS.isdisjoint(words) or any(
+        tuple(words[i : i + len(seq)]) == seq for seq in FORBIDDEN_SEQUENCES for i in range(len(words))
+    )
+    if forbidden:
+        raise _bad_request("Comando SQL proibido detectado. Apenas SELECT/CTE sao permitidos.")
+
+
+def analisar_sql_somente_leitura(query_bruta: str) -> ReadOnlyStatement:
+    """Tokenize once and run the single-statement / keyword / SELECT checks."""
+    statements = split_code(tokenize(query_bruta or ""))
+    if not statements:
+        raise _bad_request("A consulta SQL nao pode ser vazia.")
+    if len(statements) > 1:
+        raise _bad_request("Envie apenas uma instrucao SQL por vez.")
+    tokens = statements[0]
+    _ensure_no_forbidden_keywords(tokens)
+    if tokens[0].kind != WORD or tokens[0].upper not in ("SELECT", "WITH"):
+        raise _bad_request("A consulta deve comecar com SELECT ou WITH.")
+    # Corta comentarios finais: o texto e embrulhado em SELECT * FROM (...) pelo executor.
+    last = tokens[-1]
+    return ReadOnlyStatement(
+        normalized_query=f"{query_bruta[tokens[0].start : last.start + len(last.text)]};",
+        tokens=tokens,
+    )
 
 
-def _ensure_select_statement(query: str) -> None:
-    stripped = _strip_comments(query).strip()
-    upper = stripped.upper()
-    if not (upper.startswith("SELECT") or upper.startswith("WITH")):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="A consulta deve comecar com SELECT ou WITH.",
-        )
+def validar_sql_somente_leitura(query_bruta: str) -> str:
+    """Run the static SELECT/CTE checks and return the normalized statement."""
+    return analisar_sql_somente_leitura(query_bruta).normalized_query
 
 
 async def validar_e_executar_sql_seguro(
     query_bruta: str,
     session: AsyncSession | None = None,
+    tenant_id: str | None = None,
 ) -> SQLValidationResult:
     """
     Multi-layer SQL guard used by the Estudio SQL routes.
 
     The function validates that the statement is a single SELECT/CTE,
-    blocks destructive keywords and (in the future) will execute the
-    query using the tenant-scoped AsyncSession.
+    blocks destructive keywords and executes the query using the
+    tenant-scoped AsyncSession. With ``tenant_id`` the capped result is
+    served from / stored in the per-tenant sql_result_cache and cache
+    misses must first pass the tenant's EXPLAIN cost budget.
     """
 
-    normalized = _normalize_query(query_bruta)
-    _ensure_single_statement(normalized)
-    _ensure_no_forbidden_keywords(normalized)
-    _ensure_select_statement(normalized)
+    statement = analisar_sql_somente_leitura(query_bruta)
+    normalized = statement.normalized_query
+
+    key_text = cache_key_text(statement.tokens)
+    cacheable = tenant_id is not None and is_cacheable(statement.tokens)
+    if cacheable:
+        lookup_start = time.perf_counter()
+        cached = sql_result_cache.get(tenant_id, key_text)
+        if cached is not None:
+            return SQLValidationResult(
+                normalized_query=normalized,
+                rows_affected=0,
+                sample_rows=[dict(row) for row in cached.rows],
+                execution_time_ms=int((time.perf_counter() - lookup_start) * 1000),
+                cache_hit=True,
+                original_execution_time_ms=cached.execution_time_ms,
+            )
 
     if session is None:
         # Defensive fallback
@@ -123,8 +146,10 @@ async def validar_e_executar_sql_seguro(
         pass
 
     # Wrap the query to cap results to 100 rows
-    capped_query = f"SELECT * FROM ( {normalized.rstrip(';')} ) AS q LIMIT 100;"
+    capped_query = f"SELECT * FROM ( {normalized.rstrip(';')} ) AS q LIMIT 100"
+    plan = await ensure_within_cost_budget(session, tenant_id, capped_query) if tenant_id is not None else None
 
+    as_of = data_as_of(session)
     start = time.perf_counter()
     result = await session.execute(text(capped_query))
     rows = result.mappings().all()
@@ -132,10 +157,22 @@ async def validar_e_executar_sql_seguro(
 
     # Convert to plain dicts
     sample_rows = [dict(r) for r in rows]
+    if cacheable:
+        # as_of: resultado (da replica, atrasada) anterior a uma invalidacao nao entra no cache.
+        sql_result_cache.set(
+            tenant_id,
+            key_text,
+            [dict(r) for r in sample_rows],
+            elapsed_ms,
+            referenced_tables(statement.tokens),
+            as_of=as_of,
+        )
 
     return SQLValidationResult(
         normalized_query=normalized,
         rows_affected=0,
         sample_rows=sample_rows,
         execution_time_ms=elapsed_ms,
+        original_execution_time_ms=elapsed_ms,
+        plan=plan,
     )
@@ -0,0 +1,209 @@
+"""Per-tenant result cache for the Estudio SQL test queries (sql_guard)."""
+from __future__ import annotations
+
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Callable, FrozenSet, Iterable, List, Optional, Sequence
+
+from app.core.config import settings
+from app.db.sql_lexer import QUOTED_IDENT, WORD, Token
+
+# Resultados dependentes do relogio ou aleatorios nunca sao cacheados.
+VOLATILE_FUNCTIONS = frozenset(
+    {
+        "NOW",
+        "RANDOM",
+        "CLOCK_TIMESTAMP",
+        "STATEMENT_TIMESTAMP",
+        "TIMEOFDAY",
+        "CURRENT_TIMESTAMP",
+        "CURRENT_TIME",
+        "CURRENT_DATE",
+        "LOCALTIME",
+        "LOCALTIMESTAMP",
+        "NEXTVAL",
+        "GEN_RANDOM_UUID",
+    }
+)
+_IDENTIFIER_KINDS = (WORD, QUOTED_IDENT)
+
+
+def cache_key_text(tokens: Sequence[Token]) -> str:
+    """Whitespace/comment-insensitive key: code tokens joined by single spaces."""
+    return " ".join(token.text for token in tokens)
+
+
+def _identifier(token: Token) -> str:
+    return token.text[1:-1].replace('""', '"') if token.kind == QUOTED_IDENT else token.text.lower()
+
+
+def referenced_tables(tokens: Sequence[Token]) -> FrozenSet[str]:
+    """Unqualified table names after FROM/JOIN (CTE names included)."""
+    tables = set()
+    for i, token in enumerate(tokens[:-1]):
+        if token.kind != WORD or token.upper not in ("FROM", "JOIN"):
+            continue
+        j = i + 1
+        # schema.tabela: fica o ultimo identificador da cadeia
+        while (
+            j + 2 < len(tokens)
+            and tokens[j].kind in _IDENTIFIER_KINDS
+            and tokens[j + 1].text == "."
+            and tokens[j + 2].kind in _IDENTIFIER_KINDS
+        ):
+            j += 2
+        if tokens[j].kind in _IDENTIFIER_KINDS:
+            tables.add(_identifier(tokens[j]).lower())
+    return frozenset(tables)
+
+
+def is_cacheable(tokens: Sequence[Token]) -> bool:
+    return VOLATILE_FUNCTIONS.isdisjoint(token.upper for token in tokens if token.kind == WORD)
+
+
+@dataclass(slots=True)
+class CachedResult:
+    rows: List[dict[str, Any]]
+    execution_time_ms: int
+    tables: FrozenSet[str]
+    size: int
+    expires_at: float
+
+
+class SQLResultCache:
+    """LRU bounded by total bytes; entries expire after ``ttl_seconds``.
+
+    Invalidations are stamped per (tenant, table): set() with ``as_of``
+    refuses a result read before the last invalidation of one of its tables
+    (a replica still behind a write that was already invalidated).
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl_seconds: float,
+        max_entry_bytes: int,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_entry_bytes = max_entry_bytes
+        self._timer = timer
+        self._data: "OrderedDict[tuple[str, str], CachedResult]" = OrderedDict()
+        self._lock = Lock()
+        self._invalidated_at: dict[tuple[str, str], float] = {}
+        self._tenant_invalidated_at: dict[str, float] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_skips = 0
+
+    def _drop(self, key: tuple[str, str]) -> None:
+        self.bytes -= self._data.pop(key).size
+
+    def get(self, tenant_id: str, key_text: str) -> Optional[CachedResult]:
+        key = (tenant_id, key_text)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry.expires_at <= self._timer():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(
+        self,
+        tenant_id: str,
+        key_text: str,
+        rows: List[dict[str, Any]],
+        execution_time_ms: int,
+        tables: FrozenSet[str],
+        as_of: Optional[float] = None,
+    ) -> bool:
+        """Store a result; ``as_of`` is the timer value the rows are known to be current at."""
+        if self.ttl_seconds <= 0 or self.max_bytes <= 0:
+            return False
+        size = len(key_text) + len(json.dumps(rows, default=str))
+        if size > min(self.max_entry_bytes, self.max_bytes):
+            return False
+        key = (tenant_id, key_text)
+        entry = CachedResult(
+            rows=rows,
+            execution_time_ms=execution_time_ms,
+            tables=tables,
+            size=size,
+            expires_at=self._timer() + self.ttl_seconds,
+        )
+        with self._lock:
+            if as_of is not None and self._invalidated_since(tenant_id, tables, as_of):
+                self.stale_skips += 1
+                return False
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = entry
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+        return True
+
+    def _invalidated_since(self, tenant_id: str, tables: FrozenSet[str], as_of: float) -> bool:
+        if self._tenant_invalidated_at.get(tenant_id, -1.0) >= as_of:
+            return True
+        return any(self._invalidated_at.get((tenant_id, table), -1.0) >= as_of for table in tables)
+
+    def invalidate_tables(self, tenant_id: str, tables: Iterable[str]) -> int:
+        names = {table.lower() for table in tables}
+        with self._lock:
+            now = self._timer()
+            for name in names:
+                self._invalidated_at[(tenant_id, name)] = now
+            stale = [
+                key for key, entry in self._data.items() if key[0] == tenant_id and entry.tables & names
+            ]
+            for key in stale:
+                self._drop(key)
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def invalidate_tenant(self, tenant_id: str) -> int:
+        with self._lock:
+            self._tenant_invalidated_at[tenant_id] = self._timer()
+            stale = [key for key in self._data if key[0] == tenant_id]
+            for key in stale:
+                self._drop(key)
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_skips": self.stale_skips,
+        }
+
+
+sql_result_cache = SQLResultCache(
+    max_bytes=settings.sql_result_cache_max_bytes,
+    ttl_seconds=settings.sql_result_cache_ttl_seconds,
+    max_entry_bytes=settings.sql_result_cache_max_entry_bytes,
+)
+
+
+def invalidate_sql_results(tenant_id: str, *tables: str) -> int:
+    """Drop cached Estudio SQL results of ``tenant_id`` that read any of ``tables``."""
+    return sql_result_cache.invalidate_tables(tenant_id, tables)
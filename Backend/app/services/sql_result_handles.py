@@ -0,0 +1,266 @@
+"""Paged Estudio SQL results backed by server-side cursors (/dados/query/results).
+
+Each open handle pins one pooled connection with a transaction holding the
+cursor, so handles are limited per tenant and per process, closed once the
+last page is read and reaped after ``idle_seconds`` without a fetch.
+
+A handle only exists in the worker that opened it. Its id is
+``<worker_id>.<token>``, so a load balancer can route the fetch/close calls
+by that prefix (sticky routing); a call that reaches another worker gets a
+409 instead of a misleading 404.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import secrets
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.db.session import read_sessionmaker
+from app.db.utils import set_sqlsafe_search_path
+from app.dependencies.tenancy import SQLSAFE_STATEMENT_TIMEOUT_MS
+from app.services.event_bus import PROCESS_ID
+from app.services.sql_cost_gate import PlanSummary, ensure_within_cost_budget
+from app.services.sql_guard import validar_sql_somente_leitura
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class ResultPage:
+    handle_id: Optional[str]
+    page: int
+    columns: List[str]
+    rows: List[dict[str, Any]]
+    has_more: bool
+    execution_time_ms: int
+    plan: Optional[PlanSummary] = None
+
+
+@dataclass(slots=True)
+class _Handle:
+    handle_id: str
+    tenant_id: str
+    session: AsyncSession
+    page_size: int
+    last_used: float
+    result: Optional[AsyncResult] = None
+    columns: List[str] = field(default_factory=list)
+    # Linha lida a frente para saber se existe proxima pagina sem um FETCH extra.
+    lookahead: List[dict[str, Any]] = field(default_factory=list)
+    pages: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class SQLResultHandles:
+    """Registry of open result handles; every FETCH runs under the SQL Studio statement_timeout."""
+
+    def __init__(
+        self,
+        per_tenant: int,
+        max_total: int,
+        idle_seconds: float,
+        max_rows: int,
+        timer: Callable[[], float] = time.monotonic,
+        worker_id: str = PROCESS_ID[:12],
+    ) -> None:
+        self.worker_id = worker_id
+        self.per_tenant = per_tenant
+        self.max_total = max_total
+        self.idle_seconds = idle_seconds
+        self.max_rows = max_rows
+        self._timer = timer
+        self._handles: Dict[str, _Handle] = {}
+        self.opened = 0
+        self.reaped = 0
+
+    def _count(self, tenant_id: str) -> int:
+        return sum(1 for handle in self._handles.values() if handle.tenant_id == tenant_id)
+
+    def _reserve(self, tenant_id: str, factory: async_sessionmaker[AsyncSession]) -> _Handle:
+        # Reserva sincrona (sem await entre a checagem e o insert) para respeitar os limites.
+        if len(self._handles) >= self.max_total:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Limite de resultados paginados abertos atingido. Tente novamente em instantes.",
+            )
+        if self._count(tenant_id) >= self.per_tenant:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Limite de resultados abertos atingido para o tenant. Feche um resultado antes de abrir outro.",
+            )
+        handle = _Handle(
+            # token_urlsafe nao gera ".", que separa o worker do token.
+            handle_id=f"{self.worker_id}.{secrets.token_urlsafe(16)}",
+            tenant_id=tenant_id,
+            session=factory(),
+            page_size=0,
+            last_used=self._timer(),
+        )
+        self._handles[handle.handle_id] = handle
+        return handle
+
+    async def _release(self, handle: _Handle) -> None:
+        self._handles.pop(handle.handle_id, None)
+        try:
+            if handle.result is not None:
+                await handle.result.close()
+        finally:
+            # close() faz rollback da transacao do cursor e devolve a conexao ao pool.
+            await handle.session.close()
+
+    async def _read_page(self, handle: _Handle) -> ResultPage:
+        assert handle.result is not None
+        start = time.perf_counter()
+        try:
+            fetched = await handle.result.mappings().fetchmany(handle.page_size + 1 - len(handle.lookahead))
+        except DBAPIError:
+            await self._release(handle)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Nao foi possivel ler a pagina solicitada; o resultado foi fechado.",
+            ) from None
+        rows = handle.lookahead + [dict(row) for row in fetched]
+        handle.lookahead = rows[handle.page_size :]
+        handle.pages += 1
+        handle.last_used = self._timer()
+        has_more = bool(handle.lookahead)
+        page = ResultPage(
+            handle_id=handle.handle_id if has_more else None,
+            page=handle.pages,
+            columns=handle.columns,
+            rows=rows[: handle.page_size],
+            has_more=has_more,
+            execution_time_ms=int((time.perf_counter() - start) * 1000),
+        )
+        if not has_more:
+            await self._release(handle)
+        return page
+
+    async def open(self, tenant_id: str, schema_name: str, query: str, page_size: int) -> ResultPage:
+        """Validate ``query``, check its cost budget, declare its cursor and return the first page."""
+        normalized = validar_sql_somente_leitura(query)
+        await self.reap_idle()
+        factory = await read_sessionmaker()
+        handle = self._reserve(tenant_id, factory)
+        handle.page_size = page_size
+        async with handle.lock:
+            try:
+                await set_sqlsafe_search_path(handle.session, schema_name, SQLSAFE_STATEMENT_TIMEOUT_MS)
+                # Salvaguarda no servidor caso o processo caia com o cursor aberto.
+                await handle.session.execute(
+                    text("SELECT set_config('idle_in_transaction_session_timeout', :ms, true)"),
+                    {"ms": str(int(self.idle_seconds * 2000))},
+                )
+                # max_rows e um int das settings; interpolado para o EXPLAIN planejar o mesmo texto.
+                query = f"SELECT * FROM ( {normalized.rstrip(';')} ) AS q LIMIT {int(self.max_rows)}"
+                plan = await ensure_within_cost_budget(handle.session, tenant_id, query)
+                handle.result = await handle.session.stream(
+                    text(query),
+                    execution_options={"yield_per": page_size + 1},
+                )
+            except DBAPIError:
+                await self._release(handle)
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Nao foi possivel executar a consulta.",
+                ) from None
+            except BaseException:
+                await self._release(handle)
+                raise
+            handle.columns = list(handle.result.keys())
+            self.opened += 1
+            page = await self._read_page(handle)
+            page.plan = plan
+            return page
+
+    def _get(self, tenant_id: str, handle_id: str) -> _Handle:
+        handle = self._handles.get(handle_id)
+        worker_id, dot, _ = handle_id.partition(".")
+        if handle is None and dot and worker_id != self.worker_id:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=(
+                    "Resultado aberto em outro worker da API; as paginas devem ser pedidas ao mesmo "
+                    "worker (roteamento fixo pelo prefixo do handleId)."
+                ),
+            )
+        if handle is None or handle.tenant_id != tenant_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Resultado nao encontrado ou expirado.",
+            )
+        return handle
+
+    async def fetch(self, tenant_id: str, handle_id: str) -> ResultPage:
+        handle = self._get(tenant_id, handle_id)
+        async with handle.lock:
+            if handle.handle_id not in self._handles:
+                # Fechado enquanto esperavamos o lock (ultima pagina, DELETE ou reaper).
+                self._get(tenant_id, handle_id)
+            return await self._read_page(handle)
+
+    async def close(self, tenant_id: str, handle_id: str) -> None:
+        handle = self._get(tenant_id, handle_id)
+        async with handle.lock:
+            if handle.handle_id in self._handles:
+                await self._release(handle)
+
+    async def reap_idle(self) -> int:
+        """Close handles idle for more than ``idle_seconds``; busy handles are skipped."""
+        deadline = self._timer() - self.idle_seconds
+        stale = [h for h in self._handles.values() if h.last_used <= deadline and not h.lock.locked()]
+        for handle in stale:
+            try:
+                await self._release(handle)
+            except Exception:  # pragma: no cover - conexao ja pode estar quebrada
+                logger.exception("Falha ao fechar resultado paginado %s", handle.handle_id)
+        self.reaped += len(stale)
+        return len(stale)
+
+    async def close_all(self) -> None:
+        for handle in list(self._handles.values()):
+            try:
+                await self._release(handle)
+            except Exception:  # pragma: no cover
+                logger.exception("Falha ao fechar resultado paginado %s", handle.handle_id)
+
+    def stats(self) -> dict[str, int | float | str]:
+        return {
+            "worker_id": self.worker_id,
+            "open": len(self._handles),
+            "max_total": self.max_total,
+            "per_tenant": self.per_tenant,
+            "idle_seconds": self.idle_seconds,
+            "opened": self.opened,
+            "reaped": self.reaped,
+        }
+
+
+sql_result_handles = SQLResultHandles(
+    per_tenant=settings.sql_result_handles_per_tenant,
+    max_total=settings.sql_result_handles_max_total,
+    idle_seconds=settings.sql_result_handle_idle_seconds,
+    max_rows=settings.sql_result_handle_max_rows,
+)
+
+
+async def run_sql_result_reaper(handles: SQLResultHandles, interval_seconds: float) -> None:
+    """Periodically return the connections of abandoned handles to the pool."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            closed = await handles.reap_idle()
+        except Exception:  # pragma: no cover - o job nunca deve derrubar a aplicacao
+            logger.exception("Falha ao expirar resultados paginados do Estudio SQL")
+            continue
+        if closed:
+            logger.info("Resultados paginados expirados: %s", closed)
@@ -0,0 +1,189 @@
+"""Storage backends behind TenantStore (data_store).
+
+Each backend persists JSON documents grouped by collection for a single
+tenant. The in-memory backend keeps the MVP behaviour (and is what tests
+use); the Postgres backend lets several uvicorn workers share state.
+"""
+from __future__ import annotations
+
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+
+Document = Dict[str, Any]
+
+STORE_TABLE = f"{settings.tenant_admin_schema}.tb_store_documento"
+
+
+class StoreBackend(ABC):
+    """Document storage for one tenant, keyed by (collection, key)."""
+
+    # Bytes held in process memory (0 for backends that keep data elsewhere).
+    bytes: int = 0
+    # Whether the documents survive dropping the backend (DataStore only evicts these).
+    persistent: bool = False
+
+    def detach(self) -> None:
+        """Called when the owning TenantStore is evicted from the DataStore LRU."""
+
+    @abstractmethod
+    async def list(self, collection: str, limit: Optional[int] = None) -> List[Document]:
+        """Return the documents of a collection in insertion order (only the last ``limit``)."""
+
+    @abstractmethod
+    async def get(self, collection: str, key: str) -> Optional[Document]:
+        ...
+
+    @abstractmethod
+    async def put(self, collection: str, key: str, doc: Document) -> None:
+        """Insert or replace a document (keeps its original position)."""
+
+    @abstractmethod
+    async def put_if_absent(self, collection: str, key: str, doc: Document) -> bool:
+        """Insert only if the key does not exist; return whether it was inserted."""
+
+    @abstractmethod
+    async def delete(self, collection: str, key: str) -> bool:
+        ...
+
+
+class MemoryStoreBackend(StoreBackend):
+    """Per-process dicts; ``bytes`` tracks the serialized size of the stored documents."""
+
+    def __init__(self, on_resize: Optional[Callable[[int], None]] = None) -> None:
+        self._collections: Dict[str, Dict[str, Document]] = {}
+        self._sizes: Dict[tuple[str, str], int] = {}
+        self._on_resize = on_resize
+        self.bytes = 0
+
+    def _resize(self, collection: str, key: str, doc: Optional[Document]) -> None:
+        size = len(json.dumps(doc, separators=(",", ":"))) if doc is not None else 0
+        delta = size - self._sizes.pop((collection, key), 0)
+        if doc is not None:
+            self._sizes[(collection, key)] = size
+        self.bytes += delta
+        if delta and self._on_resize is not None:
+            self._on_resize(delta)
+
+    def detach(self) -> None:
+        # Handles ainda em uso por requests em andamento nao mexem mais na contagem do DataStore.
+        self._on_resize = None
+
+    async def list(self, collection: str, limit: Optional[int] = None) -> List[Document]:
+        docs = list(self._collections.get(collection, {}).values())
+        return docs if limit is None else docs[-limit:] if limit > 0 else []
+
+    async def get(self, collection: str, key: str) -> Optional[Document]:
+        return self._collections.get(collection, {}).get(key)
+
+    async def put(self, collection: str, key: str, doc: Document) -> None:
+        self._collections.setdefault(collection, {})[key] = doc
+        self._resize(collection, key, doc)
+
+    async def put_if_absent(self, collection: str, key: str, doc: Document) -> bool:
+        docs = self._collections.setdefault(collection, {})
+        if key in docs:
+            return False
+        docs[key] = doc
+        self._resize(collection, key, doc)
+        return True
+
+    async def delete(self, collection: str, key: str) -> bool:
+        if self._collections.get(collection, {}).pop(key, None) is None:
+            return False
+        self._resize(collection, key, None)
+        return True
+
+
+class PostgresStoreBackend(StoreBackend):
+    """Documents in tenant_admin.tb_store_documento, one short transaction per call."""
+
+    persistent = True
+
+    def __init__(self, tenant_id: str, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        self.tenant_id = tenant_id
+        self._session_factory = session_factory
+
+    async def list(self, collection: str, limit: Optional[int] = None) -> List[Document]:
+        async with self._session_factory() as session:
+            if limit is None:
+                res = await session.execute(
+                    text(
+                        f"SELECT payload::text FROM {STORE_TABLE} "
+                        "WHERE tenant_id = :t AND colecao = :c ORDER BY seq"
+                    ),
+                    {"t": self.tenant_id, "c": collection},
+                )
+                return [json.loads(row[0]) for row in res.all()]
+            # Os ultimos ``limit`` pela ordem de insercao, devolvidos do mais antigo ao mais novo.
+            res = await session.execute(
+                text(
+                    f"SELECT payload::text FROM {STORE_TABLE} "
+                    "WHERE tenant_id = :t AND colecao = :c ORDER BY seq DESC LIMIT :n"
+                ),
+                {"t": self.tenant_id, "c": collection, "n": limit},
+            )
+            return [json.loads(row[0]) for row in reversed(res.all())]
+
+    async def get(self, collection: str, key: str) -> Optional[Document]:
+        async with self._session_factory() as session:
+            res = await session.execute(
+                text(
+                    f"SELECT payload::text FROM {STORE_TABLE} "
+                    "WHERE tenant_id = :t AND colecao = :c AND chave = :k"
+                ),
+                {"t": self.tenant_id, "c": collection, "k": key},
+            )
+            raw = res.scalar_one_or_none()
+            return json.loads(raw) if raw is not None else None
+
+    async def put(self, collection: str, key: str, doc: Document) -> None:
+        async with self._session_factory() as session:
+            await session.execute(
+                text(
+                    f"INSERT INTO {STORE_TABLE} (tenant_id, colecao, chave, payload) "
+                    "VALUES (:t, :c, :k, CAST(:p AS jsonb)) "
+                    "ON CONFLICT (tenant_id, colecao, chave) "
+                    "DO UPDATE SET payload = EXCLUDED.payload, updated_at = NOW()"
+                ),
+                {"t": self.tenant_id, "c": collection, "k": key, "p": json.dumps(doc)},
+            )
+            await session.commit()
+
+    async def put_if_absent(self, collection: str, key: str, doc: Document) -> bool:
+        async with self._session_factory() as session:
+            res = await session.execute(
+                text(
+                    f"INSERT INTO {STORE_TABLE} (tenant_id, colecao, chave, payload) "
+                    "VALUES (:t, :c, :k, CAST(:p AS jsonb)) "
+                    "ON CONFLICT (tenant_id, colecao, chave) DO NOTHING"
+                ),
+                {"t": self.tenant_id, "c": collection, "k": key, "p": json.dumps(doc)},
+            )
+            await session.commit()
+            return (res.rowcount or 0) > 0
+
+    async def delete(self, collection: str, key: str) -> bool:
+        async with self._session_factory() as session:
+            res = await session.execute(
+                text(f"DELETE FROM {STORE_TABLE} WHERE tenant_id = :t AND colecao = :c AND chave = :k"),
+                {"t": self.tenant_id, "c": collection, "k": key},
+            )
+            await session.commit()
+            return (res.rowcount or 0) > 0
+
+
+def create_backend(tenant_id: str, on_resize: Optional[Callable[[int], None]] = None) -> StoreBackend:
+    backend = settings.data_store_backend.lower()
+    if backend == "memory":
+        return MemoryStoreBackend(on_resize)
+    if backend == "postgres":
+        from app.db.session import AsyncSessionLocal
+
+        return PostgresStoreBackend(tenant_id, AsyncSessionLocal)
+    raise ValueError(f"DATA_STORE_BACKEND invalido: {settings.data_store_backend}")
@@ -0,0 +1,112 @@
+"""Notification templates: {{a.b}} placeholders compiled once, rendered many times.
+
+A template body is parsed into a tuple of segments (literal strings and
+variable paths) so rendering is a join over the segments with no regex work.
+Templates loaded from tenant_admin.templates are cached per template_id;
+update_template invalidates its entry and other workers pick the change up
+within TEMPLATE_CACHE_TTL_SECONDS.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Tuple, Union
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+PLACEHOLDER = re.compile(r"\{\{\s*([^}]+)\s*\}\}")
+
+Segment = Union[str, Tuple[str, ...]]
+
+
+def _resolve(variables: Mapping[str, Any], path: Tuple[str, ...]) -> str:
+    # Caminho ausente ou atravessando um nao-dict vira string vazia (MVP seguro)
+    cur: Any = variables
+    for part in path:
+        if isinstance(cur, dict) and part in cur:
+            cur = cur[part]
+        else:
+            return ""
+    return str(cur)
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledTemplate:
+    segments: Tuple[Segment, ...]
+
+    @classmethod
+    def parse(cls, content: str) -> "CompiledTemplate":
+        segments: list[Segment] = []
+        pos = 0
+        for match in PLACEHOLDER.finditer(content):
+            if match.start() > pos:
+                segments.append(content[pos:match.start()])
+            segments.append(tuple(match.group(1).strip().split(".")))
+            pos = match.end()
+        if pos < len(content):
+            segments.append(content[pos:])
+        return cls(tuple(segments))
+
+    def render(self, variables: Mapping[str, Any]) -> str:
+        return "".join([seg if type(seg) is str else _resolve(variables, seg) for seg in self.segments])
+
+    def render_many(self, variables_iter: Iterable[Mapping[str, Any]]) -> Iterator[str]:
+        segments = self.segments
+        resolve = _resolve
+        for variables in variables_iter:
+            yield "".join([seg if type(seg) is str else resolve(variables, seg) for seg in segments])
+
+
+@dataclass(frozen=True, slots=True)
+class NotificationTemplate:
+    template_id: str
+    subject: str
+    body: CompiledTemplate
+
+
+template_cache: TTLCache[str, NotificationTemplate] = TTLCache(
+    maxsize=settings.template_cache_max_entries,
+    ttl_seconds=settings.template_cache_ttl_seconds,
+)
+
+
+async def load_templates(session: AsyncSession, template_ids: Iterable[str]) -> Dict[str, NotificationTemplate]:
+    """Cached templates by canonical id (str(UUID)); misses are read in one query, unknown ids left out."""
+    found: Dict[str, NotificationTemplate] = {}
+    missing = []
+    for template_id in set(template_ids):
+        cached = template_cache.get(template_id)
+        if cached is None:
+            missing.append(template_id)
+        else:
+            found[template_id] = cached
+    if missing:
+        res = await session.execute(
+            text(
+                f"SELECT template_id, name, subject, content FROM {settings.tenant_admin_schema}.templates "
+                "WHERE template_id = ANY(CAST(:ids AS uuid[]))"
+            ),
+            {"ids": missing},
+        )
+        for row in res.mappings():
+            template = NotificationTemplate(
+                template_id=str(row["template_id"]),
+                subject=row["subject"] or row["name"],
+                body=CompiledTemplate.parse(row["content"]),
+            )
+            template_cache.set(template.template_id, template)
+            found[template.template_id] = template
+    return found
+
+
+async def load_template(session: AsyncSession, template_id: str) -> Optional[NotificationTemplate]:
+    return (await load_templates(session, (template_id,))).get(template_id)
+
+
+def invalidate_template(template_id: str) -> None:
+    """Call after committing a change to the template row."""
+    template_cache.invalidate(template_id)
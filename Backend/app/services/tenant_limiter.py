@@ -0,0 +1,173 @@
+"""Per-tenant concurrency limiter with fair queuing for the analytic query paths.
+
+Every Estudio SQL / no-code execution holds one slot while it owns a pooled
+connection. A tenant may hold at most ``per_tenant`` slots and the process
+at most ``global_limit``; waiters are served round-robin across tenants, so
+a tenant with 50 queued queries cannot delay another tenant's first one.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import math
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from typing import Callable, Deque, Dict
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+
+class TenantConcurrencyLimiter:
+    def __init__(
+        self,
+        per_tenant: int,
+        global_limit: int,
+        max_queue: int,
+        queue_timeout_seconds: float,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.per_tenant = max(1, per_tenant)
+        self.global_limit = max(1, global_limit)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self._timer = timer
+        self._active: Dict[str, int] = {}
+        self._active_total = 0
+        # tenant -> fila FIFO; a ordem do OrderedDict e a vez de cada tenant (round-robin).
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future[None]]]" = OrderedDict()
+        self.granted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    @property
+    def retry_after_seconds(self) -> int:
+        return max(1, math.ceil(self.queue_timeout_seconds))
+
+    def _reject(self, detail: str) -> HTTPException:
+        self.rejected += 1
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            headers={"Retry-After": str(self.retry_after_seconds)},
+        )
+
+    def _has_room(self, tenant_id: str) -> bool:
+        return self._active_total < self.global_limit and self._active.get(tenant_id, 0) < self.per_tenant
+
+    def _grant(self, tenant_id: str) -> None:
+        self._active[tenant_id] = self._active.get(tenant_id, 0) + 1
+        self._active_total += 1
+        self.granted += 1
+
+    def _dispatch(self) -> None:
+        while self._active_total < self.global_limit:
+            for tenant_id in list(self._waiters):
+                queue = self._waiters[tenant_id]
+                while queue and queue[0].done():  # desistiram (timeout/cancelamento)
+                    queue.popleft()
+                if not queue:
+                    del self._waiters[tenant_id]
+                    continue
+                if self._active.get(tenant_id, 0) >= self.per_tenant:
+                    continue
+                future = queue.popleft()
+                if queue:
+                    self._waiters.move_to_end(tenant_id)
+                else:
+                    del self._waiters[tenant_id]
+                self._grant(tenant_id)
+                future.set_result(None)
+                break
+            else:
+                return
+
+    def _forget(self, tenant_id: str, future: "asyncio.Future[None]") -> None:
+        queue = self._waiters.get(tenant_id)
+        if queue is None:
+            return
+        with contextlib.suppress(ValueError):
+            queue.remove(future)
+        if not queue:
+            del self._waiters[tenant_id]
+
+    def _record_wait(self, started: float) -> None:
+        waited_ms = (self._timer() - started) * 1000
+        self.wait_total_ms += waited_ms
+        self.wait_max_ms = max(self.wait_max_ms, waited_ms)
+
+    async def acquire(self, tenant_id: str) -> None:
+        """Take a slot, waiting in the tenant's queue; 429 with Retry-After when full or timed out."""
+        queue = self._waiters.get(tenant_id)
+        if not queue and self._has_room(tenant_id):
+            self._grant(tenant_id)
+            return
+        if self.max_queue == 0 or (queue is not None and len(queue) >= self.max_queue):
+            raise self._reject("Muitas consultas simultaneas para o tenant. Tente novamente em instantes.")
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(tenant_id, deque()).append(future)
+        self.queued += 1
+        started = self._timer()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            self._record_wait(started)
+            if future.done() and not future.cancelled():
+                return  # liberado no mesmo tick do timeout
+            self._forget(tenant_id, future)
+            self.timeouts += 1
+            raise self._reject("Fila de consultas do tenant esgotou o tempo de espera. Tente novamente.") from None
+        except BaseException:
+            if future.done() and not future.cancelled():
+                self.release(tenant_id)
+            else:
+                self._forget(tenant_id, future)
+            raise
+        self._record_wait(started)
+
+    def release(self, tenant_id: str) -> None:
+        active = self._active.get(tenant_id, 0) - 1
+        if active > 0:
+            self._active[tenant_id] = active
+        else:
+            self._active.pop(tenant_id, None)
+        self._active_total -= 1
+        self._dispatch()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, tenant_id: str) -> AsyncIterator[None]:
+        await self.acquire(tenant_id)
+        try:
+            yield
+        finally:
+            self.release(tenant_id)
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "active": self._active_total,
+            "active_tenants": len(self._active),
+            "waiting": sum(len(queue) for queue in self._waiters.values()),
+            "per_tenant": self.per_tenant,
+            "global_limit": self.global_limit,
+            "max_queue": self.max_queue,
+            "granted": self.granted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total_ms / self.queued, 2) if self.queued else 0.0,
+            "wait_max_ms": round(self.wait_max_ms, 2),
+        }
+
+
+tenant_query_limiter = TenantConcurrencyLimiter(
+    per_tenant=settings.tenant_query_concurrency,
+    global_limit=settings.query_global_concurrency,
+    max_queue=settings.tenant_query_max_queue,
+    queue_timeout_seconds=settings.tenant_query_queue_timeout_seconds,
+)
@@ -0,0 +1,432 @@
+"""Delivery of CRM events to the endpoints registered in tenant_admin.webhooks.
+
+publish() only puts the event on a bounded in-process queue, so request
+handlers never wait on a subscriber. A router task matches events against
+the active webhooks of the event's tenant (cached, reloaded every
+WEBHOOK_SUBSCRIPTION_TTL_SECONDS or when a webhook is created/updated); a
+webhook without tenant_id receives nothing. Matched events go to a per-endpoint
+buffer; a buffer is flushed as one batched POST when it reaches
+``batch_size`` or ``coalesce_ms`` after its first event.
+
+Every POST goes through one shared httpx connection pool, at most
+``endpoint_concurrency`` at a time per endpoint, signed with HMAC-SHA256 of
+``"<timestamp>.<body>"`` using the webhook's secret_key. Network errors,
+429 and 5xx are retried with jittered exponential backoff (honouring a
+numeric Retry-After); other responses are final. Delivery is best effort:
+events still buffered or in flight when the process stops are lost.
+
+Targets must be http(s) URLs whose host resolves only to public addresses
+(no loopback, link-local such as 169.254.169.254, private or reserved
+ranges). check_webhook_target() runs when a webhook is registered or
+re-activated and again before every POST, since DNS can change in between.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import random
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.services.event_bus import (  # noqa: F401 - nomes de evento aceitos em webhooks.event_name
+    CAMPAIGN_CREATED,
+    CONTACT_CREATED,
+    OPPORTUNITY_CREATED,
+    OPPORTUNITY_UPDATED,
+)
+
+logger = logging.getLogger(__name__)
+
+# Webhook com event_name "*" recebe todos os eventos
+ALL_EVENTS = "*"
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+TIMESTAMP_HEADER = "X-Webhook-Timestamp"
+DELIVERY_HEADER = "X-Webhook-Delivery"
+WEBHOOK_ID_HEADER = "X-Webhook-Id"
+
+_SUBSCRIPTIONS_KEY = "webhooks"
+
+# Indice dos webhooks ativos: (tenant_id, event_name)
+SubscriptionKey = Tuple[str, str]
+
+
+class WebhookTargetError(ValueError):
+    """The webhook target_url is not an http(s) URL of a public host."""
+
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def check_webhook_target(url: str, allow_private: bool = False) -> None:
+    """Raise WebhookTargetError for an unsafe ``url``; OSError when its host does not resolve."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise WebhookTargetError("A URL do webhook deve ser http(s) com host")
+    if allow_private:
+        return
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        raise WebhookTargetError("Porta invalida na URL do webhook") from None
+    infos = await asyncio.get_running_loop().getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+    # Todos os enderecos do host: o cliente HTTP pode usar qualquer um deles.
+    for info in infos:
+        if not _is_public(info[4][0]):
+            raise WebhookTargetError(f"O host do webhook resolve para um endereco nao publico ({info[4][0]})")
+
+
+def sign_payload(secret_key: str, timestamp: str, body: bytes) -> str:
+    digest = hmac.new(secret_key.encode(), timestamp.encode() + b"." + body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+@dataclass(frozen=True, slots=True)
+class WebhookEvent:
+    event_name: str
+    tenant_id: str
+    data: Mapping[str, Any]
+    event_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    occurred_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.event_id,
+            "event": self.event_name,
+            "tenantId": self.tenant_id,
+            "occurredAt": self.occurred_at,
+            "data": self.data,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class WebhookEndpoint:
+    webhook_id: str
+    tenant_id: str
+    event_name: str
+    target_url: str
+    secret_key: Optional[str]
+
+
+class _Attempt(NamedTuple):
+    delivered: bool
+    retryable: bool
+    retry_after: Optional[float] = None
+    reason: str = ""
+    blocked: bool = False
+
+
+class _EndpointState:
+    __slots__ = ("endpoint", "buffer", "timer", "slots", "pending")
+
+    def __init__(self, endpoint: WebhookEndpoint, concurrency: int) -> None:
+        self.endpoint = endpoint
+        self.buffer: List[WebhookEvent] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.slots = asyncio.Semaphore(concurrency)
+        self.pending = 0  # bufferizados + em lotes aguardando/enviando
+
+
+class WebhookDispatcher:
+    """Queue -> per-endpoint coalescing buffers -> signed, retried, batched POSTs."""
+
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker[AsyncSession],
+        max_connections: int,
+        endpoint_concurrency: int,
+        batch_size: int,
+        coalesce_ms: float,
+        max_attempts: int,
+        backoff_seconds: float,
+        backoff_max_seconds: float,
+        timeout_seconds: float,
+        queue_size: int,
+        max_pending_per_endpoint: int,
+        subscription_ttl_seconds: float,
+        allow_private_targets: bool = False,
+    ) -> None:
+        self.sessionmaker = sessionmaker
+        self.allow_private_targets = allow_private_targets
+        self.max_connections = max_connections
+        self.endpoint_concurrency = max(1, endpoint_concurrency)
+        self.batch_size = max(1, batch_size)
+        self.coalesce_seconds = coalesce_ms / 1000
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.timeout_seconds = timeout_seconds
+        self.max_pending_per_endpoint = max_pending_per_endpoint
+        self._queue: asyncio.Queue[WebhookEvent] = asyncio.Queue(maxsize=queue_size)
+        self._subscriptions: TTLCache[str, Dict[SubscriptionKey, List[WebhookEndpoint]]] = TTLCache(
+            maxsize=1, ttl_seconds=subscription_ttl_seconds
+        )
+        self._last_subscriptions: Dict[SubscriptionKey, List[WebhookEndpoint]] = {}
+        self._endpoints: Dict[str, _EndpointState] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._client: Optional[httpx.AsyncClient] = None
+        self.published = 0
+        self.dropped = 0
+        self.delivered_events = 0
+        self.delivered_batches = 0
+        self.failed_batches = 0
+        self.retries = 0
+        self.blocked_batches = 0
+
+    # ------------------------------------------------------------ publish
+    def publish(self, tenant_id: str, event_name: str, data: Mapping[str, Any]) -> bool:
+        """Enqueue without waiting; False (and counted as dropped) when the queue is full."""
+        try:
+            self._queue.put_nowait(WebhookEvent(event_name=event_name, tenant_id=tenant_id, data=data))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.published += 1
+        return True
+
+    def invalidate_subscriptions(self) -> None:
+        """Call after committing a change to tenant_admin.webhooks."""
+        self._subscriptions.clear()
+
+    async def _load_subscriptions(self) -> Dict[SubscriptionKey, List[WebhookEndpoint]]:
+        by_key = self._subscriptions.get(_SUBSCRIPTIONS_KEY)
+        if by_key is not None:
+            return by_key
+        try:
+            async with self.sessionmaker() as session:
+                res = await session.execute(
+                    text(
+                        f"SELECT webhook_id, tenant_id, event_name, target_url, secret_key "
+                        f"FROM {settings.tenant_admin_schema}.webhooks "
+                        f"WHERE status = 'ACTIVE' AND tenant_id IS NOT NULL"
+                    )
+                )
+                rows = res.mappings().all()
+        except Exception:
+            # Banco indisponivel: segue com a ultima lista conhecida ate o proximo TTL.
+            logger.exception("Falha ao carregar webhooks ativos")
+            self._subscriptions.set(_SUBSCRIPTIONS_KEY, self._last_subscriptions)
+            return self._last_subscriptions
+        by_key = {}
+        for row in rows:
+            endpoint = WebhookEndpoint(
+                webhook_id=str(row["webhook_id"]),
+                tenant_id=row["tenant_id"],
+                event_name=row["event_name"],
+                target_url=row["target_url"],
+                secret_key=row["secret_key"],
+            )
+            by_key.setdefault((endpoint.tenant_id, endpoint.event_name), []).append(endpoint)
+        self._prune_endpoints({endpoint.webhook_id for endpoints in by_key.values() for endpoint in endpoints})
+        self._subscriptions.set(_SUBSCRIPTIONS_KEY, by_key)
+        self._last_subscriptions = by_key
+        return by_key
+
+    def _prune_endpoints(self, active_ids: Set[str]) -> None:
+        # Webhooks desativados/removidos: o estado sai quando nao ha mais lote pendente.
+        for webhook_id in [
+            webhook_id
+            for webhook_id, state in self._endpoints.items()
+            if webhook_id not in active_ids and not state.pending
+        ]:
+            del self._endpoints[webhook_id]
+
+    # ------------------------------------------------------------ routing
+    async def run(self) -> None:
+        """Route queued events to endpoint buffers until cancelled."""
+        while True:
+            event = await self._queue.get()
+            by_key = await self._load_subscriptions()
+            # So os webhooks do tenant que produziu o evento.
+            tenant_id = event.tenant_id
+            for endpoint in by_key.get((tenant_id, event.event_name), []) + by_key.get((tenant_id, ALL_EVENTS), []):
+                self._buffer(endpoint, event)
+
+    def _state_for(self, endpoint: WebhookEndpoint) -> _EndpointState:
+        state = self._endpoints.get(endpoint.webhook_id)
+        if state is None:
+            state = _EndpointState(endpoint, self.endpoint_concurrency)
+            self._endpoints[endpoint.webhook_id] = state
+        else:
+            state.endpoint = endpoint  # URL/secret podem ter mudado
+        return state
+
+    def _buffer(self, endpoint: WebhookEndpoint, event: WebhookEvent) -> None:
+        state = self._state_for(endpoint)
+        if state.pending >= self.max_pending_per_endpoint:
+            self.dropped += 1
+            return
+        state.buffer.append(event)
+        state.pending += 1
+        if len(state.buffer) >= self.batch_size:
+            self._flush(state)
+        elif state.timer is None:
+            state.timer = asyncio.get_running_loop().call_later(self.coalesce_seconds, self._flush, state)
+
+    def _flush(self, state: _EndpointState) -> None:
+        if state.timer is not None:
+            state.timer.cancel()
+            state.timer = None
+        while state.buffer:
+            batch, state.buffer = state.buffer[: self.batch_size], state.buffer[self.batch_size :]
+            task = asyncio.create_task(self._deliver(state, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    # ------------------------------------------------------------ delivery
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        delay = min(self.backoff_max_seconds, self.backoff_seconds * 2 ** (attempt - 1))
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max_seconds))
+        return delay
+
+    async def _post(self, endpoint: WebhookEndpoint, body: bytes, delivery_id: str) -> _Attempt:
+        timestamp = str(int(time.time()))
+        headers = {
+            "Content-Type": "application/json",
+            TIMESTAMP_HEADER: timestamp,
+            DELIVERY_HEADER: delivery_id,
+            WEBHOOK_ID_HEADER: endpoint.webhook_id,
+        }
+        if endpoint.secret_key:
+            headers[SIGNATURE_HEADER] = sign_payload(endpoint.secret_key, timestamp, body)
+        try:
+            await check_webhook_target(endpoint.target_url, self.allow_private_targets)
+        except WebhookTargetError as exc:
+            return _Attempt(False, False, reason=str(exc), blocked=True)
+        except OSError as exc:
+            return _Attempt(False, True, reason=type(exc).__name__)
+        try:
+            response = await self._http().post(endpoint.target_url, content=body, headers=headers)
+        except httpx.HTTPError as exc:
+            return _Attempt(False, True, reason=type(exc).__name__)
+        if response.is_success:
+            return _Attempt(True, False)
+        retry_after: Optional[float] = None
+        try:
+            retry_after = float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            pass
+        retryable = response.status_code == 429 or response.status_code >= 500
+        return _Attempt(False, retryable, retry_after, f"HTTP {response.status_code}")
+
+    async def _deliver(self, state: _EndpointState, batch: List[WebhookEvent]) -> None:
+        body = json.dumps({"events": [event.as_dict() for event in batch]}, default=str).encode()
+        delivery_id = uuid.uuid4().hex  # o mesmo em todas as tentativas: idempotencia no receptor
+        try:
+            async with state.slots:
+                for attempt in range(1, self.max_attempts + 1):
+                    result = await self._post(state.endpoint, body, delivery_id)
+                    if result.delivered:
+                        self.delivered_batches += 1
+                        self.delivered_events += len(batch)
+                        return
+                    if not result.retryable or attempt == self.max_attempts:
+                        break
+                    self.retries += 1
+                    await asyncio.sleep(self._backoff(attempt, result.retry_after))
+                self.failed_batches += 1
+                if result.blocked:
+                    self.blocked_batches += 1
+                logger.warning(
+                    "Webhook %s: lote de %s eventos descartado apos %s tentativa(s) (%s)",
+                    state.endpoint.webhook_id,
+                    len(batch),
+                    attempt,
+                    result.reason,
+                )
+        finally:
+            state.pending -= len(batch)
+
+    # ------------------------------------------------------------ lifecycle
+    def stats(self) -> dict[str, Any]:
+        return {
+            "published": self.published,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "delivered_events": self.delivered_events,
+            "delivered_batches": self.delivered_batches,
+            "failed_batches": self.failed_batches,
+            "retries": self.retries,
+            "blocked_batches": self.blocked_batches,
+            "inflight_batches": len(self._tasks),
+            "endpoints": {
+                state.endpoint.webhook_id: {"pending": state.pending, "buffered": len(state.buffer)}
+                for state in self._endpoints.values()
+                if state.pending
+            },
+        }
+
+    async def close(self, timeout_seconds: float = 5.0) -> None:
+        """Flush the buffers and give in-flight deliveries ``timeout_seconds`` to finish."""
+        for state in self._endpoints.values():
+            self._flush(state)
+        if self._tasks:
+            _, still_running = await asyncio.wait(set(self._tasks), timeout=timeout_seconds)
+            for task in still_running:
+                task.cancel()
+            await asyncio.gather(*still_running, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+async def run_webhook_dispatcher(dispatcher: WebhookDispatcher) -> None:
+    """Lifespan task: route published events to the webhook endpoints."""
+    while True:
+        try:
+            await dispatcher.run()
+        except asyncio.CancelledError:
+            raise
+        except Exception:  # pragma: no cover - o job nunca deve derrubar a aplicacao
+            logger.exception("Falha ao rotear eventos de webhook")
+            await asyncio.sleep(1.0)
+
+
+webhook_dispatcher = WebhookDispatcher(
+    AsyncSessionLocal,
+    max_connections=settings.webhook_max_connections,
+    endpoint_concurrency=settings.webhook_endpoint_concurrency,
+    batch_size=settings.webhook_batch_size,
+    coalesce_ms=settings.webhook_coalesce_ms,
+    max_attempts=settings.webhook_max_attempts,
+    backoff_seconds=settings.webhook_backoff_seconds,
+    backoff_max_seconds=settings.webhook_backoff_max_seconds,
+    timeout_seconds=settings.webhook_timeout_seconds,
+    queue_size=settings.webhook_queue_size,
+    max_pending_per_endpoint=settings.webhook_max_pending_per_endpoint,
+    subscription_ttl_seconds=settings.webhook_subscription_ttl_seconds,
+    allow_private_targets=settings.webhook_allow_private_targets,
+)
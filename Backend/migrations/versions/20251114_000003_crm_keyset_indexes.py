@@ -0,0 +1,70 @@
+"""keyset pagination indexes for opportunities and contacts
+
+Adds (COALESCE(updated_at, created_at) DESC, id DESC) indexes to template_schema
+so clone_from_template propagates them, and backfills them on tenant schemas
+that were already provisioned.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20251114_000003"
+down_revision = "20251114_000002"
+branch_labels = None
+depends_on = None
+
+
+KEYSET_INDEXES = [
+    ("idx_tb_oportunidade_keyset", "tb_oportunidade"),
+    ("idx_tb_contato_keyset", "tb_contato"),
+]
+
+
+def upgrade() -> None:
+    for index_name, table in KEYSET_INDEXES:
+        op.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS {index_name}
+                ON template_schema.{table} ((COALESCE(updated_at, created_at)) DESC, id DESC)
+            """
+        )
+        op.execute(
+            f"""
+            DO $$
+            DECLARE
+              t RECORD;
+            BEGIN
+              IF to_regclass('tenant_admin.tb_tenant') IS NULL THEN
+                RETURN;
+              END IF;
+              FOR t IN SELECT schema_name FROM tenant_admin.tb_tenant LOOP
+                IF to_regclass(format('%I.{table}', t.schema_name)) IS NOT NULL THEN
+                  EXECUTE format(
+                    'CREATE INDEX IF NOT EXISTS {index_name} ON %I.{table} ((COALESCE(updated_at, created_at)) DESC, id DESC)',
+                    t.schema_name
+                  );
+                END IF;
+              END LOOP;
+            END$$;
+            """
+        )
+
+
+def downgrade() -> None:
+    for index_name, _ in KEYSET_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS template_schema.{index_name}")
+        # Os mesmos schemas de tenant cobertos pelo upgrade.
+        op.execute(
+            f"""
+            DO $$
+            DECLARE
+              t RECORD;
+            BEGIN
+              IF to_regclass('tenant_admin.tb_tenant') IS NULL THEN
+                RETURN;
+              END IF;
+              FOR t IN SELECT schema_name FROM tenant_admin.tb_tenant LOOP
+                EXECUTE format('DROP INDEX IF EXISTS %I.{index_name}', t.schema_name);
+              END LOOP;
+            END$$;
+            """
+        )
@@ -0,0 +1,41 @@
+"""document table backing the tenant DataStore (Postgres backend)
+
+Stores the DataStore collections (leads, produtos, dashboards, workflows...)
+as JSONB documents keyed by (tenant_id, colecao, chave) in tenant_admin, so
+every uvicorn worker shares the same state. seq keeps insertion order for
+listings.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20251114_000004"
+down_revision = "20251114_000003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE SCHEMA IF NOT EXISTS tenant_admin")
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tenant_admin.tb_store_documento (
+          tenant_id TEXT NOT NULL,
+          colecao TEXT NOT NULL,
+          chave TEXT NOT NULL,
+          payload JSONB NOT NULL,
+          seq BIGSERIAL,
+          updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+          PRIMARY KEY (tenant_id, colecao, chave)
+        )
+        """
+    )
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_tb_store_documento_colecao_seq
+            ON tenant_admin.tb_store_documento (tenant_id, colecao, seq)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS tenant_admin.tb_store_documento")
@@ -0,0 +1,20 @@
+"""per-tenant EXPLAIN cost budget for the Estudio SQL
+
+NULL keeps the SQL_COST_BUDGET_DEFAULT from the settings; 0 disables the
+gate for the tenant.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20251114_000005"
+down_revision = "20251114_000004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE tenant_admin.tb_tenant ADD COLUMN IF NOT EXISTS sql_cost_budget NUMERIC")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE tenant_admin.tb_tenant DROP COLUMN IF EXISTS sql_cost_budget")
@@ -0,0 +1,56 @@
+"""notification outbox for template sends
+
+/notification/send-template only enqueues here; the outbox workers
+(app.services.notification_outbox) claim due rows with FOR UPDATE SKIP
+LOCKED, render and deliver them in batches, and reschedule failures with
+exponential backoff. A SENDING row whose lease (locked_until) expired is
+claimed again, so a crashed worker does not strand its batch.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20251114_000006"
+down_revision = "20251114_000005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE SCHEMA IF NOT EXISTS tenant_admin")
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tenant_admin.tb_notification_outbox (
+          outbox_id BIGSERIAL PRIMARY KEY,
+          tenant_id TEXT NOT NULL,
+          template_id UUID NOT NULL,
+          channel VARCHAR(20) NOT NULL,
+          recipient TEXT NOT NULL,
+          variables JSONB NOT NULL DEFAULT '{}'::jsonb,
+          status VARCHAR(20) NOT NULL DEFAULT 'PENDING',
+          attempts INT NOT NULL DEFAULT 0,
+          next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+          locked_until TIMESTAMPTZ,
+          last_error TEXT,
+          created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+          sent_at TIMESTAMPTZ
+        )
+        """
+    )
+    # Fila: so as linhas ainda a entregar entram no indice de claim.
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_tb_notification_outbox_due
+            ON tenant_admin.tb_notification_outbox (next_attempt_at)
+            WHERE status IN ('PENDING', 'SENDING')
+        """
+    )
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_tb_notification_outbox_tenant_status
+            ON tenant_admin.tb_notification_outbox (tenant_id, status)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS tenant_admin.tb_notification_outbox")
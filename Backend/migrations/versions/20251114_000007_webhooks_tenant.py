@@ -0,0 +1,30 @@
+"""tenant owner of tenant_admin.webhooks
+
+The webhook dispatcher only routes an event to the webhooks of the tenant
+that produced it. Webhooks registered before this revision have no tenant
+and receive no events until they are registered again.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20251114_000007"
+down_revision = "20251114_000006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE tenant_admin.webhooks ADD COLUMN IF NOT EXISTS tenant_id TEXT")
+    # Indice de roteamento: webhooks ativos por (tenant, evento).
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_webhooks_tenant_event
+            ON tenant_admin.webhooks (tenant_id, event_name)
+            WHERE status = 'ACTIVE'
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS tenant_admin.idx_webhooks_tenant_event")
+    op.execute("ALTER TABLE tenant_admin.webhooks DROP COLUMN IF EXISTS tenant_id")
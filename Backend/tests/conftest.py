@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    # Os servicos usam asyncio diretamente (Queue, TimerHandle): sem trio.
+    return "asyncio"
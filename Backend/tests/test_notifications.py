@@ -0,0 +1,162 @@
+"""SMTPConnectionPool and NotificationDispatcher against an in-process fake SMTP connection."""
+from __future__ import annotations
+
+import asyncio
+import smtplib
+import threading
+from typing import List, Optional
+
+import pytest
+
+from app.services.notifications import NotificationDispatcher, SMTPConnectionPool, SMTPCredentials
+
+CREDS = SMTPCredentials("smtp-a.test", 25, None, None, False, False, "crm@test")
+OTHER_CREDS = SMTPCredentials("smtp-b.test", 25, None, None, False, False, "crm@test")
+
+
+class FakeSMTP:
+    """Stands in for smtplib.SMTP; the attributes script how it answers."""
+
+    def __init__(self) -> None:
+        self.sent: List[str] = []
+        self.noop_code = 250
+        self.disconnect_on_send = False
+        self.block: Optional[threading.Event] = None
+        self.sending = threading.Event()
+        self.closed = False
+
+    def noop(self) -> tuple[int, bytes]:
+        if self.noop_code is None:
+            raise smtplib.SMTPServerDisconnected("fechada pelo servidor")
+        return self.noop_code, b"ok"
+
+    def sendmail(self, sender: str, recipients: List[str], message: str) -> dict:
+        self.sending.set()
+        if self.block is not None:
+            self.block.wait(timeout=5)
+        if self.disconnect_on_send:
+            raise smtplib.SMTPServerDisconnected("fechada pelo servidor")
+        self.sent.append(message)
+        return {}
+
+    def quit(self) -> None:
+        self.closed = True
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def connections(monkeypatch: pytest.MonkeyPatch) -> List[FakeSMTP]:
+    """Every connection opened by any pool, in order."""
+    opened: List[FakeSMTP] = []
+
+    def connect(pool: SMTPConnectionPool) -> FakeSMTP:
+        server = FakeSMTP()
+        opened.append(server)
+        pool.opened += 1
+        return server
+
+    monkeypatch.setattr(SMTPConnectionPool, "_connect", connect)
+    return opened
+
+
+def make_pool(idle_seconds: float = 60.0) -> SMTPConnectionPool:
+    return SMTPConnectionPool(CREDS, max_size=2, idle_seconds=idle_seconds, timeout=5)
+
+
+def test_idle_connection_is_reused(connections: List[FakeSMTP]) -> None:
+    pool = make_pool()
+    pool.send("crm@test", ["a@test"], "m1")
+    pool.send("crm@test", ["b@test"], "m2")
+
+    assert pool.opened == 1
+    assert connections[0].sent == ["m1", "m2"]
+    assert pool.idle_count == 1
+
+
+def test_stale_idle_connection_passing_noop_is_reused(connections: List[FakeSMTP]) -> None:
+    pool = make_pool(idle_seconds=0)  # toda conexao ociosa passa pelo NOOP
+    pool.send("crm@test", ["a@test"], "m1")
+    pool.send("crm@test", ["b@test"], "m2")
+
+    assert pool.opened == 1
+    assert connections[0].sent == ["m1", "m2"]
+
+
+@pytest.mark.parametrize("noop_code", [421, None])
+def test_stale_idle_connection_failing_noop_is_replaced(
+    connections: List[FakeSMTP], noop_code: Optional[int]
+) -> None:
+    pool = make_pool(idle_seconds=0)
+    pool.send("crm@test", ["a@test"], "m1")
+    connections[0].noop_code = noop_code
+
+    pool.send("crm@test", ["b@test"], "m2")
+
+    assert pool.opened == 2
+    assert connections[0].closed
+    assert connections[1].sent == ["m2"]
+
+
+def test_send_retries_once_on_a_new_connection_after_disconnect(connections: List[FakeSMTP]) -> None:
+    pool = make_pool()
+    pool.send("crm@test", ["a@test"], "m1")
+    connections[0].disconnect_on_send = True
+
+    pool.send("crm@test", ["b@test"], "m2")
+
+    assert pool.opened == 2
+    assert connections[0].closed
+    assert connections[1].sent == ["m2"]
+    assert pool.idle_count == 1
+
+
+def test_disconnect_on_the_retry_is_raised(connections: List[FakeSMTP], monkeypatch: pytest.MonkeyPatch) -> None:
+    pool = make_pool()
+    pool.send("crm@test", ["a@test"], "m1")
+    connections[0].disconnect_on_send = True
+    original = SMTPConnectionPool._connect
+
+    def broken_connect(self: SMTPConnectionPool) -> FakeSMTP:
+        server = original(self)
+        server.disconnect_on_send = True
+        return server
+
+    monkeypatch.setattr(SMTPConnectionPool, "_connect", broken_connect)
+
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        pool.send("crm@test", ["b@test"], "m2")
+    assert pool.idle_count == 0
+    assert all(server.closed for server in connections)
+
+
+@pytest.mark.anyio
+async def test_prune_keeps_pools_with_sends_in_flight(connections: List[FakeSMTP]) -> None:
+    # Regressao: _prune fechava o pool de uma credencial com envio em andamento.
+    dispatcher = NotificationDispatcher(max_connections=1, idle_seconds=0, worker_threads=2, timeout_seconds=5)
+    release = threading.Event()
+    try:
+        pool, _ = dispatcher._pool_for(CREDS)
+        server = pool._connect()
+        server.block = release
+        pool.release(server, reusable=True)
+        pending = asyncio.create_task(dispatcher.send_email(CREDS, "a@test", "Assunto", text="corpo"))
+        while not server.sending.is_set():
+            await asyncio.sleep(0.005)
+
+        # Uma credencial nova cria outro pool e poda os ociosos.
+        await dispatcher.send_email(OTHER_CREDS, "b@test", "Assunto", text="corpo")
+
+        assert dispatcher._pools.get(CREDS) is pool
+        assert not server.closed
+        release.set()
+        await pending
+        assert len(server.sent) == 1
+
+        await asyncio.sleep(0.01)
+        dispatcher._prune()
+        assert CREDS not in dispatcher._pools
+    finally:
+        release.set()
+        await dispatcher.close()
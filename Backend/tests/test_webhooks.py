@@ -0,0 +1,178 @@
+"""WebhookDispatcher against an in-process HTTP stub (httpx.MockTransport)."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import json
+from typing import Callable, Dict, List
+
+import httpx
+import pytest
+
+from app.services.webhooks import (
+    ALL_EVENTS,
+    DELIVERY_HEADER,
+    OPPORTUNITY_CREATED,
+    OPPORTUNITY_UPDATED,
+    SIGNATURE_HEADER,
+    TIMESTAMP_HEADER,
+    WebhookDispatcher,
+    WebhookEndpoint,
+    _SUBSCRIPTIONS_KEY,
+)
+
+pytestmark = pytest.mark.anyio
+
+SECRET = "test-secret"
+
+
+class Stub:
+    """Records every request; ``statuses`` are answered in order, then 204."""
+
+    def __init__(self, statuses: List[int] | None = None) -> None:
+        self.statuses = list(statuses or [])
+        self.requests: List[httpx.Request] = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        status = self.statuses.pop(0) if self.statuses else 204
+        return httpx.Response(status)
+
+    def events(self) -> List[dict]:
+        return [event for request in self.requests for event in json.loads(request.content)["events"]]
+
+
+def make_dispatcher(stub: Stub, endpoints: List[WebhookEndpoint], **overrides) -> WebhookDispatcher:
+    options = dict(
+        max_connections=4,
+        endpoint_concurrency=2,
+        batch_size=50,
+        coalesce_ms=20,
+        max_attempts=4,
+        backoff_seconds=0.001,
+        backoff_max_seconds=0.01,
+        timeout_seconds=5,
+        queue_size=1000,
+        max_pending_per_endpoint=1000,
+        subscription_ttl_seconds=3600,
+        allow_private_targets=True,
+    )
+    options.update(overrides)
+    dispatcher = WebhookDispatcher(None, **options)  # type: ignore[arg-type] - sem banco: lista pre-carregada
+    by_key: Dict[tuple, List[WebhookEndpoint]] = {}
+    for endpoint in endpoints:
+        by_key.setdefault((endpoint.tenant_id, endpoint.event_name), []).append(endpoint)
+    dispatcher._subscriptions.set(_SUBSCRIPTIONS_KEY, by_key)
+    dispatcher._client = httpx.AsyncClient(transport=httpx.MockTransport(stub.handler))
+    return dispatcher
+
+
+async def run_until(dispatcher: WebhookDispatcher, done: Callable[[], bool], timeout: float = 2.0) -> None:
+    router = asyncio.create_task(dispatcher.run())
+    try:
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not done():
+            assert asyncio.get_running_loop().time() < deadline, "entrega nao concluida no prazo"
+            await asyncio.sleep(0.005)
+    finally:
+        router.cancel()
+        await asyncio.gather(router, return_exceptions=True)
+        await dispatcher.close()
+
+
+async def test_batches_are_signed_with_the_webhook_secret() -> None:
+    stub = Stub()
+    endpoint = WebhookEndpoint("w1", "t1", OPPORTUNITY_CREATED, "http://hooks.test/w1", SECRET)
+    dispatcher = make_dispatcher(stub, [endpoint])
+    dispatcher.publish("t1", OPPORTUNITY_CREATED, {"id": 1})
+
+    await run_until(dispatcher, lambda: dispatcher.delivered_events == 1)
+
+    (request,) = stub.requests
+    timestamp = request.headers[TIMESTAMP_HEADER]
+    expected = hmac.new(SECRET.encode(), f"{timestamp}.".encode() + request.content, hashlib.sha256).hexdigest()
+    assert request.headers[SIGNATURE_HEADER] == f"sha256={expected}"
+    assert stub.events()[0]["data"] == {"id": 1}
+
+
+async def test_unsigned_without_secret() -> None:
+    stub = Stub()
+    dispatcher = make_dispatcher(stub, [WebhookEndpoint("w1", "t1", OPPORTUNITY_CREATED, "http://hooks.test/w1", None)])
+    dispatcher.publish("t1", OPPORTUNITY_CREATED, {"id": 1})
+
+    await run_until(dispatcher, lambda: dispatcher.delivered_events == 1)
+
+    assert SIGNATURE_HEADER not in stub.requests[0].headers
+
+
+async def test_retries_5xx_and_429_with_the_same_delivery_id() -> None:
+    stub = Stub(statuses=[503, 429, 204])
+    dispatcher = make_dispatcher(stub, [WebhookEndpoint("w1", "t1", OPPORTUNITY_CREATED, "http://hooks.test/w1", SECRET)])
+    dispatcher.publish("t1", OPPORTUNITY_CREATED, {"id": 1})
+
+    await run_until(dispatcher, lambda: dispatcher.delivered_batches == 1)
+
+    assert len(stub.requests) == 3
+    assert dispatcher.retries == 2
+    assert len({request.headers[DELIVERY_HEADER] for request in stub.requests}) == 1
+
+
+async def test_client_errors_are_not_retried() -> None:
+    stub = Stub(statuses=[400])
+    dispatcher = make_dispatcher(stub, [WebhookEndpoint("w1", "t1", OPPORTUNITY_CREATED, "http://hooks.test/w1", SECRET)])
+    dispatcher.publish("t1", OPPORTUNITY_CREATED, {"id": 1})
+
+    await run_until(dispatcher, lambda: dispatcher.failed_batches == 1)
+
+    assert len(stub.requests) == 1
+    assert dispatcher.retries == 0
+
+
+async def test_events_are_coalesced_into_batches() -> None:
+    stub = Stub()
+    dispatcher = make_dispatcher(
+        stub, [WebhookEndpoint("w1", "t1", OPPORTUNITY_UPDATED, "http://hooks.test/w1", SECRET)], batch_size=2
+    )
+    for i in range(5):
+        dispatcher.publish("t1", OPPORTUNITY_UPDATED, {"id": i})
+
+    await run_until(dispatcher, lambda: dispatcher.delivered_events == 5)
+
+    # Dois lotes cheios e o resto despachado pelo coalesce_ms.
+    assert [len(json.loads(request.content)["events"]) for request in stub.requests] == [2, 2, 1]
+    assert sorted(event["data"]["id"] for event in stub.events()) == list(range(5))
+
+
+async def test_events_only_reach_the_webhooks_of_their_tenant() -> None:
+    # Regressao: o roteamento entregava o evento aos webhooks de todos os tenants.
+    stub = Stub()
+    endpoints = [
+        WebhookEndpoint("a", "tenant-a", OPPORTUNITY_CREATED, "http://hooks.test/a", SECRET),
+        WebhookEndpoint("b", "tenant-b", OPPORTUNITY_CREATED, "http://hooks.test/b", SECRET),
+        WebhookEndpoint("b-all", "tenant-b", ALL_EVENTS, "http://hooks.test/b-all", SECRET),
+    ]
+    dispatcher = make_dispatcher(stub, endpoints)
+    dispatcher.publish("tenant-a", OPPORTUNITY_CREATED, {"id": "a1"})
+
+    # close() em run_until despacha os buffers: nada mais chega depois.
+    await run_until(dispatcher, lambda: dispatcher.delivered_events == 1)
+
+    assert {str(request.url) for request in stub.requests} == {"http://hooks.test/a"}
+    assert stub.events()[0]["tenantId"] == "tenant-a"
+
+
+async def test_private_targets_are_not_posted() -> None:
+    stub = Stub()
+    dispatcher = make_dispatcher(
+        stub,
+        [WebhookEndpoint("w1", "t1", OPPORTUNITY_CREATED, "http://169.254.169.254/latest", SECRET)],
+        allow_private_targets=False,
+    )
+    dispatcher.publish("t1", OPPORTUNITY_CREATED, {"id": 1})
+
+    await run_until(dispatcher, lambda: dispatcher.failed_batches == 1)
+
+    assert stub.requests == []
+    assert dispatcher.blocked_batches == 1
+    assert dispatcher.retries == 0